@@ -8,12 +8,17 @@ __all__ = [
     # meta:
     '__author__', '__version__',
     # classes:
-    'FastORM', 'Autoincrement',
+    'FastORM', 'Autoincrement', 'StaleObjectError', 'PoolConfig', 'PoolMetrics', 'Router', 'Transaction', 'Batch', 'CacheConfig',
+    'ResultCacheConfig',
     # other modules:
-    'query', 'utils', 'classes', 'compat',
+    'query', 'utils', 'classes', 'compat', 'connection', 'codec', 'batch', 'cache',
 ]
 
 import ipaddress
+import asyncio
+import contextlib
+import inspect
+import time
 import builtins
 import datetime
 import asyncpg
@@ -22,7 +27,7 @@ import typing
 import types
 import uuid
 import re
-from typing import List, Dict, Any, Optional, Tuple, Type, Union, TypeVar, Callable, Set
+from typing import List, Dict, Any, Optional, Tuple, Type, Union, TypeVar, Callable, Set, Awaitable, Iterable
 from datetime import timezone
 
 try:
@@ -44,15 +49,22 @@ from pydantic.typing import NoArgAnyCallable, resolve_annotations
 from typeguard import check_type
 
 from asyncpg import Connection, Pool, Record
+from asyncpg.pool import PoolConnectionProxy
 
-from .classes import FieldInfo, FieldItem, SqlFieldMeta
+from .classes import FieldInfo, FieldItem, SqlFieldMeta, UpsertResult, SyncResult, StaleObjectError, StatementCache, PurgeProgress
 from .compat import check_is_new_union_type, TYPEHINT_TYPE, check_is_generic_alias, check_is_annotated_type, check_is_typing_union_type
 from .compat import IS_MIN_PYTHON_3_9
 from .compat import Annotated, NoneType
-from .utils import failsafe_issubclass, evaluate_forward_ref, snakecase
+from .utils import failsafe_issubclass, evaluate_forward_ref, snakecase, shorten_identifier
 from .query import *
 from .query import __all__ as __query__all__
 __all__.extend(__query__all__)
+from .connection import PoolConfig, PoolMetrics, SetupMetrics, Router, Transaction, TransactionMetrics
+from .connection import with_connection, with_read_connection
+from .codec import JsonCodec, SerializerDispatch, create_json_codec
+from .batch import Batch
+from .cache import CacheConfig, RowCache, ResultCacheConfig, ResultCache, CacheListener
+from . import connection, codec, batch, cache
 
 
 VERBOSE_SQL_LOG = True
@@ -117,9 +129,31 @@ class ModelMetaclassFastORM(ModelMetaclass):
             original_annotations=all_annotations,
             namespace=namespace,
         )
+        mcs.check_special_fields(cls)
         return cls
     # end def
 
+    @classmethod
+    def check_special_fields(mcs, cls):
+        """
+        Makes sure the `_version_field` and `_soft_delete_field` (if set, possibly by a base class) are actual non primary key fields.
+        :param cls: The newly created class.
+        """
+        for attribute, name in (('_version_field', 'version field'), ('_soft_delete_field', 'soft delete field')):
+            field = getattr(cls, attribute, None)
+            if field is None:
+                continue
+            # end if
+            assert_type_or_raise(field, str, parameter_name=f'{cls.__name__}.{attribute}')
+            if field not in cls.__fields__:
+                raise ValueError(f'The {name} {field!r} of {cls.__name__} is not a field of that class.')
+            # end if
+            if field in getattr(cls, '_primary_keys', []):
+                raise ValueError(f'The {name} {field!r} of {cls.__name__} can not be a primary key.')
+            # end if
+        # end for
+    # end def
+
     @classmethod
     def merge_base_class_attributes(
         mcs,
@@ -491,6 +525,13 @@ class _BaseFastORM(BaseModel):
     __fields_references: Dict[bool, Dict[str, FieldInfo[ModelField]]] = PrivateAttr()  # cache for `cls.get_fields_typehint()`
     __original__annotations__: Dict[str, Any]  # filled by the metaclass, before we do modify the __annotations__
     __original__fields__: Dict[str, ModelField]  # filled by the metaclass, before we do modify the __fields__
+    _version_field = None  # integer field counted up on every update, to detect concurrent changes. See `StaleObjectError`.
+    _soft_delete_field = None  # boolean field which `delete()` sets instead of actually deleting the row. Those rows are hidden from `select()`.
+    _sql_update_cache_size = 128  # how many different compiled `UPDATE` statements to keep, see `get_sql_update_cache()`.
+    _json_library = None  # 'orjson', 'msgspec' or 'json' for the `json`/`jsonb` columns, `None` for the fastest one installed. Per connection, not per model: see `get_json_codec()`.
+    _jsonb_patch_max_changes = 10  # up to how many changed paths a JSONB field is patched with `jsonb_set(…)`, instead of being replaced. `0` disables it.
+    _cache = None  # a `CacheConfig` to cache rows by primary key for `get(…)` and `get_many(…)`. See `get_row_cache()`.
+    _cache_results = False  # if the results of `select(…)` should be cached, until a table they depend on is written to. See `get_result_cache()`.
 
     def __init__(self, **data: Any):
         super().__init__(**data)
@@ -1006,6 +1047,51 @@ class _BaseFastORM(BaseModel):
         return _table_name
     # end def
 
+    def _get_insert_sql_fields(self) -> Dict[str, SqlFieldMeta]:
+        """
+        Collects the sql fields of this object as they should be written on an `INSERT`,
+        with references resolved and defaults filled in.
+
+        :used-by: build_sql_insert, bulk_upsert
+        :return: Dictionary with the long sql field name as key, and the `SqlFieldMeta` as value.
+        """
+        _ignored_fields = self.get_ignored_fields()
+        assert_type_or_raise(_ignored_fields, list, parameter_name='self._ignored_fields')
+        sql_fields_data = self._prepare_kwargs(**self.dict(), _allow_in=False, _fill_defaults=True)
+
+        merged_fields = {}
+        for sql_fields in sql_fields_data:
+            keys_in_ignored_fields = [key in _ignored_fields for key in sql_fields.keys()]
+            if all(keys_in_ignored_fields):
+                continue
+            # end if
+            if any(keys_in_ignored_fields):
+                raise ValueError('Some of the keys are optinal?')
+            # end if
+            merged_fields.update(sql_fields)
+        # end for
+        return merged_fields
+    # end def
+
+    @classmethod
+    def _get_upsert_on_conflict_fields(cls, upsert_on_conflict: Union[List[str], bool]) -> List[str]:
+        """
+        Resolves the `upsert_on_conflict` parameter to the actual list of sql fields to conflict on.
+
+        :param upsert_on_conflict:
+            If `True`: Will automatically use the primary key field(s) as conflict source.
+            If `False`: Will not upsert (update) at all, so the list is empty.
+            If `List[str]`: Will use those given conflicting fields.
+        :return: The sql field names, not quoted.
+        """
+        if upsert_on_conflict is True:
+            return cls.get_primary_keys_sql_fields()
+        elif upsert_on_conflict is False:
+            return []
+        # end if
+        return upsert_on_conflict
+    # end def
+
     def build_sql_insert(
         self, *,
         ignore_setting_automatic_fields: Optional[bool] = None,
@@ -1029,11 +1115,9 @@ class _BaseFastORM(BaseModel):
             The fetch parameters (`fetch_params`) for the SQL call.
             The sql string is the first tuple element, followed by the placeholder parameter values.
         """
-        _ignored_fields = self.get_ignored_fields()
         _automatic_fields = self.get_automatic_fields()
-        sql_fields_data = self._prepare_kwargs(**self.dict(), _allow_in=False, _fill_defaults=True)
-        assert_type_or_raise(_ignored_fields, list, parameter_name='self._ignored_fields')
         assert_type_or_raise(_automatic_fields, list, parameter_name='self._automatic_fields')
+        merged_fields = self._get_insert_sql_fields()
 
         placeholder = []
         values: List[JSONType] = []
@@ -1041,17 +1125,6 @@ class _BaseFastORM(BaseModel):
         upsert_fields = {}  # key is field name, values is the matching placeholder_index.
         placeholder_index = 0
 
-        merged_fields = {}
-        for sql_fields in sql_fields_data:
-            keys_in_ignored_fields = [key in _ignored_fields for key in sql_fields.keys()]
-            if all(keys_in_ignored_fields):
-                continue
-            # end if
-            if any(keys_in_ignored_fields):
-                raise ValueError('Some of the keys are optinal?')
-            # end if
-            merged_fields.update(sql_fields)
-        # end for
         for key, sql_meta in merged_fields.items():
             sql_meta: SqlFieldMeta
             is_automatic_field = False
@@ -1076,13 +1149,7 @@ class _BaseFastORM(BaseModel):
 
         # noinspection SqlNoDataSourceInspection,SqlResolve
         sql = f'INSERT INTO {self.get_table()} ({",".join(keys)})\n VALUES ({",".join(placeholder)})'
-        if upsert_on_conflict is True:
-            upsert_on_conflict_fields: List[str] = self.get_primary_keys_sql_fields()
-        elif upsert_on_conflict is False:
-            upsert_on_conflict_fields: List[str] = []
-        else:
-            upsert_on_conflict_fields: List[str] = upsert_on_conflict
-        # end if
+        upsert_on_conflict_fields = self._get_upsert_on_conflict_fields(upsert_on_conflict)
         if upsert_on_conflict_fields and upsert_fields:
             # Build additional part for the on conflict overwriting with the given fields.
             upsert_sql = ', '.join([f'"{key}" = ${placeholder_index}' for key, placeholder_index in upsert_fields.items() if key not in upsert_on_conflict_fields])
@@ -1100,35 +1167,158 @@ class _BaseFastORM(BaseModel):
     # end def
 
     @classmethod
-    async def get(cls: Union[Type[CLS_TYPE], 'FastORM'], conn: Connection, **kwargs) -> Optional[CLS_TYPE]:
+    async def get(cls: Union[Type[CLS_TYPE], 'FastORM'], conn: Optional[Connection] = None, **kwargs) -> Optional[CLS_TYPE]:
         """
         Retrieves a single Database element. Error if there are more matching ones.
         Like `.select(…)` but returns `None` for no matches, the match itself or an error if it's more than one row.
 
-        :param conn:
+        If the class has a `_cache` configured and only the primary key(s) are given, the row cache is used.
+        A cache hit doesn't need a connection at all. Rows loaded inside a transaction aren't cached,
+        as they could be changes not committed yet.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
         :param kwargs:
         :return:
         """
-        rows = await cls.select(conn=conn, **kwargs)
+        row_cache = cls.get_row_cache()
+        cache_key = cls._get_row_cache_key_of_filters(kwargs) if row_cache is not None else None
+        generation = None
+        if cache_key is not None:
+            instance = row_cache.get(cache_key)
+            if instance is not None:
+                return instance
+            # end if
+            generation = row_cache.generation
+        # end if
+        rows = await cls.select(conn, **kwargs)
         if len(rows) == 0:
             return None
         # end if
         assert len(rows) <= 1
+        if cache_key is not None and not connection.is_in_transaction(conn):
+            row_cache.set(cache_key, rows[0], generation=generation)
+        # end if
         return rows[0]
     # end def
 
     @classmethod
-    async def select(cls: Union[Type[CLS_TYPE], 'FastORM'], conn: Connection, **kwargs) -> List[CLS_TYPE]:
+    def build_sql_get_many(cls, keys: List[Tuple[Any, ...]]) -> Tuple[Any, ...]:
+        """
+        Builds a single `SELECT` for many rows by their primary key(s).
+        The keys are given as array parameters, so the SQL string stays the same regardless of the amount of rows.
+
+        :param keys: A tuple of the primary key values per row, in the order of `get_primary_keys_sql_fields()`.
+        :return: The SQL string followed by one list of values per primary key field for the `conn.fetch(…)` method.
+        """
+        primary_keys, column_types, values = cls._get_primary_key_arrays(keys)
+        fields = ','.join(f'"{field}"' for field in cls.get_sql_fields())
+        if len(primary_keys) == 1:
+            where_parts = [f'"{primary_keys[0]}" = ANY($1::{column_types[primary_keys[0]]}[])']
+        else:
+            keys_sql = ",".join(f'"{column}"' for column in primary_keys)
+            unnest_sql = ", ".join(f'${i}::{column_types[column]}[]' for i, column in enumerate(primary_keys, start=1))
+            where_parts = [f'({keys_sql}) IN (SELECT * FROM unnest({unnest_sql}))']
+        # end if
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        if soft_delete_field is not None:
+            where_parts.append(f'NOT "{soft_delete_field}"')
+        # end if
+        # noinspection SqlResolve,SqlNoDataSourceInspection
+        sql = f'SELECT {fields} FROM {cls.get_table()} WHERE {" AND ".join(where_parts)}'
+        # noinspection PyRedundantParentheses
+        return (sql, *values)
+    # end def
+
+    @classmethod
+    async def get_many(
+        cls: Union[Type[CLS_TYPE], 'FastORM'],
+        conn: Optional[Connection] = None,
+        keys: List[Union[Any, Tuple[Any, ...]]] = None,
+    ) -> List[Optional[CLS_TYPE]]:
+        """
+        Retrieves many rows by their primary key(s), with a single query.
+        Rows in the `_cache` of the class are taken from there, and only the others are queried.
+        Rows loaded inside a transaction aren't cached, as they could be changes not committed yet.
+
+            users = await User.get_many(conn, [1, 2, 42])
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param keys: The primary key values. For composite primary keys (including references) a tuple each,
+                     in the order of `get_primary_keys_sql_fields()`.
+        :return: The instances in the order of the keys, `None` for the ones not existing.
+        """
+        assert_type_or_raise(keys, list, tuple, parameter_name='keys')
+        # parsed like the model fields would, so e.g. UUIDs given as strings match the rows fetched.
+        keys = [cls._parse_row_cache_key(key if isinstance(key, tuple) else (key,)) for key in keys]
+        row_cache = cls.get_row_cache()
+        found: Dict[Tuple[Any, ...], CLS_TYPE] = {}
+        if row_cache is not None:
+            for key in keys:
+                instance = row_cache.get(key)
+                if instance is not None:
+                    found[key] = instance
+                # end if
+            # end for
+        # end if
+        missing_keys = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing_keys:
+            primary_keys = cls.get_primary_keys_sql_fields()
+            generation = row_cache.generation if row_cache is not None else None
+            rows = await cls._fetch_read_only(conn, cls.build_sql_get_many(missing_keys))
+            cache_rows = row_cache is not None and not connection.is_in_transaction(conn)
+            for row in rows:
+                instance = cls.from_row(row)
+                key = cls._parse_row_cache_key(row[column] for column in primary_keys)
+                found[key] = instance
+                if cache_rows:
+                    row_cache.set(key, instance, generation=generation)
+                # end if
+            # end for
+        # end if
+        # a copy each, so keys given twice don't share an instance.
+        return [found[key].copy(deep=True) if key in found else None for key in keys]
+    # end def
+
+    @classmethod
+    @with_read_connection
+    async def _fetch_read_only(cls, conn: Optional[Connection], fetch_params: Tuple[Any, ...]) -> List[Record]:
+        """
+        Runs a read only query, so with a `Router` on a replica.
+        """
+        logger.debug(f'SELECT query for {cls.__name__}: {fetch_params[0]!r} with values {fetch_params[1:]}')
+        return await conn.fetch(*fetch_params)
+    # end def
+
+    @classmethod
+    async def select(cls: Union[Type[CLS_TYPE], 'FastORM'], conn: Optional[Connection] = None, **kwargs) -> List[CLS_TYPE]:
         """
         Get's multiple ones.
-        :param conn:
+
+        If the class has `_cache_results = True`, the results are taken from the result cache if possible,
+        and a cache hit doesn't need a connection at all. Inside a transaction the cache isn't used,
+        as changes not committed yet could be seen there.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
         :param kwargs:
         :return:
         """
         fetch_params = cls.build_sql_select(**kwargs)
-        logger.debug(f'SELECT query for {cls.__name__}: {fetch_params[0]!r} with values {fetch_params[1:]}')
-        rows = await conn.fetch(*fetch_params)
-        return [cls.from_row(row) for row in rows]
+        result_cache = cls.get_result_cache()
+        cache_key = None
+        if result_cache is not None and not connection.is_in_transaction(conn):
+            cache_key = result_cache.make_key(fetch_params)
+        # end if
+        if cache_key is None:
+            return [cls.from_row(row) for row in await cls._fetch_read_only(conn, fetch_params)]
+        # end if
+        instances = result_cache.get(cache_key)
+        if instances is not None:
+            return instances
+        # end if
+        generation = result_cache.generation
+        instances = [cls.from_row(row) for row in await cls._fetch_read_only(conn, fetch_params)]
+        result_cache.set(cache_key, instances, tables=cls._get_result_cache_tables(), generation=generation)
+        return instances
     # end def
 
     @classmethod
@@ -1136,6 +1326,7 @@ class _BaseFastORM(BaseModel):
         cls,
         _allow_in: bool,
         _fill_defaults: bool = False,
+        _allow_expressions: bool = False,
         **kwargs: Any
     ) -> List[Union[In[Dict[str, SqlFieldMeta[Any]]], Dict[str, SqlFieldMeta[Any]]]]:
         """
@@ -1149,6 +1340,9 @@ class _BaseFastORM(BaseModel):
         Also if ` _fill_defaults` is `True`, any `None` values  will be replaced by any set default,
         as set via pydantic's `Field(default=…)` or `Field(default_factory=…)`.
 
+        Server side expressions (like `Inc(1)`) are only accepted if `_allow_expressions` is `True`,
+        and only for fields not referencing other tables.
+
         Will return a list of single elements.
         :param kwargs: Input fields, key being the python model.
 
@@ -1190,6 +1384,9 @@ class _BaseFastORM(BaseModel):
             if not _allow_in and isinstance(value, In):
                 raise TypeError('In[…] is not allowed in this type of query.')
             # end if
+            if isinstance(value, Expression) and (not _allow_expressions or typehint.is_reference):
+                raise TypeError(f'{value!r} is not allowed in this type of query.')
+            # end if
 
             if isinstance(value, datetime.datetime):
                 # make sure it's UTC.
@@ -1274,6 +1471,45 @@ class _BaseFastORM(BaseModel):
     # end def
 
 
+    @classmethod
+    def _group_flattened_values(cls, sql_fields: List[SqlFieldMeta[Any]]) -> Dict[str, Any]:
+        """
+        Turns flattened sql fields back into the values of the model fields.
+        The columns of a reference are grouped into the tuple of it's primary key values,
+        e.g. `other__id_part_1` and `other__id_part_2` into `other=(13, 'apple')`.
+        A reference with a single primary key gets that value directly.
+
+        :param sql_fields: The flattened fields, see `_prepare_kwargs_flattened(…)`.
+        :return: The values by model field name.
+        """
+        values: Dict[str, Any] = {}
+        for sql_meta in sql_fields:
+            if not sql_meta.type_.is_reference:
+                values[sql_meta.field_name] = sql_meta.value
+                continue
+            # end if
+            # walk down the fields of the referenced tables, e.g. `other` → `id_part_1`.
+            nested = values.setdefault(sql_meta.field_name, {})
+            path = [field_item.field for field_item in sql_meta.type_.types[1:]]
+            for field in path[:-1]:
+                nested = nested.setdefault(field, {})
+            # end for
+            nested[path[-1]] = sql_meta.value
+        # end for
+
+        def as_key(value):
+            if not isinstance(value, dict):
+                return value
+            # end if
+            if len(value) == 1:
+                return as_key(next(iter(value.values())))
+            # end if
+            return tuple(as_key(item) for item in value.values())
+        # end def
+
+        return {field_name: as_key(value) for field_name, value in values.items()}
+    # end def
+
     @classmethod
     def _resolve_referencing_kwargs(cls, typehint, value) -> Union[Any, In]:
         if isinstance(value, In):
@@ -1311,7 +1547,7 @@ class _BaseFastORM(BaseModel):
     # end def
 
     @classmethod
-    def _prepared_dict_to_sql(cls, sql_variable_dict: Dict[str, Any], placeholder_index: int):
+    def _prepared_dict_to_sql(cls, sql_variable_dict: Dict[str, Any], placeholder_index: int, namespace: Optional[str] = None):
         """
         Builds a query/insert sql string, based on the sql_variable dict (result of _prepare_kwargs())
 
@@ -1325,17 +1561,19 @@ class _BaseFastORM(BaseModel):
 
         :param sql_variable_dict:
         :param placeholder_index:
+        :param namespace: Optional table name or alias to prefix the keys with, e.g. `"namespace"."foo"`.
         :return: key_string, placeholder_string, values_list, placeholder_index_after
         """
         assert isinstance(sql_variable_dict, dict)  # Not In!
+        prefix = f'"{namespace}".' if namespace else ''
         if len(sql_variable_dict) == 1:
             placeholder_index_after = placeholder_index + 1
             long_key, value = list(sql_variable_dict.items())[0]
-            key_string = f'"{long_key}"'
+            key_string = f'{prefix}"{long_key}"'
             placeholder_string = f'${placeholder_index_after}'
             values_list = [value]
         else:  # is_in_list_clause is True
-            key_string = ", ".join(f'"{long_key}"' for long_key in sql_variable_dict.keys()).join("()")
+            key_string = ", ".join(f'{prefix}"{long_key}"' for long_key in sql_variable_dict.keys()).join("()")
             placeholder_index_after = placeholder_index + len(sql_variable_dict)
             placeholder_string = ", ".join(f'${i}' for i in range(placeholder_index + 1, placeholder_index_after + 1)).join("()")
             values_list = list(sql_variable_dict.values())
@@ -1344,24 +1582,28 @@ class _BaseFastORM(BaseModel):
     # end def
 
     @classmethod
-    def build_sql_select(cls, **kwargs):
+    def _build_sql_where(
+        cls,
+        kwargs: Dict[str, Any],
+        *,
+        placeholder_index: int = 0,
+        namespace: Optional[str] = None,
+    ) -> Tuple[List[str], List[Any], int]:
         """
-        Builds a `SELECT` query.
+        Compiles filter keyword arguments, as given to `.select(…)`, to the parts of a `WHERE` clause.
 
         It will handle some special cases, when you provide a FastORM element for a field as defined in the model. For those referencing fields you can also use the underlying primary key values directly, in case of multiple primary keys by specifying a tuple.
         Also you can specify a list of multiple values to have it generate a `field IN (…)` clause.
-        :param kwargs:
-        :return:
+
+        :param kwargs: The filters, key being the python model field.
+        :param placeholder_index: The last already used placeholder, so the first one generated would be `$(placeholder_index+1)`.
+        :param namespace: Optional table name or alias to prefix the fields with.
+        :return: The conditions (to be joined by `AND`), the values for the placeholders and the last used placeholder index.
+
+        :used-by: build_sql_select
         """
-        typehints: Dict[str, FieldInfo[Type]] = cls.get_fields_references(recursive=True)
-        non_ignored_long_names = [long_name for long_name, typehint in typehints.items() if typehint.unflattened_field not in cls.get_ignored_fields()]
-        fields = ','.join([
-            f'"{field}"'
-            for field in non_ignored_long_names
-            if not field.startswith('_')
-        ])
         sql_where = cls._prepare_kwargs(**kwargs, _allow_in=True)
-        where_index = 0
+        where_index = placeholder_index
         where_parts = []
         where_values = []
         # noinspection PyUnusedLocal
@@ -1376,12 +1618,12 @@ class _BaseFastORM(BaseModel):
 
             if not isinstance(sql_wheres, In):
                 if not all(meta.value is None for meta in sql_wheres.values()):
-                    key_string, placeholder_string, values_list, where_index = cls._prepared_dict_to_sql(sql_variable_dict=sql_wheres, placeholder_index=where_index)
+                    key_string, placeholder_string, values_list, where_index = cls._prepared_dict_to_sql(sql_variable_dict=sql_wheres, placeholder_index=where_index, namespace=namespace)
                     where_values.extend(values_list)
                     where_parts.append(f'{key_string} = {placeholder_string}')
                 else:  # it is None
                     # basically we need no placeholder stuff, so we can save a lot
-                    key_string, _, _, _ = cls._prepared_dict_to_sql(sql_variable_dict=sql_wheres, placeholder_index=0)
+                    key_string, _, _, _ = cls._prepared_dict_to_sql(sql_variable_dict=sql_wheres, placeholder_index=0, namespace=namespace)
                     where_parts.append(f'{key_string} IS NULL')
                 # end if
             else:
@@ -1392,7 +1634,7 @@ class _BaseFastORM(BaseModel):
                     if all(value is None for value in actual_wheres.values()):
                         can_be_null = True
                     else:  # is not None
-                        key_string_new, placeholder_string, values_list, where_index = cls._prepared_dict_to_sql(sql_variable_dict=actual_wheres, placeholder_index=where_index)
+                        key_string_new, placeholder_string, values_list, where_index = cls._prepared_dict_to_sql(sql_variable_dict=actual_wheres, placeholder_index=where_index, namespace=namespace)
                         where_values.extend(values_list)
                         placeholder_strings.append(placeholder_string)
                         assert key_string is None or key_string_new == key_string  # make sure once more it's consistently the same
@@ -1403,8 +1645,37 @@ class _BaseFastORM(BaseModel):
                 where_parts.append(f'{key_string} IN ({", ".join(placeholder_strings)}) {is_null_part}'.strip())
             # end if
         # end if
-        where_sql = "" if not where_parts else f' WHERE {" AND ".join(where_parts)}'
         where_values = [where_value.value for where_value in where_values]
+        return where_parts, where_values, where_index
+    # end def
+
+    @classmethod
+    def build_sql_select(cls, **kwargs):
+        """
+        Builds a `SELECT` query.
+
+        It will handle some special cases, when you provide a FastORM element for a field as defined in the model. For those referencing fields you can also use the underlying primary key values directly, in case of multiple primary keys by specifying a tuple.
+        Also you can specify a list of multiple values to have it generate a `field IN (…)` clause.
+
+        If the class has a `_soft_delete_field`, deleted rows are excluded, unless you filter by that field yourself,
+        e.g. `deleted=True` for only the deleted ones, or `deleted=In[True, False]` for all of them.
+        :param kwargs:
+        :return:
+        """
+        typehints: Dict[str, FieldInfo[Type]] = cls.get_fields_references(recursive=True)
+        non_ignored_long_names = [long_name for long_name, typehint in typehints.items() if typehint.unflattened_field not in cls.get_ignored_fields()]
+        fields = ','.join([
+            f'"{field}"'
+            for field in non_ignored_long_names
+            if not field.startswith('_')
+        ])
+        where_parts, where_values, _ = cls._build_sql_where(kwargs)
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        if soft_delete_field is not None and soft_delete_field not in kwargs:
+            # same condition as the partial indexes of `build_sql_create(…)`, so those can be used.
+            where_parts.append(f'NOT "{soft_delete_field}"')
+        # end if
+        where_sql = "" if not where_parts else f' WHERE {" AND ".join(where_parts)}'
 
         # noinspection SqlResolve,SqlNoDataSourceInspection
         sql = f'SELECT {fields} FROM "{cls._table_name}"{where_sql}'
@@ -1507,15 +1778,16 @@ class _BaseFastORM(BaseModel):
         # end if
     # end def
 
+    @with_connection
     async def insert(
-        self: Union[CLS_TYPE, "_BaseFastORM"], conn: Connection, *,
+        self: Union[CLS_TYPE, "_BaseFastORM"], conn: Optional[Connection] = None, *,
         ignore_setting_automatic_fields: Optional[bool] = None,
         upsert_on_conflict: Union[List[str], bool] = False,
         write_back_automatic_fields: bool = True,
         on_conflict_upsert_field_list: None = None,  # deprecated! Use `upsert_on_conflict=…` instead!
     ) -> Union[CLS_TYPE, "_BaseFastORM"]:
         """
-        :param conn: Database connection to run at.
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
         :param ignore_setting_automatic_fields:
             Skip setting fields marked as automatic, even if you provided.
             For example if the id field is marked automatic, as it's an autoincrement int.
@@ -1548,170 +1820,1538 @@ class _BaseFastORM(BaseModel):
             ignore_setting_automatic_fields=ignore_setting_automatic_fields,
             write_back_automatic_fields=write_back_automatic_fields,
         )
+        self._row_cache_invalidate()  # an upsert could have changed a cached row.
+        self._result_cache_invalidate()
         return self
     # end def
 
-    def build_sql_update(self):
+    @classmethod
+    def _get_staging_table_name(cls) -> str:
         """
-        Builds a prepared SQL statement for update.
-        Only fields with changed values will be updated in the database.
-        However this one doesn't resets the cache for those, see `FastORM.update(…)` for that.
-
-        :return: The SQL string followed by positional parameters for the `conn.execute(…)` method.
+        A name for a temporary table holding rows before they get merged into our actual table.
+        It's unique, so multiple staging tables in the same transaction don't collide.
+        It stays below the 63 characters postgres truncates identifiers to, so that uniqueness isn't cut off.
+        :return: The table name, not quoted.
         """
-        _table_name = getattr(self, '_table_name')
-        _primary_keys = getattr(self, '_primary_keys')
-        _database_cache = getattr(self, '_database_cache')
-        _automatic_fields = self.get_automatic_fields()
-        assert_type_or_raise(_table_name, str, parameter_name='self._table_name')
-        assert_type_or_raise(_primary_keys, list, parameter_name='self._primary_keys')
-        assert_type_or_raise(_database_cache, dict, parameter_name='self._database_cache')
-        assert_type_or_raise(_automatic_fields, list, parameter_name='self._automatic_fields')
+        return f'{cls.get_name()[:30]}__staging_{uuid.uuid4().hex[:16]}'
+    # end def
 
-        # SET ...
-        update_values = self.get_changes()
-        prepared_sql_fields = self._prepare_kwargs(**update_values, _allow_in=False)
+    @classmethod
+    def _bulk_prepare_records(
+        cls,
+        rows: List[Union['_BaseFastORM', Dict[str, Any]]],
+        *,
+        ignore_setting_automatic_fields: Optional[bool] = None,
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """
+        Prepares many rows for being copied to the database at once.
+        As all rows have to share the same columns, a column is only left out if all the rows agree on that.
 
-        # UPDATE ... SET ... WHERE ...
-        placeholder_index = 0
-        values: List[Any] = []
-        update_keys: List[str] = []  # "foo" = $1
-        for sql_fields in prepared_sql_fields:
-            sql_fields: Dict[str, Any]
-            key_string, placeholder_string, values_list, placeholder_index = self._prepared_dict_to_sql(sql_variable_dict=sql_fields, placeholder_index=placeholder_index)
-            values.extend(values_list)
-            update_keys.append(f'{key_string} = {placeholder_string}')
-        # end if
+        :param rows: Either instances of this class, or dicts with the parameters to construct one.
+        :param ignore_setting_automatic_fields:
+            If `True`, automatic fields are never written, so the database assigns those values.
+            If `False`, automatic fields are always written, even if they are `None`.
+            If `None`, automatic fields are left out if they are `None` in every single row,
+            and written if they are set in every single row. Mixing both raises a `ValueError`,
+            as copying `NULL` would fail for the ones the database should assign.
+        :return: The sql column names (not quoted) and a tuple of values per row in the order of those columns.
+        """
+        _automatic_fields = cls.get_automatic_fields()
+        prepared_rows: List[Dict[str, Any]] = []
+        for row in rows:
+            if not isinstance(row, cls):
+                row = cls(**row)
+            # end if
+            prepared_rows.append({key: sql_meta.value for key, sql_meta in row._get_insert_sql_fields().items()})
+        # end for
 
-        # WHERE pk...
-        primary_key_where: List[str] = []  # "foo" = $1
-        for primary_key in _primary_keys:
-            if primary_key in _database_cache:
-                value = _database_cache[primary_key]
-            else:
-                value = getattr(self, primary_key)
+        columns: List[str] = []
+        for key in cls.get_sql_fields():
+            if not any(key in prepared_row for prepared_row in prepared_rows):
+                continue
             # end if
-            placeholder_index += 1
-            primary_key_where.append(f'"{primary_key}" = ${placeholder_index}')
-            values.append(value)
-        # end if
-        logger.debug(f'Fields to UPDATE for selector {primary_key_where!r}: {update_values!r}')
+            if key in _automatic_fields:
+                if ignore_setting_automatic_fields:
+                    continue
+                # end if
+                if ignore_setting_automatic_fields is None:
+                    set_count = sum(prepared_row.get(key) is not None for prepared_row in prepared_rows)
+                    if set_count == 0:
+                        continue
+                    # end if
+                    if set_count < len(prepared_rows):
+                        raise ValueError(
+                            f'The automatic field {key!r} is set in {set_count} of {len(prepared_rows)} rows. '
+                            f'Either set it in all or in none of them, or use ignore_setting_automatic_fields.'
+                        )
+                    # end if
+                # end if
+            # end if
+            columns.append(key)
+        # end for
+        records = [tuple(prepared_row.get(key) for key in columns) for prepared_row in prepared_rows]
+        return columns, records
+    # end def
 
-        assert update_keys
-        sql = f'UPDATE "{_table_name}"\n'
-        sql += f' SET {",".join(update_keys)}\n'
-        sql += f' WHERE {" AND ".join(primary_key_where)}\n'
-        sql += ';'
-        # while primary keys will be native values, the current class' values will be SqlFieldMeta, which have to be unpacked.
-        values = [value.value if isinstance(value, SqlFieldMeta) else value for value in values]
+    @classmethod
+    def build_sql_create_staging(cls, staging_table: str, columns: List[str]) -> Tuple[str]:
+        """
+        Builds a `CREATE TEMP TABLE` statement for a staging table with the given columns of our table.
+        The column types are copied from the actual table, but no constraints or defaults.
+        The table is dropped automatically at the end of the transaction.
 
+        :param staging_table: Name of the temporary table, not quoted.
+        :param columns: The sql fields to include, not quoted.
+        :return: The SQL string as only tuple element.
+        """
+        columns_sql = ",".join(f'"{column}"' for column in columns)
+        # noinspection SqlNoDataSourceInspection,SqlResolve
+        sql = f'CREATE TEMP TABLE "{staging_table}" ON COMMIT DROP AS\n'
+        sql += f' SELECT {columns_sql} FROM {cls.get_table()}\n'
+        sql += ' WITH NO DATA\n'
+        sql += ';'
         # noinspection PyRedundantParentheses
-        return (sql, *values)
+        return (sql,)
     # end def
 
-    def get_changes(self) -> Dict:
+    @classmethod
+    def _build_sql_insert_from_staging(
+        cls,
+        staging_table: str,
+        columns: List[str],
+        *,
+        upsert_on_conflict: Union[List[str], bool] = True,
+    ) -> str:
         """
-        Returns all values which got changed and are now different to the last downloaded database version.
+        Builds the `INSERT … SELECT … ON CONFLICT …` part copying all rows of a staging table over to our table.
+        It returns whether each row was newly `"inserted"`.
+
+        :used-by: build_sql_bulk_upsert, build_sql_sync
         """
-        own_keys = self.get_fields()
-        _database_cache = self._database_cache
-        _ignored_fields = self.get_ignored_fields()
-        assert_type_or_raise(own_keys, list, parameter_name='own_keys')
-        assert_type_or_raise(_database_cache, dict, parameter_name='self._database_cache')
-        assert_type_or_raise(_ignored_fields, list, parameter_name='self._ignored_fields')
+        _automatic_fields = cls.get_automatic_fields()
+        upsert_on_conflict_fields = cls._get_upsert_on_conflict_fields(upsert_on_conflict)
+        columns_sql = ",".join(f'"{column}"' for column in columns)
 
-        update_values: Dict[str, Any] = {}
-        for key in own_keys:
-            if key.startswith('_') or key in _ignored_fields:
-                continue
-            # end if
-            value = getattr(self, key)
-            if key not in _database_cache:
-                update_values[key] = value
-            elif _database_cache[key] != value:
-                update_values[key] = value
+        # noinspection SqlNoDataSourceInspection,SqlResolve
+        sql = f' INSERT INTO {cls.get_table()} ({columns_sql})\n'
+        sql += f' SELECT {columns_sql} FROM "{staging_table}"\n'
+        if upsert_on_conflict_fields:
+            upsert_fields_sql = ', '.join([f'"{field}"' for field in upsert_on_conflict_fields])
+            update_columns = [
+                column for column in columns
+                if column not in upsert_on_conflict_fields and column not in _automatic_fields
+            ]
+            if update_columns:
+                upsert_sql = ', '.join([f'"{column}" = EXCLUDED."{column}"' for column in update_columns])
+                sql += f' ON CONFLICT ({upsert_fields_sql}) DO UPDATE SET {upsert_sql}\n'
+            else:
+                sql += f' ON CONFLICT ({upsert_fields_sql}) DO NOTHING\n'
             # end if
         # end if
-        return update_values
+        # a freshly inserted row has no deleting transaction yet, while a updated one has the old row version's one.
+        sql += ' RETURNING (xmax = 0) AS "inserted"\n'
+        return sql
     # end def
 
-    def has_changes(self) -> bool:
-        """
-        :returns: if we have unsaved changes.
+    @classmethod
+    def build_sql_bulk_upsert(
+        cls,
+        staging_table: str,
+        columns: List[str],
+        *,
+        upsert_on_conflict: Union[List[str], bool] = True,
+    ) -> Tuple[str]:
         """
-        return bool(self.get_changes())
-    # end if
+        Builds the statement moving all rows from a staging table into our table,
+        resulting in a single row with the `inserted` and `updated` counts.
 
-    async def update(self, conn: Connection) -> None:
-        """
-        Update the made changes to the database.
+        :param staging_table: Name of the temporary table, not quoted.
+        :param columns: The sql fields present in the staging table, not quoted.
+        :param upsert_on_conflict:
+            Either a boolean to set the automatic mode, or a list of fields.
+            If `True`: Will automatically use the primary key field(s) as conflict source.
+            If `False`: Will not upsert (update) but simply fail.
+            If `List[str]`: Will use those given conflicting fields.
+        :return: The SQL string as only tuple element.
+        """
+        # noinspection SqlNoDataSourceInspection,SqlResolve
+        sql = 'WITH "upserted" AS (\n'
+        sql += cls._build_sql_insert_from_staging(staging_table, columns, upsert_on_conflict=upsert_on_conflict)
+        sql += ')\n'
+        sql += 'SELECT count(*) FILTER (WHERE "inserted") AS "inserted", count(*) FILTER (WHERE NOT "inserted") AS "updated" FROM "upserted"\n'
+        sql += ';'
+        # noinspection PyRedundantParentheses
+        return (sql,)
+    # end def
+
+    @classmethod
+    @with_connection
+    async def bulk_upsert(
+        cls,
+        conn: Optional[Connection] = None,
+        rows: List[Union['_BaseFastORM', Dict[str, Any]]] = None,
+        *,
+        conflict: Union[List[str], bool] = True,
+        ignore_setting_automatic_fields: Optional[bool] = None,
+    ) -> UpsertResult:
+        """
+        Inserts or updates a lot of rows at once.
+        They are `COPY`ed into a temporary staging table first,
+        and then moved over to the actual table with a single `INSERT … SELECT … ON CONFLICT … DO UPDATE`.
+
+        Note, unlike `.insert(…)` the automatic fields are not written back to the given objects,
+        and if the same conflicting key is in there more than once, the database will refuse the whole batch.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param rows: Either instances of this class, or dicts with the parameters to construct one.
+        :param conflict:
+            List of fields which are expected to cause a duplicate conflict, and thus all the other fields will be overwritten.
+            Same as `upsert_on_conflict` of `.insert(…)`.
+            If `True`: Will automatically use the primary key field(s) as conflict source.
+            If `False`: Will not upsert (update) but simply fail.
+            If `List[str]`: Will use those given conflicting fields.
+        :param ignore_setting_automatic_fields:
+            If `True`, automatic fields are never written, so the database assigns those values.
+            If `False`, automatic fields are always written, even if they are `None`.
+            If `None`, automatic fields are left out if they are `None` in every single row.
+        :return: How many rows were inserted and how many were updated.
+        """
+        assert_type_or_raise(rows, list, tuple, parameter_name='rows')
+        assert_type_or_raise(conflict, list, bool, parameter_name="conflict")
+        columns, records = cls._bulk_prepare_records(rows, ignore_setting_automatic_fields=ignore_setting_automatic_fields)
+        if not records:
+            return UpsertResult(inserted=0, updated=0)
+        # end if
+        staging_table = cls._get_staging_table_name()
+        create_params = cls.build_sql_create_staging(staging_table=staging_table, columns=columns)
+        upsert_params = cls.build_sql_bulk_upsert(staging_table=staging_table, columns=columns, upsert_on_conflict=conflict)
+        logger.debug(f'BULK UPSERT query for {cls.__name__} with {len(records)} rows: {upsert_params[0]!r}')
+        async with conn.transaction():
+            await conn.execute(*create_params)
+            await conn.copy_records_to_table(staging_table, records=records, columns=columns)
+            counts = await conn.fetchrow(*upsert_params)
+        # end with
+        cls._row_cache_clear()
+        cls._result_cache_invalidate()
+        result = UpsertResult(inserted=counts['inserted'], updated=counts['updated'])
+        logger.debug(f'BULK UPSERT for {cls.__name__}: {result!r}')
+        return result
+    # end def
+
+    @classmethod
+    def build_sql_sync(
+        cls,
+        staging_table: str,
+        columns: List[str],
+        *,
+        use_merge: bool = False,
+        **scope: Any,
+    ) -> Tuple[Any, ...]:
+        """
+        Builds the statement making our table match the rows in a staging table,
+        resulting in a single row with the `inserted`, `updated` and `deleted` counts.
+        Rows are matched by their primary key(s), and only rows matching the `scope` filters are deleted.
+
+        :param staging_table: Name of the temporary table, not quoted.
+        :param columns: The sql fields present in the staging table, not quoted. Must include the primary key(s).
+        :param use_merge:
+            If `True`, a single `MERGE` with `WHEN NOT MATCHED BY SOURCE` and `RETURNING merge_action()` is used (Postgres 17+).
+            If `False`, an upsert and an anti-join delete are combined in one statement (works on older versions as well).
+        :param scope: Filters like for `.select(…)`, limiting which rows of our table belong to this dataset.
+        :return: The SQL string followed by positional parameters for the `conn.fetchrow(…)` method.
+        """
+        _automatic_fields = cls.get_automatic_fields()
+        _table_name = cls.get_name()
+        primary_key_fields = cls.get_primary_keys_sql_fields()
+        missing_fields = [field for field in primary_key_fields if field not in columns]
+        if missing_fields:
+            raise ValueError(f'The primary key field(s) {missing_fields!r} are needed to sync, but missing in the columns.')
+        # end if
+        scope_namespace = 'target' if use_merge else _table_name
+        where_parts, where_values, _ = cls._build_sql_where(scope, namespace=scope_namespace)
+
+        if use_merge:
+            update_columns = [column for column in columns if column not in primary_key_fields and column not in _automatic_fields]
+            match_sql = ' AND '.join(f'"target"."{field}" = "source"."{field}"' for field in primary_key_fields)
+            columns_sql = ",".join(f'"{column}"' for column in columns)
+            source_columns_sql = ",".join(f'"source"."{column}"' for column in columns)
+            scope_sql = ''.join(f' AND {where_part}' for where_part in where_parts)
+
+            # noinspection SqlNoDataSourceInspection,SqlResolve
+            sql = 'WITH "merged" AS (\n'
+            sql += f' MERGE INTO {cls.get_table()} AS "target"\n'
+            sql += f' USING "{staging_table}" AS "source"\n'
+            sql += f' ON {match_sql}\n'
+            if update_columns:
+                update_sql = ', '.join(f'"{column}" = "source"."{column}"' for column in update_columns)
+                sql += f' WHEN MATCHED THEN UPDATE SET {update_sql}\n'
+            # end if
+            sql += f' WHEN NOT MATCHED THEN INSERT ({columns_sql}) VALUES ({source_columns_sql})\n'
+            sql += f' WHEN NOT MATCHED BY SOURCE{scope_sql} THEN DELETE\n'
+            sql += ' RETURNING merge_action() AS "action"\n'
+            sql += ')\n'
+            sql += (
+                'SELECT count(*) FILTER (WHERE "action" = \'INSERT\') AS "inserted",'
+                ' count(*) FILTER (WHERE "action" = \'UPDATE\') AS "updated",'
+                ' count(*) FILTER (WHERE "action" = \'DELETE\') AS "deleted" FROM "merged"\n'
+            )
+            sql += ';'
+            # noinspection PyRedundantParentheses
+            return (sql, *where_values)
+        # end if
+
+        match_sql = ' AND '.join(f'"{staging_table}"."{field}" = "{_table_name}"."{field}"' for field in primary_key_fields)
+        delete_where_parts = where_parts + [f'NOT EXISTS (SELECT 1 FROM "{staging_table}" WHERE {match_sql})']
+
+        # All the parts of the WITH statement see the same snapshot of the table,
+        # so the delete will not see the newly inserted rows, and the updated ones are in the staging table anyway.
+        # noinspection SqlNoDataSourceInspection,SqlResolve
+        sql = 'WITH "upserted" AS (\n'
+        sql += cls._build_sql_insert_from_staging(staging_table, columns, upsert_on_conflict=True)
+        sql += '), "deleted" AS (\n'
+        sql += f' DELETE FROM {cls.get_table()}\n'
+        sql += f' WHERE {" AND ".join(delete_where_parts)}\n'
+        sql += ' RETURNING 1\n'
+        sql += ')\n'
+        sql += (
+            'SELECT count(*) FILTER (WHERE "inserted") AS "inserted",'
+            ' count(*) FILTER (WHERE NOT "inserted") AS "updated",'
+            ' (SELECT count(*) FROM "deleted") AS "deleted" FROM "upserted"\n'
+        )
+        sql += ';'
+        # noinspection PyRedundantParentheses
+        return (sql, *where_values)
+    # end def
+
+    @classmethod
+    @with_connection
+    async def sync(
+        cls,
+        conn: Optional[Connection] = None,
+        rows: List[Union['_BaseFastORM', Dict[str, Any]]] = None,
+        *,
+        use_merge: Optional[bool] = None,
+        **scope: Any,
+    ) -> SyncResult:
+        """
+        Makes the table (or the part of it matching the `scope` filters) match the given rows, in a single pass.
+        Rows are identified by their primary key(s):
+        New ones are inserted, existing ones are updated and the ones missing in `rows` are deleted.
+        The existing table is never loaded into python for that.
+
+        The rows are `COPY`ed into a temporary staging table first, and then merged into the actual table.
+        Note, all the given rows should be within the `scope`, otherwise a later sync with the same scope would not delete them.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param rows: Either instances of this class, or dicts with the parameters to construct one.
+        :param use_merge:
+            If `True`, a single `MERGE` statement is used, which needs Postgres 17 or newer.
+            If `False`, an upsert and an anti-join delete are combined in one statement instead.
+            If `None`, it's decided by the server version of the connection.
+        :param scope: Filters like for `.select(…)`, limiting which rows of our table belong to this dataset.
+        :return: How many rows were inserted, updated and deleted.
+        """
+        assert_type_or_raise(rows, list, tuple, parameter_name='rows')
+        columns, records = cls._bulk_prepare_records(rows)
+        if not records:
+            # still we need to delete everything in scope
+            columns = cls.get_primary_keys_sql_fields()
+        # end if
+        if use_merge is None:
+            use_merge = conn.get_server_version().major >= 17
+        # end if
+        staging_table = cls._get_staging_table_name()
+        create_params = cls.build_sql_create_staging(staging_table=staging_table, columns=columns)
+        sync_params = cls.build_sql_sync(staging_table=staging_table, columns=columns, use_merge=use_merge, **scope)
+        logger.debug(f'SYNC query for {cls.__name__} with {len(records)} rows: {sync_params[0]!r} with values {sync_params[1:]}')
+        async with conn.transaction():
+            await conn.execute(*create_params)
+            if records:
+                await conn.copy_records_to_table(staging_table, records=records, columns=columns)
+            # end if
+            counts = await conn.fetchrow(*sync_params)
+        # end with
+        cls._row_cache_clear()
+        cls._result_cache_invalidate()
+        result = SyncResult(inserted=counts['inserted'], updated=counts['updated'], deleted=counts['deleted'])
+        logger.debug(f'SYNC for {cls.__name__}: {result!r}')
+        return result
+    # end def
+
+    @classmethod
+    def build_sql_insert_missing(cls, columns: List[str], records: List[Tuple[Any, ...]]) -> Tuple[Any, ...]:
+        """
+        Builds a single `INSERT … ON CONFLICT DO NOTHING` for many rows, returning the primary key(s) of the rows actually inserted.
+        Every column is given as one array parameter, so the SQL string stays the same regardless of the amount of rows.
+
+        :param columns: The sql fields to insert, not quoted.
+        :param records: A tuple of values per row in the order of those columns.
+        :return: The SQL string followed by one list of values per column for the `conn.fetch(…)` method.
+        """
+        column_types = cls.get_sql_column_types()
+        array_columns = [column for column in columns if column_types[column].endswith('[]')]
+        if array_columns:
+            raise TypeError(f'Array fields can not be inserted as array parameters: {array_columns!r}')
+        # end if
+        columns_sql = ",".join(f'"{column}"' for column in columns)
+        unnest_sql = ", ".join(f'${i}::{column_types[column]}[]' for i, column in enumerate(columns, start=1))
+        primary_keys_sql = ", ".join(f'"{field}"' for field in cls.get_primary_keys_sql_fields())
+        values = [list(column_values) for column_values in zip(*records)] if records else [[] for _ in columns]
+
+        # noinspection SqlNoDataSourceInspection,SqlResolve
+        sql = f'INSERT INTO {cls.get_table()} ({columns_sql})\n'
+        sql += f' SELECT * FROM unnest({unnest_sql})\n'
+        sql += ' ON CONFLICT DO NOTHING\n'
+        sql += f' RETURNING {primary_keys_sql}\n'
+        sql += ';'
+        # noinspection PyRedundantParentheses
+        return (sql, *values)
+    # end def
+
+    @classmethod
+    @with_connection
+    async def insert_missing(
+        cls: Union[Type[CLS_TYPE], 'FastORM'],
+        conn: Optional[Connection] = None,
+        objects: List[Union[CLS_TYPE, Dict[str, Any]]] = None,
+        *,
+        batch_size: int = 1000,
+    ) -> List[CLS_TYPE]:
+        """
+        Inserts the given objects, unless they are already existing.
+        One statement is sent per batch, and duplicates don't cost any additional database round trips.
+
+        The objects are matched with the database by their primary key(s), so those have to be set.
+        The new objects will have their database cache set, like after `.insert(…)`.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param objects: Either instances of this class, or dicts with the parameters to construct one.
+        :param batch_size: How many objects to send per statement.
+        :return: The objects which were actually new, in the same order as given.
+        """
+        assert_type_or_raise(objects, list, tuple, parameter_name='objects')
+        objects = [obj if isinstance(obj, cls) else cls(**obj) for obj in objects]
+        primary_key_fields = cls.get_primary_keys_sql_fields()
+        new_objects = []
+        for batch_start in range(0, len(objects), batch_size):
+            batch = objects[batch_start:batch_start + batch_size]
+            columns, records = cls._bulk_prepare_records(batch)
+            missing_fields = [field for field in primary_key_fields if field not in columns]
+            if missing_fields:
+                raise ValueError(f'The primary key field(s) {missing_fields!r} must be set to find the missing ones.')
+            # end if
+            key_positions = [columns.index(field) for field in primary_key_fields]
+            fetch_params = cls.build_sql_insert_missing(columns=columns, records=records)
+            logger.debug(f'INSERT MISSING query for {cls.__name__} with {len(records)} rows: {fetch_params[0]!r}')
+            inserted_rows = await conn.fetch(*fetch_params)
+            inserted_keys = {tuple(row[field] for field in primary_key_fields) for row in inserted_rows}
+            for obj, record in zip(batch, records):
+                key = tuple(record[position] for position in key_positions)
+                if key not in inserted_keys:
+                    continue
+                # end if
+                inserted_keys.remove(key)  # if the same key is given twice, only the first one was new.
+                obj._database_cache_overwrite_with_current()
+                new_objects.append(obj)
+            # end for
+            cls._result_cache_invalidate()
+        # end for
+        logger.debug(f'INSERT MISSING for {cls.__name__}: {len(new_objects)} of {len(objects)} rows were new.')
+        return new_objects
+    # end def
+
+    @classmethod
+    def _build_sql_set(
+        cls,
+        prepared_sql_fields: List[Dict[str, SqlFieldMeta]],
+        placeholder_index: int,
+    ) -> Tuple[List[str], List[Any], int, List[str]]:
+        """
+        Builds the assignments of the `SET` part of an `UPDATE` statement.
+        Values which are server side expressions (e.g. `Inc(1)`) are compiled into sql, the others get placeholders.
+
+        :param prepared_sql_fields: The result of `_prepare_kwargs(…)`.
+        :param placeholder_index: The last already used placeholder.
+        :return: The assignments (e.g. `"foo" = $1`), the values of the used placeholders,
+                 the last used placeholder index and the sql fields which got assigned a server side expression
+                 we need to know the resulting value of.
+
+        :used-by: build_sql_update, build_sql_update_where
+        """
+        values: List[Any] = []
+        update_keys: List[str] = []  # "foo" = $1
+        expression_fields: List[str] = []
+        for sql_fields in prepared_sql_fields:
+            sql_fields: Dict[str, SqlFieldMeta]
+            if len(sql_fields) == 1 and isinstance(list(sql_fields.values())[0].value, Expression):
+                long_key, sql_meta = list(sql_fields.items())[0]
+                expression_sql, values_list, placeholder_index = sql_meta.value.build_sql(field=long_key, placeholder_index=placeholder_index)
+                values.extend(values_list)
+                update_keys.append(f'"{long_key}" = {expression_sql}')
+                if sql_meta.value.needs_write_back:
+                    expression_fields.append(long_key)
+                # end if
+                continue
+            # end if
+            key_string, placeholder_string, values_list, placeholder_index = cls._prepared_dict_to_sql(sql_variable_dict=sql_fields, placeholder_index=placeholder_index)
+            values.extend(sql_meta.value for sql_meta in values_list)
+            update_keys.append(f'{key_string} = {placeholder_string}')
+        # end for
+        return update_keys, values, placeholder_index, expression_fields
+    # end def
+
+    @classmethod
+    def _get_returning_sql_fields(cls, returning: Union[bool, List[str]]) -> List[str]:
+        """
+        Resolves the `returning` parameter to the sql fields to put into a `RETURNING` clause.
+
+        :param returning:
+            If `True`: All the fields.
+            If `False`: None at all.
+            If `List[str]`: Those fields. References to other tables are expanded to all their sql fields.
+        :return: The sql field names, not quoted.
+        """
+        if returning is True:
+            return cls.get_sql_fields()
+        elif returning is False:
+            return []
+        # end if
+        typehints = cls.get_fields_references(recursive=True)
+        sql_fields: List[str] = []
+        for field in returning:
+            if field in typehints:
+                sql_fields.append(field)
+                continue
+            # end if
+            long_keys = [long_key for long_key, typehint in typehints.items() if typehint.unflattened_field == field]
+            if not long_keys:
+                raise ValueError(f'Unknown field to return: {field!r}')
+            # end if
+            sql_fields.extend(long_keys)
+        # end for
+        return sql_fields
+    # end def
+
+    def build_sql_update(self, *, returning: Union[bool, List[str]] = False):
+        """
+        Builds a prepared SQL statement for update.
         Only fields with changed values will be updated in the database.
+        However this one doesn't resets the cache for those, see `FastORM.update(…)` for that.
+
+        Fields set to a server side expression (e.g. `Inc(1)`) are additionally listed in a `RETURNING` clause.
+        If the class has a `_version_field`, the row must still have the version we know, and it is counted up.
+
+        The compiled sql is cached per combination of changed fields, see `get_sql_update_cache()`,
+        so for already seen combinations only the values are collected.
+
+        :param returning:
+            Fields to additionally return the values of after the update, e.g. to get values set by triggers.
+            If `True`: All the fields.
+            If `False`: Only the ones set to a server side expression.
+            If `List[str]`: Those fields, and the ones set to a server side expression.
+        :return: The SQL string followed by positional parameters for the `conn.execute(…)` method.
+        :raises ValueError: If there are no changes to update. A changed `_version_field` alone doesn't count.
+        """
+        # SET ...
+        update_values = self.get_changes()
+        set_values = self._get_jsonb_patched_changes(update_values)
+        version_field = getattr(self, '_version_field')
+        if version_field is not None:
+            # the version is only ever counted up by the database.
+            set_values = {key: value for key, value in set_values.items() if key != version_field}
+        # end if
+        if not set_values:
+            raise ValueError(f'There are no changes to update for {self!r}.')
+        # end if
+        if version_field is not None:
+            set_values[version_field] = Inc(1)
+        # end if
+        prepared_sql_fields = self._prepare_kwargs(**set_values, _allow_in=False, _allow_expressions=True)
+
+        sql_update_cache = self.get_sql_update_cache()
+        cache_key = self._get_sql_update_cache_key(prepared_sql_fields, returning=returning)
+        sql = sql_update_cache.get(cache_key)
+        if sql is None:
+            sql = self._build_sql_update_statement(prepared_sql_fields, returning=returning)
+            sql_update_cache.set(cache_key, sql)
+        # end if
+        values = self._get_sql_update_values(prepared_sql_fields)
+        logger.debug(f'Fields to UPDATE for {self.__class__.__name__}: {update_values!r}')
+
+        # noinspection PyRedundantParentheses
+        return (sql, *values)
+    # end def
+
+    @classmethod
+    def _build_sql_update_statement(cls, prepared_sql_fields: List[Dict[str, SqlFieldMeta]], *, returning: Union[bool, List[str]]) -> str:
+        """
+        Compiles the sql of `build_sql_update(…)`, without collecting any values.
+
+        :param prepared_sql_fields: The result of `_prepare_kwargs(…)` of the values to set.
+        :param returning: See `build_sql_update(…)`.
+        :return: The SQL string.
+        """
+        _table_name = getattr(cls, '_table_name')
+        _primary_keys = getattr(cls, '_primary_keys')
+        _automatic_fields = cls.get_automatic_fields()
+        assert_type_or_raise(_table_name, str, parameter_name='cls._table_name')
+        assert_type_or_raise(_primary_keys, list, parameter_name='cls._primary_keys')
+        assert_type_or_raise(_automatic_fields, list, parameter_name='cls._automatic_fields')
+
+        # UPDATE ... SET ... WHERE ...
+        update_keys, _, placeholder_index, expression_fields = cls._build_sql_set(prepared_sql_fields, placeholder_index=0)
+
+        # WHERE pk...
+        primary_key_where: List[str] = []  # "foo" = $1
+        for primary_key in _primary_keys:
+            placeholder_index += 1
+            primary_key_where.append(f'"{primary_key}" = ${placeholder_index}')
+        # end if
+        version_field = getattr(cls, '_version_field')
+        if version_field is not None:
+            placeholder_index += 1
+            primary_key_where.append(f'"{version_field}" = ${placeholder_index}')
+        # end if
+
+        if not update_keys:
+            raise ValueError('There are no fields to update.')
+        # end if
+        sql = f'UPDATE "{_table_name}"\n'
+        sql += f' SET {",".join(update_keys)}\n'
+        sql += f' WHERE {" AND ".join(primary_key_where)}\n'
+        # for expression fields we always need to know what the server calculated.
+        returning_fields = cls._get_returning_sql_fields(returning)
+        returning_fields += [field for field in expression_fields if field not in returning_fields]
+        if returning_fields:
+            returning_sql = ', '.join(f'"{field}"' for field in returning_fields)
+            sql += f' RETURNING {returning_sql}\n'
+        # end if
+        sql += ';'
+        return sql
+    # end def
+
+    def _get_sql_update_values(self, prepared_sql_fields: List[Dict[str, SqlFieldMeta]]) -> List[Any]:
+        """
+        Collects the placeholder values for the sql of `_build_sql_update_statement(…)`, in the same order.
+
+        :param prepared_sql_fields: The result of `_prepare_kwargs(…)` of the values to set.
+        :return: The values for the placeholders.
+        """
+        _database_cache = getattr(self, '_database_cache')
+        values: List[Any] = []
+        placeholder_index = 0
+        for sql_fields in prepared_sql_fields:
+            sql_fields: Dict[str, SqlFieldMeta]
+            if len(sql_fields) == 1 and isinstance(list(sql_fields.values())[0].value, Expression):
+                long_key, sql_meta = list(sql_fields.items())[0]
+                _, values_list, placeholder_index = sql_meta.value.build_sql(field=long_key, placeholder_index=placeholder_index)
+                values.extend(values_list)
+                continue
+            # end if
+            values.extend(sql_meta.value for sql_meta in sql_fields.values())
+            placeholder_index += len(sql_fields)
+        # end for
+        for primary_key in getattr(self, '_primary_keys'):
+            if primary_key in _database_cache:
+                values.append(_database_cache[primary_key])
+            else:
+                values.append(getattr(self, primary_key))
+            # end if
+        # end for
+        if getattr(self, '_version_field') is not None:
+            values.append(self._get_known_version())
+        # end if
+        return values
+    # end def
+
+    @classmethod
+    def _get_sql_update_cache_key(
+        cls,
+        prepared_sql_fields: List[Dict[str, SqlFieldMeta]],
+        *,
+        returning: Union[bool, List[str]],
+    ) -> Optional[Tuple[frozenset, Union[bool, Tuple[str, ...]]]]:
+        """
+        Everything the sql of `_build_sql_update_statement(…)` depends on,
+        i.e. the set fields (and the kind of expression, if any) and what to return.
+
+        :return: The hashable key, or `None` if an expression prevents caching, e.g. a `JsonbPatch`.
+        """
+        key_parts = []
+        for sql_fields in prepared_sql_fields:
+            sql_fields: Dict[str, SqlFieldMeta]
+            value = list(sql_fields.values())[0].value
+            if len(sql_fields) == 1 and isinstance(value, Expression):
+                expression_key = value.sql_cache_key
+                if expression_key is None:
+                    return None
+                # end if
+                key_parts.append((tuple(sql_fields.keys()), expression_key))
+                continue
+            # end if
+            key_parts.append((tuple(sql_fields.keys()), None))
+        # end for
+        returning_key = returning if isinstance(returning, bool) else tuple(returning)
+        return frozenset(key_parts), returning_key
+    # end def
+
+    @classmethod
+    def get_sql_update_cache(cls) -> StatementCache:
+        """
+        The cache of compiled `UPDATE` statements of this class, see `build_sql_update(…)`.
+        Has the `hits`, `misses` and `hit_rate` statistics.
+        """
+        key = f'_{cls.__name__!s}__sql_update_cache'
+        if getattr(cls, key, None) is None:
+            setattr(cls, key, StatementCache(max_size=getattr(cls, '_sql_update_cache_size')))
+        # end if
+        return getattr(cls, key)
+    # end def
+
+    @classmethod
+    def get_row_cache(cls) -> Optional[RowCache]:
+        """
+        The cache of rows by primary key of this class, if it has a `_cache = CacheConfig(…)`.
+        Used by `get(…)` and `get_many(…)`, and invalidated by the changes done with this class.
+        Changes of other processes aren't noticed, those are only picked up after the `ttl`.
+        Has the `hits`, `misses` and `hit_rate` statistics.
+        """
+        config = getattr(cls, '_cache')
+        if config is None:
+            return None
+        # end if
+        key = f'_{cls.__name__!s}__row_cache'
+        if getattr(cls, key, None) is None:
+            assert_type_or_raise(config, CacheConfig, parameter_name='_cache')
+            setattr(cls, key, RowCache(config))
+            cache.register_notified(cls.get_name(), cls._row_cache_evict_notified)
+        # end if
+        return getattr(cls, key)
+    # end def
+
+    @classmethod
+    def _row_cache_evict_notified(cls, key_values: Optional[List[Any]]) -> None:
+        """
+        Evicts a row changed by somebody else, as notified by the triggers of `build_sql_create_notify_trigger()`.
+
+        :param key_values: The primary key values in the order of `get_primary_keys_sql_fields()`, as json.
+                           `None` to evict everything.
+        """
+        row_cache = cls.get_row_cache()
+        if key_values is None:
+            row_cache.clear()
+            return
+        # end if
+        # json doesn't have all the types, e.g. UUIDs are strings there.
+        row_cache.invalidate(cls._parse_row_cache_key(key_values))
+    # end def
+
+    @classmethod
+    def _parse_row_cache_key(cls, key_values: Iterable[Any]) -> Tuple[Any, ...]:
+        """
+        Parses primary key values like the model fields would, so e.g. a UUID given as string is the same key as the UUID.
+        For flattened references (`"owner__id"`) that's the field of the referenced class.
+        Values the field doesn't accept are kept as they are.
+
+        :param key_values: The primary key values in the order of `get_primary_keys_sql_fields()`.
+        :return: The key for the row cache.
+        """
+        typehints = cls.get_fields_typehints(flatten_table_references=True)
+        key = []
+        for column, value in zip(cls.get_primary_keys_sql_fields(), key_values):
+            field_info = typehints.get(column)
+            if field_info is not None and value is not None:
+                model_field: ModelField = field_info.resulting_type
+                parsed_value, errors = model_field.validate(value, {}, loc=column)
+                if not errors:
+                    value = parsed_value
+                # end if
+            # end if
+            key.append(value)
+        # end for
+        return tuple(key)
+    # end def
+
+    @classmethod
+    def _get_row_cache_key(cls, sql_fields: List[SqlFieldMeta[Any]]) -> Optional[Tuple[Any, ...]]:
+        """
+        :param sql_fields: The flattened fields, see `_prepare_kwargs_flattened(…)`.
+        :return: The primary key values in the order of `get_primary_keys_sql_fields()`,
+                 or `None` if those aren't exactly the primary keys.
+        """
+        values = {sql_meta.sql_name: sql_meta.value for sql_meta in sql_fields}
+        primary_keys = cls.get_primary_keys_sql_fields()
+        if set(values) != set(primary_keys) or any(value is None for value in values.values()):
+            return None
+        # end if
+        key = cls._parse_row_cache_key(values[column] for column in primary_keys)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        # end try
+        return key
+    # end def
+
+    @classmethod
+    def _get_row_cache_key_of_filters(cls, filters: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        """
+        The row cache key for `get(**filters)`, or `None` if those aren't just the primary keys.
+        """
+        if any(isinstance(value, (In, list)) for value in filters.values()):
+            return None
+        # end if
+        try:
+            sql_fields = cls._prepare_kwargs_flattened(**filters)
+        except (TypeError, ValueError):
+            return None  # let `select(…)` raise the proper error.
+        # end try
+        return cls._get_row_cache_key(sql_fields)
+    # end def
+
+    def _row_cache_invalidate(self) -> None:
+        """
+        Removes this row from the row cache, after it got changed.
+        """
+        row_cache = self.get_row_cache()
+        if row_cache is None:
+            return
+        # end if
+        key = self._get_row_cache_key(self._get_known_primary_key_sql_fields())
+        if key is not None:
+            row_cache.invalidate(key)
+            # in a transaction, others could cache the old row again until it's committed.
+            connection.after_commit(lambda: row_cache.invalidate(key))
+        # end if
+    # end def
+
+    @classmethod
+    def _row_cache_clear(cls) -> None:
+        """
+        Empties the row cache, after rows not known by their primary key were changed.
+        """
+        row_cache = cls.get_row_cache()
+        if row_cache is not None:
+            row_cache.clear()
+            connection.after_commit(row_cache.clear)
+        # end if
+    # end def
+
+    @classmethod
+    def get_result_cache(cls) -> Optional[ResultCache]:
+        """
+        The query result cache used by `select(…)` (and thus `get(…)`) of this class, if it has `_cache_results = True`.
+        It's shared by all the classes, with a memory budget set by `FastORM.configure_result_cache(…)`.
+        The results are dropped whenever one of the tables they depend on (see `_get_result_cache_tables()`) is written to by any class.
+        Changes of other processes are only picked up after the `ttl`, except for updates and deletes
+        of `CacheConfig(notify=True)` classes while a `CacheListener` runs. Inserts of other processes are never notified.
+        Has the `hits`, `misses` and `hit_rate` statistics.
+        """
+        if not getattr(cls, '_cache_results'):
+            return None
+        # end if
+        return cache.get_result_cache()
+    # end def
+
+    @classmethod
+    def _get_result_cache_tables(cls) -> Set[str]:
+        """
+        The tables the results of `select(…)` depend on: This one, and the ones referenced (recursively),
+        as deleting there cascades to this table (see `build_sql_references()`).
+        """
+        key = f'_{cls.__name__!s}__result_cache_tables'
+        if getattr(cls, key, None) is None:
+            tables = {cls.get_name()}
+            for typehint in cls.get_fields_references(recursive=True).values():
+                for field_item in typehint.types:
+                    if failsafe_issubclass(field_item.type_, FastORM):
+                        tables.add(field_item.type_.get_name())
+                    # end if
+                # end for
+            # end for
+            setattr(cls, key, tables)
+        # end if
+        return getattr(cls, key)
+    # end def
+
+    @classmethod
+    def _result_cache_invalidate(cls) -> None:
+        """
+        Drops the cached query results depending on this table, after it was written to.
+        Done regardless of `_cache_results`, as other classes could depend on this table.
+        In a `Transaction` that's done again after the commit, as others could cache the old results until then.
+        """
+        tables = [cls.get_name()]
+        cache.get_result_cache().invalidate_tables(tables)
+        connection.after_commit(lambda: cache.get_result_cache().invalidate_tables(tables))
+    # end def
+
+    def _get_jsonb_patched_changes(self, update_values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replaces changed json objects with a `JsonbPatch` of only the changed paths,
+        so a single changed key doesn't rewrite the whole document.
+        If more than `_jsonb_patch_max_changes` paths changed, the full document is sent instead.
+        Only `JSONB` columns are patched, others (e.g. `JSON`) always get the full document.
+        Set `_jsonb_patch_max_changes = 0` on the class to never patch.
+
+        Note, the diff is against the `_database_cache`, so changing a dict in place (instead of assigning a new one)
+        isn't noticed as change at all.
+
+        :param update_values: The result of `get_changes()`.
+        :return: The same values, with changed json objects replaced by patches where feasible.
+        """
+        max_changes = getattr(self, '_jsonb_patch_max_changes')
+        if not max_changes:
+            return update_values
+        # end if
+        _database_cache = self._database_cache
+        column_types = self.get_sql_column_types()
+        patched_values: Dict[str, Any] = {}
+        for key, value in update_values.items():
+            old_value = _database_cache.get(key, None)
+            if isinstance(old_value, dict) and isinstance(value, dict) and column_types.get(key) == 'JSONB':
+                patch = JsonbPatch.from_diff(old_value, value, max_changes=max_changes)
+                if patch is not None:
+                    logger.debug(f'Patching {len(patch)} paths of JSONB field {key!r} instead of replacing it.')
+                    value = patch
+                # end if
+            # end if
+            patched_values[key] = value
+        # end for
+        return patched_values
+    # end def
+
+    def get_changes(self) -> Dict:
+        """
+        Returns all values which got changed and are now different to the last downloaded database version.
+        """
+        own_keys = self.get_fields()
+        _database_cache = self._database_cache
+        _ignored_fields = self.get_ignored_fields()
+        assert_type_or_raise(own_keys, list, parameter_name='own_keys')
+        assert_type_or_raise(_database_cache, dict, parameter_name='self._database_cache')
+        assert_type_or_raise(_ignored_fields, list, parameter_name='self._ignored_fields')
+
+        update_values: Dict[str, Any] = {}
+        for key in own_keys:
+            if key.startswith('_') or key in _ignored_fields:
+                continue
+            # end if
+            value = getattr(self, key)
+            if key not in _database_cache:
+                update_values[key] = value
+            elif _database_cache[key] != value:
+                update_values[key] = value
+            # end if
+        # end if
+        return update_values
+    # end def
+
+    def has_changes(self) -> bool:
+        """
+        :returns: if we have unsaved changes.
+        """
+        return bool(self.get_changes())
+    # end if
+
+    @with_connection
+    async def update(self, conn: Optional[Connection] = None, *, returning: Union[bool, List[str]] = False) -> None:
+        """
+        Update the made changes to the database.
+        Only fields with changed values will be updated in the database.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param returning:
+            Fields to load back from the database after the update, e.g. ones changed by triggers or generated columns.
+            Saves running a `.get(…)` afterwards.
+            If `True`: All the fields.
+            If `False`: Only the ones set to a server side expression (e.g. `Inc(1)`).
+            If `List[str]`: Those fields, and the ones set to a server side expression.
+
+        :raises StaleObjectError: If the class has a `_version_field` and the row was changed or deleted by somebody else.
+
+        :uses: FastORM.build_sql_update()
+        """
+        if not getattr(self, '_database_cache', None):
+            return  # nothing to do.
+        # end if
+        assert_type_or_raise(returning, list, bool, parameter_name="returning")
+        changes = self.get_changes()
+        version_field = getattr(self, '_version_field')
+        if not any(key != version_field for key in changes):
+            return  # nothing to do, the version is only ever counted up by the database.
+        # end if
+        expression_fields = [key for key, value in changes.items() if isinstance(value, Expression)]
+        fetch_params = self.build_sql_update(returning=returning)
+        logger.debug(f'UPDATE query for {self.__class__.__name__}: {fetch_params!r}')
+        if not returning and not expression_fields and version_field is None:
+            update_status = await conn.execute(*fetch_params)
+            logger.debug(f'UPDATE for {self.__class__.__name__}: {update_status} for {self}')
+            self._row_cache_invalidate()
+            self._result_cache_invalidate()
+            self._database_cache_overwrite_with_current()
+            return
+        # end if
+        updated_row = await conn.fetchrow(*fetch_params)
+        logger.debug(f'UPDATE for {self.__class__.__name__}: {updated_row} for {self}')
+        if updated_row is None and version_field is not None:
+            raise self._get_stale_object_error()
+        # end if
+        self._row_cache_invalidate()
+        self._result_cache_invalidate()
+        self._database_cache_overwrite_with_current()
+        if updated_row is not None:
+            self._write_back_returned_row(updated_row)
+        # end if
+    # end if
+
+    def _write_back_returned_row(self, row: Union[Record, Dict[str, Any]]) -> None:
+        """
+        Applies the values returned by the database (via `RETURNING`) to this object and it's database cache.
+
+        :param row: The returned row, the keys being the sql fields.
+        """
+        row_data = dict(row)
+        processed = self._prepare_kwargs_flattened(**row_data)
+        # the columns of a reference must be set together, as one value.
+        for field_name, value in self._group_flattened_values(processed).items():
+            setattr(self, field_name, value)
+            self._database_cache[field_name] = value
+        # end for
+    # end def
+
+    def build_sql_delete(self):
+        """
+        Builds a prepared SQL statement to delete this row.
+        If the class has a `_soft_delete_field`, that's an `UPDATE` setting that field instead.
+
+        :return: The SQL string followed by positional parameters for the `conn.execute(…)` method.
+        """
+        _database_cache = self._database_cache
+        assert_type_or_raise(_database_cache, dict, parameter_name='self._database_cache')
+
+        # DELETE FROM "name" WHERE pk...
+        where_values = []
+        placeholder_index = 0
+        primary_key_parts: List[str] = []  # "foo" = $1
+        new_fields = self._get_known_primary_key_sql_fields()
+
+        # built where tuples for which rows to delete
+        for sql_field_meta in new_fields:
+            placeholder_index += 1
+            primary_key_parts.append(f'"{sql_field_meta.sql_name}" = ${placeholder_index}')
+            where_values.append(sql_field_meta.value)
+        # end if
+        version_field = getattr(self, '_version_field')
+        if version_field is not None:
+            placeholder_index += 1
+            primary_key_parts.append(f'"{version_field}" = ${placeholder_index}')
+            where_values.append(self._get_known_version())
+        # end if
+        logger.debug(f'Fields to DELETE for selector {primary_key_parts!r}: {where_values!r}')
+
+        if getattr(self, '_soft_delete_field') is not None:
+            # noinspection SqlResolve,SqlNoDataSourceInspection
+            sql = f'UPDATE {self.get_table()}\n'
+            sql += f' SET {",".join(self._build_sql_soft_delete_set())}\n'
+            sql += f' WHERE {" AND ".join(primary_key_parts)}'
+            sql += '\n;'
+            # noinspection PyRedundantParentheses
+            return (sql, *where_values)
+        # end if
+
+        # noinspection SqlWithoutWhere,SqlResolve,SqlNoDataSourceInspection
+        sql = f'DELETE FROM {self.get_table()}\n'
+        sql += f' WHERE {" AND ".join(primary_key_parts)}'
+        sql += '\n;'
+        # noinspection PyRedundantParentheses
+        return (sql, *where_values)
+    # end def
+
+    @classmethod
+    def _build_sql_soft_delete_set(cls) -> List[str]:
+        """
+        The `SET` parts marking rows as deleted, for classes with a `_soft_delete_field`. Counts up the `_version_field`, too.
+        """
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        version_field = getattr(cls, '_version_field')
+        update_keys = [f'"{soft_delete_field}" = TRUE']
+        if version_field is not None:
+            update_keys.append(f'"{version_field}" = "{version_field}" + 1')
+        # end if
+        return update_keys
+    # end def
+
+    def _get_known_primary_key_sql_fields(self) -> List[SqlFieldMeta[Any]]:
+        """
+        The primary key(s) as last loaded from the database, flattened to the sql fields.
+        """
+        _database_cache = self._database_cache
+        typehints = self.get_fields_typehints(flatten_table_references=True)
+        kwargs = {}
+
+        # collect data
+        for primary_key_long, field_info in typehints.items():
+            if not field_info.is_primary_key:
+                continue
+            # end if
+            primary_key_short = field_info.unflattened_field
+            if primary_key_long in _database_cache:
+                kwargs[primary_key_long] = _database_cache[primary_key_long]
+            elif primary_key_short in _database_cache:
+                kwargs[primary_key_short] = _database_cache[primary_key_short]
+            else:
+                kwargs[primary_key_short] = getattr(self, primary_key_short)
+            # end if
+        # end for
+
+        # make sure we do allow all reference formats in the data. (e.g. Tuples and TableObjects)
+        return self._prepare_kwargs_flattened(**kwargs)
+    # end def
+
+    @with_connection
+    async def delete(self, conn: Optional[Connection] = None):
+        """
+        Deletes this row from the database.
+        If the class has a `_soft_delete_field`, the row is only marked as deleted.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :raises StaleObjectError: If the class has a `_version_field` and the row was changed or deleted by somebody else.
+        """
+        fetch_params = self.build_sql_delete()
+        logger.debug(f'DELETE query for {self.__class__.__name__}: {fetch_params!r}')
+        delete_status = await conn.execute(*fetch_params)
+        logger.debug(f'DELETE for {self.__class__.__name__}: {delete_status} for {self}')
+        if getattr(self, '_version_field') is not None and self._get_status_row_count(delete_status) == 0:
+            raise self._get_stale_object_error()
+        # end if
+        soft_delete_field = getattr(self, '_soft_delete_field')
+        if soft_delete_field is not None:
+            setattr(self, soft_delete_field, True)
+        # end if
+        self._row_cache_invalidate()
+        self._result_cache_invalidate()
+        self._database_cache_remove()
+    # end if
+
+    def _get_stale_object_error(self) -> StaleObjectError:
+        """
+        The error for when a row with a `_version_field` wasn't matched with the loaded version.
+        """
+        return StaleObjectError(
+            f'{self.__class__.__name__} {self.get_primary_keys()!r} with version {self._get_known_version()!r}'
+            f' was changed or deleted in the meantime.'
+        )
+    # end def
+
+    def _get_known_version(self) -> Any:
+        """
+        The value of the `_version_field` as last loaded from the database.
+        """
+        version_field = getattr(self, '_version_field')
+        _database_cache = getattr(self, '_database_cache', None) or {}
+        if version_field in _database_cache:
+            return _database_cache[version_field]
+        # end if
+        return getattr(self, version_field)
+    # end def
+
+    @staticmethod
+    def _get_status_row_count(status: str) -> int:
+        """
+        Parses the affected row count from a command status like `'UPDATE 42'` or `'INSERT 0 1'`.
+        """
+        return int(status.rsplit(' ', 1)[-1])
+    # end def
+
+    @classmethod
+    def _build_sql_returning_primary_keys(cls, returning: bool) -> str:
+        if not returning:
+            return ''
+        # end if
+        primary_keys_sql = ", ".join(f'"{field}"' for field in cls.get_primary_keys_sql_fields())
+        return f' RETURNING {primary_keys_sql}\n'
+    # end def
+
+    @classmethod
+    def build_sql_update_where(cls, set_values: Dict[str, Any], *, returning: bool = False, **filters: Any) -> Tuple[Any, ...]:
+        """
+        Builds a `UPDATE` statement for all rows matching the filters, without loading them first.
+
+        If the class has a `_version_field`, it is counted up as well, unless you set it yourself.
+        If the class has a `_soft_delete_field`, deleted rows are left alone, unless you filter by that field yourself, like for `.select(…)`.
+
+        :param set_values: The new values, key being the python model field.
+                           References and datetimes are handled like everywhere else,
+                           and server side expressions like `Inc(1)` can be used as well.
+        :param returning: If the primary key(s) of the updated rows should be returned.
+        :param filters: Filters like for `.select(…)`.
+        :return: The SQL string followed by positional parameters for the `conn.execute(…)` method.
+        """
+        if not set_values:
+            raise ValueError('Nothing to set.')
+        # end if
+        version_field = getattr(cls, '_version_field')
+        if version_field is not None and version_field not in set_values:
+            set_values = {**set_values, version_field: Inc(1)}
+        # end if
+        prepared_sql_fields = cls._prepare_kwargs(**set_values, _allow_in=False, _allow_expressions=True)
+        update_keys, values, placeholder_index, _ = cls._build_sql_set(prepared_sql_fields, placeholder_index=0)
+        where_parts, where_values, placeholder_index = cls._build_sql_where(filters, placeholder_index=placeholder_index)
+        values.extend(where_values)
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        if soft_delete_field is not None and soft_delete_field not in filters:
+            where_parts.append(f'NOT "{soft_delete_field}"')
+        # end if
+
+        # noinspection SqlResolve,SqlNoDataSourceInspection
+        sql = f'UPDATE {cls.get_table()}\n'
+        sql += f' SET {",".join(update_keys)}\n'
+        if where_parts:
+            sql += f' WHERE {" AND ".join(where_parts)}\n'
+        # end if
+        sql += cls._build_sql_returning_primary_keys(returning)
+        sql += ';'
+        # noinspection PyRedundantParentheses
+        return (sql, *values)
+    # end def
+
+    @classmethod
+    @with_connection
+    async def update_where(
+        cls,
+        conn: Optional[Connection] = None,
+        set: Dict[str, Any] = None,
+        *,
+        returning: bool = False,
+        **filters: Any,
+    ) -> Union[int, List[Record]]:
+        """
+        Updates all rows matching the filters in a single statement, without loading them first.
+
+            await Auction.update_where(conn, set={'state': State.COMPLETED}, state=State.RUNNING)
+
+        Note, already loaded objects of those rows will not know about that change.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param set: The new values, key being the python model field.
+        :param returning: If the primary key(s) of the updated rows should be returned instead of the count.
+        :param filters: Filters like for `.select(…)`.
+        :return: The amount of updated rows, or if `returning` is set the primary key(s) of those rows.
+        """
+        assert_type_or_raise(set, dict, parameter_name='set')
+        fetch_params = cls.build_sql_update_where(set, returning=returning, **filters)
+        logger.debug(f'UPDATE WHERE query for {cls.__name__}: {fetch_params[0]!r} with values {fetch_params[1:]}')
+        if returning:
+            rows = await conn.fetch(*fetch_params)
+            cls._row_cache_clear()
+            cls._result_cache_invalidate()
+            return rows
+        # end if
+        update_status = await conn.execute(*fetch_params)
+        logger.debug(f'UPDATE WHERE for {cls.__name__}: {update_status}')
+        cls._row_cache_clear()
+        cls._result_cache_invalidate()
+        return cls._get_status_row_count(update_status)
+    # end def
+
+    @classmethod
+    def build_sql_delete_where(cls, *, returning: bool = False, **filters: Any) -> Tuple[Any, ...]:
+        """
+        Builds a `DELETE` statement for all rows matching the filters, without loading them first.
+        If the class has a `_soft_delete_field`, that's an `UPDATE` setting that field for the rows not deleted yet instead.
+
+        :param returning: If the primary key(s) of the deleted rows should be returned.
+        :param filters: Filters like for `.select(…)`.
+        :return: The SQL string followed by positional parameters for the `conn.execute(…)` method.
+        """
+        where_parts, where_values, _ = cls._build_sql_where(filters)
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        if soft_delete_field is not None:
+            where_parts.append(f'NOT "{soft_delete_field}"')
+            # noinspection SqlResolve,SqlNoDataSourceInspection
+            sql = f'UPDATE {cls.get_table()}\n'
+            sql += f' SET {",".join(cls._build_sql_soft_delete_set())}\n'
+        else:
+            # noinspection SqlWithoutWhere,SqlResolve,SqlNoDataSourceInspection
+            sql = f'DELETE FROM {cls.get_table()}\n'
+        # end if
+        if where_parts:
+            sql += f' WHERE {" AND ".join(where_parts)}\n'
+        # end if
+        sql += cls._build_sql_returning_primary_keys(returning)
+        sql += ';'
+        # noinspection PyRedundantParentheses
+        return (sql, *where_values)
+    # end def
+
+    @classmethod
+    @with_connection
+    async def delete_where(cls, conn: Optional[Connection] = None, *, returning: bool = False, **filters: Any) -> Union[int, List[Record]]:
+        """
+        Deletes all rows matching the filters in a single statement, without loading them first.
+        Careful, without any filters that's the whole table.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param returning: If the primary key(s) of the deleted rows should be returned instead of the count.
+        :param filters: Filters like for `.select(…)`.
+        :return: The amount of deleted rows, or if `returning` is set the primary key(s) of those rows.
+        """
+        fetch_params = cls.build_sql_delete_where(returning=returning, **filters)
+        logger.debug(f'DELETE WHERE query for {cls.__name__}: {fetch_params[0]!r} with values {fetch_params[1:]}')
+        if returning:
+            rows = await conn.fetch(*fetch_params)
+            cls._row_cache_clear()
+            cls._result_cache_invalidate()
+            return rows
+        # end if
+        delete_status = await conn.execute(*fetch_params)
+        logger.debug(f'DELETE WHERE for {cls.__name__}: {delete_status}')
+        cls._row_cache_clear()
+        cls._result_cache_invalidate()
+        return cls._get_status_row_count(delete_status)
+    # end def
 
-        :uses: FastORM.build_sql_update()
+    @classmethod
+    def _get_primary_key_arrays(cls, keys: List[Tuple[Any, ...]]) -> Tuple[List[str], Dict[str, str], List[List[Any]]]:
         """
-        if not getattr(self, '_database_cache', None):
-            return  # nothing to do.
+        Turns the primary key tuples of many rows into one array of values per primary key field.
+
+        :param keys: A tuple of the primary key values per row, in the order of `get_primary_keys_sql_fields()`.
+        :return: The primary key sql fields, the database types of all fields, and the value arrays.
+        :used-by: build_sql_delete_many, build_sql_get_many
+        """
+        primary_keys = cls.get_primary_keys_sql_fields()
+        column_types = cls.get_sql_column_types()
+        array_columns = [column for column in primary_keys if column_types[column].endswith('[]')]
+        if array_columns:
+            raise TypeError(f'Array fields can not be used as array parameters: {array_columns!r}')
         # end if
-        fetch_params = self.build_sql_update()
-        logger.debug(f'UPDATE query for {self.__class__.__name__}: {fetch_params!r}')
-        update_status = await conn.execute(*fetch_params)
-        logger.debug(f'UPDATE for {self.__class__.__name__}: {update_status} for {self}')
-        self._database_cache_overwrite_with_current()
-    # end if
+        for key in keys:
+            if len(key) != len(primary_keys):
+                raise ValueError(f'Expected {len(primary_keys)} primary key values {primary_keys!r}, got {key!r}.')
+            # end if
+        # end for
+        values = [list(column_values) for column_values in zip(*keys)] if keys else [[] for _ in primary_keys]
+        return primary_keys, column_types, values
+    # end def
 
-    def build_sql_delete(self):
-        _database_cache = self._database_cache
-        assert_type_or_raise(_database_cache, dict, parameter_name='self._database_cache')
+    @classmethod
+    def build_sql_delete_many(cls, keys: List[Tuple[Any, ...]]) -> Tuple[Any, ...]:
+        """
+        Builds a single `DELETE` for many rows by their primary key(s).
+        The keys are given as array parameters, so the SQL string stays the same regardless of the amount of rows.
 
-        typehints = self.get_fields_typehints(flatten_table_references=True)
+        For a single primary key that's a `"id" = ANY($1)`,
+        for composite ones the key arrays are joined with `unnest(…)`.
+        If the class has a `_soft_delete_field`, that's an `UPDATE` setting that field for the rows not deleted yet instead.
 
-        # DELETE FROM "name" WHERE pk...
-        where_values = []
-        placeholder_index = 0
-        primary_key_parts: List[str] = []  # "foo" = $1
-        kwargs = {}
+        :param keys: A tuple of the primary key values per row, in the order of `get_primary_keys_sql_fields()`.
+        :return: The SQL string followed by one list of values per primary key field for the `conn.execute(…)` method.
+        """
+        primary_keys, column_types, values = cls._get_primary_key_arrays(keys)
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+
+        if soft_delete_field is not None:
+            # noinspection SqlResolve,SqlNoDataSourceInspection
+            sql = f'UPDATE {cls.get_table()}\n'
+            sql += f' SET {",".join(cls._build_sql_soft_delete_set())}\n'
+            join_keyword = 'FROM'
+        else:
+            # noinspection SqlWithoutWhere,SqlResolve,SqlNoDataSourceInspection
+            sql = f'DELETE FROM {cls.get_table()}\n'
+            join_keyword = 'USING'
+        # end if
+        if len(primary_keys) == 1:
+            where_parts = [f'"{primary_keys[0]}" = ANY($1::{column_types[primary_keys[0]]}[])']
+        else:
+            unnest_sql = ", ".join(f'${i}::{column_types[column]}[]' for i, column in enumerate(primary_keys, start=1))
+            keys_sql = ", ".join(f'"{column}"' for column in primary_keys)
+            where_parts = [f'{cls.get_table()}."{column}" = "keys"."{column}"' for column in primary_keys]
+            sql += f' {join_keyword} unnest({unnest_sql}) AS "keys" ({keys_sql})\n'
+        # end if
+        if soft_delete_field is not None:
+            where_parts.append(f'NOT {cls.get_table()}."{soft_delete_field}"')
+        # end if
+        sql += f' WHERE {" AND ".join(where_parts)}\n'
+        sql += ';'
+        # noinspection PyRedundantParentheses
+        return (sql, *values)
+    # end def
 
-        # collect data
-        for primary_key_long, field_info in typehints.items():
-            if not field_info.is_primary_key:
-                continue
-            # end if
-            primary_key_short = field_info.unflattened_field
-            if primary_key_long in _database_cache:
-                kwargs[primary_key_long] = _database_cache[primary_key_long]
-            elif primary_key_short in _database_cache:
-                kwargs[primary_key_short] = _database_cache[primary_key_short]
+    @classmethod
+    @with_connection
+    async def delete_many(
+        cls: Union[Type[CLS_TYPE], 'FastORM'],
+        conn: Optional[Connection] = None,
+        instances_or_keys: List[Union[CLS_TYPE, Any, Tuple[Any, ...]]] = None,
+        *,
+        batch_size: int = 10_000,
+    ) -> int:
+        """
+        Deletes many rows by their primary key(s), with one statement per batch instead of one per row.
+
+            await Auction.delete_many(conn, [auction_a, auction_b, 42, 4458])
+
+        The database cache of given instances is cleared, like `delete(…)` does.
+        Note, that a `_version_field` is not checked.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param instances_or_keys: Instances of this class, or their primary key value directly.
+                                  For composite primary keys (including references) that's a tuple in the order of `get_primary_keys_sql_fields()`.
+        :param batch_size: How many rows to delete per statement.
+        :return: The amount of deleted rows.
+        """
+        # e.g. `delete_many([1, 2])` without a connection would bind the list to `conn`.
+        assert_type_or_raise(conn, Connection, PoolConnectionProxy, parameter_name='conn')
+        assert_type_or_raise(instances_or_keys, list, tuple, parameter_name='instances_or_keys')
+        assert_type_or_raise(batch_size, int, parameter_name='batch_size')
+        instances: List[CLS_TYPE] = []
+        keys: List[Tuple[Any, ...]] = []
+        for instance_or_key in instances_or_keys:
+            if isinstance(instance_or_key, cls):
+                instances.append(instance_or_key)
+                keys.append(tuple(sql_meta.value for sql_meta in instance_or_key._get_known_primary_key_sql_fields()))
+            elif isinstance(instance_or_key, tuple):
+                keys.append(instance_or_key)
             else:
-                kwargs[primary_key_short] = getattr(self, primary_key_short)
+                keys.append((instance_or_key,))
             # end if
         # end for
+        deleted = 0
+        for batch_start in range(0, len(keys), batch_size):
+            fetch_params = cls.build_sql_delete_many(keys[batch_start:batch_start + batch_size])
+            delete_status = await conn.execute(*fetch_params)
+            logger.debug(f'DELETE MANY for {cls.__name__}: {delete_status}')
+            deleted += cls._get_status_row_count(delete_status)
+        # end for
+        cls._row_cache_clear()
+        cls._result_cache_invalidate()
+        for instance in instances:
+            instance._database_cache_remove()
+        # end for
+        logger.debug(f'DELETE MANY for {cls.__name__}: {deleted} of {len(keys)} rows were deleted.')
+        return deleted
+    # end def
 
-        # make sure we do allow all reference formats in the data. (e.g. Tuples and TableObjects)
-        new_fields = self._prepare_kwargs_flattened(**kwargs)
-
-        # built where tuples for which rows to delete
-        for sql_field_meta in new_fields:
-            placeholder_index += 1
-            primary_key_parts.append(f'"{sql_field_meta.sql_name}" = ${placeholder_index}')
-            where_values.append(sql_field_meta.value)
+    @classmethod
+    def build_sql_purge(cls, *, batch: int, after: Optional[Tuple[Any, ...]] = None, **filters: Any) -> Tuple[Any, ...]:
+        """
+        Builds a `DELETE` of the next chunk of rows matching the filters, in primary key order.
+        Rows locked by somebody else are skipped instead of waited for.
+        This always deletes for real, even with a `_soft_delete_field`, e.g. to clean up the soft deleted rows:
+        Filter by that field to only get rid of those, like `deleted=True`.
+
+        :param batch: How many rows to delete at most.
+        :param after: Only delete rows with primary key(s) after this one, in the order of `get_primary_keys_sql_fields()`.
+        :param filters: Filters like for `.select(…)`.
+        :return: The SQL string followed by positional parameters for the `conn.fetchrow(…)` method.
+                 That returns the primary key(s) of the last deleted row and the `deleted_count`,
+                 or no row at all if nothing was deleted.
+        """
+        primary_keys = cls.get_primary_keys_sql_fields()
+        keys_sql = ", ".join(f'"{column}"' for column in primary_keys)
+        where_parts, values, placeholder_index = cls._build_sql_where(filters)
+        if after is not None:
+            if len(after) != len(primary_keys):
+                raise ValueError(f'Expected {len(primary_keys)} primary key values {primary_keys!r}, got {after!r}.')
+            # end if
+            after_sql = ", ".join(f'${i}' for i in range(placeholder_index + 1, placeholder_index + len(after) + 1))
+            placeholder_index += len(after)
+            where_parts.append(f'({keys_sql}) > ({after_sql})')
+            values.extend(after)
         # end if
-        logger.debug(f'Fields to DELETE for selector {primary_key_parts!r}: {where_values!r}')
+        placeholder_index += 1
+        values.append(batch)
+        order_desc_sql = ", ".join(f'"{column}" DESC' for column in primary_keys)
 
-        # noinspection SqlWithoutWhere,SqlResolve,SqlNoDataSourceInspection
-        sql = f'DELETE FROM {self.get_table()}\n'
-        sql += f' WHERE {" AND ".join(primary_key_parts)}'
-        sql += '\n;'
+        # noinspection SqlResolve,SqlNoDataSourceInspection
+        sql = 'WITH "deleted" AS (\n'
+        sql += f' DELETE FROM {cls.get_table()}\n'
+        sql += f' WHERE ({keys_sql}) IN (\n'
+        sql += f'  SELECT {keys_sql} FROM {cls.get_table()}\n'
+        if where_parts:
+            sql += f'  WHERE {" AND ".join(where_parts)}\n'
+        # end if
+        sql += f'  ORDER BY {keys_sql}\n'
+        sql += f'  LIMIT ${placeholder_index}\n'
+        sql += '  FOR UPDATE SKIP LOCKED\n'
+        sql += ' )\n'
+        sql += f' RETURNING {keys_sql}\n'
+        sql += ')\n'
+        sql += f'SELECT {keys_sql}, (SELECT count(*) FROM "deleted") AS "deleted_count" FROM "deleted"\n'
+        sql += f' ORDER BY {order_desc_sql}\n'
+        sql += ' LIMIT 1\n'
+        sql += ';'
         # noinspection PyRedundantParentheses
-        return (sql, *where_values)
+        return (sql, *values)
     # end def
 
-    async def delete(self, conn: Connection):
-        fetch_params = self.build_sql_delete()
-        logger.debug(f'DELETE query for {self.__class__.__name__}: {fetch_params!r}')
-        delete_status = await conn.execute(*fetch_params)
-        logger.debug(f'DELETE for {self.__class__.__name__}: {delete_status} for {self}')
-        self._database_cache_remove()
-    # end if
+    @classmethod
+    async def purge(
+        cls,
+        conn_or_pool: Union[Connection, Pool, None] = None,
+        *,
+        batch: int = 10_000,
+        pause: float = 0.0,
+        after: Optional[Tuple[Any, ...]] = None,
+        progress: Optional[Callable[[PurgeProgress], Any]] = None,
+        **filters: Any,
+    ) -> PurgeProgress:
+        """
+        Deletes all rows matching the filters in small chunks, each in it's own short transaction.
+        That avoids holding locks for long and a huge spike of WAL, like a single `DELETE` on a big table would cause.
+
+            await Auction.purge(pool, batch=10_000, pause=0.1, end_date=…)
+
+        Rows locked by somebody else are skipped. As every chunk continues after the last deleted primary key,
+        those are only picked up by the next run.
+
+        :param conn_or_pool: Database connection to run at, or a pool to acquire a connection from for every chunk.
+                             A connection must not be inside a transaction, or the chunks wouldn't be committed separately.
+                             If not given, the one bound with `FastORM.bind(…)` is used.
+        :param batch: How many rows to delete per chunk.
+        :param pause: Seconds to sleep between the chunks, to throttle the load on the database.
+        :param after: Resume a previous run, by giving it's `PurgeProgress.last_key`.
+        :param progress: Called with the `PurgeProgress` after every chunk. Can be a coroutine function, too.
+        :param filters: Filters like for `.select(…)`.
+        :return: The final progress, with the total amount of deleted rows.
+        """
+        assert_type_or_raise(batch, int, parameter_name='batch')
+        if conn_or_pool is None:
+            conn_or_pool = connection.get_bound()
+        # end if
+        primary_keys = cls.get_primary_keys_sql_fields()
+        state = PurgeProgress(deleted=0, batches=0, last_key=tuple(after) if after is not None else None)
+        while True:
+            fetch_params = cls.build_sql_purge(batch=batch, after=state.last_key, **filters)
+            async with connection.acquire(conn_or_pool) as conn:
+                row = await conn.fetchrow(*fetch_params)
+            # end with
+            if row is None:
+                break
+            # end if
+            cls._row_cache_clear()
+            cls._result_cache_invalidate()
+            state.deleted += row['deleted_count']
+            state.batches += 1
+            state.last_key = tuple(row[column] for column in primary_keys)
+            logger.debug(f'PURGE for {cls.__name__}: {state!r}')
+            if progress is not None:
+                result = progress(state)
+                if inspect.isawaitable(result):
+                    await result
+                # end if
+            # end if
+            if row['deleted_count'] < batch:
+                break  # that was the last chunk
+            # end if
+            if pause:
+                await asyncio.sleep(pause)
+            # end if
+        # end while
+        return state
+    # end def
 
     def clone(self: CLS_TYPE) -> CLS_TYPE:
         return self.__class__(**self.as_dict())
@@ -1786,7 +3426,7 @@ class _BaseFastORM(BaseModel):
         # end if
         row_data = {key.rsplit(" ")[-1]: value for key, value in dict(row).items()}  # handles the namespaces like "namespace_name field_name"
         processed = cls._prepare_kwargs_flattened(**row_data)
-        kwargs = {sql_meta.field_name: sql_meta.value for sql_meta in processed}
+        kwargs = cls._group_flattened_values(processed)
         # noinspection PyArgumentList
         instance = cls(**kwargs)
         instance._database_cache_overwrite_with_current()
@@ -1961,16 +3601,45 @@ class _BaseFastORM(BaseModel):
     # end def
 
     @classmethod
+    def get_sql_column_types(cls) -> Dict[str, str]:
+        """
+        The database types of the sql fields, as `CREATE TABLE` would use them.
+        Automatic fields get their plain type, e.g. `BIGINT` instead of `BIGSERIAL`, so the result can be used for casts.
+
+            >>> class Example(FastORM):
+            ...   _primary_keys = ['id']
+            ...   _automatic_fields = ['id']
+            ...   id: Optional[int]
+            ...   tags: List[str]
+            ...
+
+            >>> Example.get_sql_column_types()
+            {'id': 'BIGINT', 'tags': 'TEXT[]'}
+
+        :return: Dictionary with the long sql field name as key, and the sql type as value.
+        """
+        key = f'_{cls.__name__!s}__sql_column_types'
+        if getattr(cls, key, None) is None:
+            setattr(cls, key, {
+                long_key: cls.match_type(type_hint=type_hint_info.resulting_type, is_automatic_field=False, key=long_key)[1]
+                for long_key, type_hint_info in cls.get_fields_typehints(flatten_table_references=True).items()
+            })
+        # end if
+        return getattr(cls, key)
+    # end def
+
+    @classmethod
+    @with_connection
     async def create_table(
         cls,
-        conn: Connection,
+        conn: Optional[Connection] = None,
         if_not_exists: bool = False,
         psycopg2_conn: Union['psycopg2.extensions.connection', 'psycopg2.extensions.cursor', None] = None,
     ):
         """
         Builds and executes a CREATE TABLE statement.
 
-        :param conn: the `asyncpg` database connection to execute this with.
+        :param conn: the `asyncpg` database connection to execute this with. If not given, the one bound with `FastORM.bind(…)` is used.
 
         :param if_not_exists:
             If the table definition should include IF NOT EXISTS, thus not producing an error if it does, but instead being silently ignored.
@@ -2144,10 +3813,87 @@ class _BaseFastORM(BaseModel):
                 sql = psycopg2.sql.SQL(sql)
                 sql = sql.format(**formatting_dict).as_string(context=psycopg2_conn)
             # end if
+        # end if
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        if soft_delete_field is not None:
+            sql += '\n' + '\n'.join(cls._build_sql_create_live_indexes(if_not_exists=if_not_exists))
+        # end if
+        cache_config = getattr(cls, '_cache')
+        if cache_config is not None and cache_config.notify:
+            sql += '\n' + cls.build_sql_create_notify_trigger()[0]
+        # end if
         # noinspection PyRedundantParentheses
         return (sql, *[])
     # end def
 
+    @classmethod
+    def build_sql_create_notify_trigger(cls) -> Tuple[str, ...]:
+        """
+        Builds a trigger notifying about changed rows, so a `CacheListener` evicts them from the row caches in every process.
+        The payload is a json object with the `table` and the primary `key` values, or `null` for all the rows after a `TRUNCATE`.
+        Inserted rows don't need to be evicted, as only existing rows are cached.
+
+        It is included in `build_sql_create(…)` if the class has `_cache = CacheConfig(notify=True)`.
+        For already existing tables it can be run on it's own, it replaces an existing one.
+
+        :return: The SQL string, with no parameters.
+        """
+        _table_name = cls.get_name()
+        function_name = f'"{_table_name}__notify_cache"'
+        key_sql = ', '.join(f'OLD."{column}"' for column in cls.get_primary_keys_sql_fields())
+        channel_sql = f"'{cache.NOTIFY_CHANNEL}'"
+        # noinspection SqlResolve,SqlNoDataSourceInspection
+        sql = (
+            f'CREATE OR REPLACE FUNCTION {function_name}() RETURNS TRIGGER AS $$\n'
+            f'BEGIN\n'
+            f"  IF TG_OP = 'TRUNCATE' THEN\n"
+            f"    PERFORM pg_notify({channel_sql}, json_build_object('table', TG_TABLE_NAME, 'key', NULL)::text);\n"
+            f'  ELSE\n'
+            f"    PERFORM pg_notify({channel_sql}, json_build_object('table', TG_TABLE_NAME, 'key', json_build_array({key_sql}))::text);\n"
+            f'  END IF;\n'
+            f'  RETURN NULL;\n'
+            f'END;\n'
+            f'$$ LANGUAGE plpgsql;\n'
+            f'DROP TRIGGER IF EXISTS {function_name} ON {cls.get_table()};\n'
+            f'CREATE TRIGGER {function_name} AFTER UPDATE OR DELETE ON {cls.get_table()}\n'
+            f' FOR EACH ROW EXECUTE PROCEDURE {function_name}();\n'
+            f'DROP TRIGGER IF EXISTS "{_table_name}__notify_cache_truncate" ON {cls.get_table()};\n'
+            f'CREATE TRIGGER "{_table_name}__notify_cache_truncate" AFTER TRUNCATE ON {cls.get_table()}\n'
+            f' FOR EACH STATEMENT EXECUTE PROCEDURE {function_name}();'
+        )
+        # noinspection PyRedundantParentheses
+        return (sql,)
+    # end def
+
+    @classmethod
+    def _build_sql_create_live_indexes(cls, *, if_not_exists: bool = False) -> List[str]:
+        """
+        Builds partial indexes for the not soft deleted rows, on the primary key(s) and on the columns of every reference.
+        Those stay compact, no matter how many deleted rows pile up.
+
+        :param if_not_exists: If the statements should include IF NOT EXISTS.
+        :return: One `CREATE INDEX` statement per index.
+        """
+        _table_name = cls.get_name()
+        soft_delete_field = getattr(cls, '_soft_delete_field')
+        indexes: Dict[str, List[str]] = {'pkey': cls.get_primary_keys_sql_fields()}
+        for long_key, typehint in cls.get_fields_references(recursive=True).items():
+            if typehint.is_reference:
+                indexes.setdefault(typehint.unflattened_field, []).append(long_key)
+            # end if
+        # end for
+        if_not_exists_sql = 'IF NOT EXISTS ' if if_not_exists else ''
+        statements = []
+        for index_name, columns in indexes.items():
+            columns_sql = ', '.join(f'"{column}"' for column in columns)
+            statements.append(
+                f'CREATE INDEX {if_not_exists_sql}"{shorten_identifier(f"{_table_name}__{index_name}__live")}"'
+                f' ON {cls.get_table()} ({columns_sql}) WHERE NOT "{soft_delete_field}";'
+            )
+        # end for
+        return statements
+    # end def
+
     @classmethod
     def _as_psycopg2_connection(cls, conn):
         if psycopg2 is None:
@@ -2190,14 +3936,15 @@ class _BaseFastORM(BaseModel):
     # end def
 
     @classmethod
+    @with_connection
     async def create_table_references(
         cls,
-        conn: Connection,
+        conn: Optional[Connection] = None,
     ):
         """
         Builds and executes a ALTER TABLE and CREATE TABLE statement.
 
-        :param conn: the `asyncpg` database connection to execute this with.
+        :param conn: the `asyncpg` database connection to execute this with. If not given, the one bound with `FastORM.bind(…)` is used.
         :return:
         """
         reference_params = cls.build_sql_references()
@@ -2538,76 +4285,348 @@ class _BaseFastORM(BaseModel):
     }
 
     @classmethod
-    async def create_connection(cls, database_url) -> Connection:
+    async def create_connection(cls, database_url, *, pgbouncer: bool = False) -> Connection:
+        """
+        Creates a connection, set up to do datetime and json conversion.
+
+        :param database_url: The postgres url to connect to.
+        :param pgbouncer: If connecting through PgBouncer in transaction pooling mode, see `PoolConfig.pgbouncer`.
+        :return: The connection.
+        """
         # https://magicstack.github.io/asyncpg/current/usage.html#example-automatic-json-conversion
-        conn = await asyncpg.connect(database_url)
+        conn = await asyncpg.connect(database_url, **(connection.PGBOUNCER_CONNECT_KWARGS if pgbouncer else {}))
         return await cls._set_up_connection(conn=conn)
     # end def
 
     @classmethod
-    async def create_connection_pool(cls, database_url) -> Pool:
+    async def create_connection_pool(cls, database_url, config: Optional[PoolConfig] = None) -> Pool:
+        """
+        Creates a connection pool, with every connection set up like `create_connection(…)` does.
+        That happens once per new connection, not on every acquire, so the prepared statements of a connection survive.
+
+        :param database_url: The postgres url to connect to.
+        :param config: Pool size, timeouts and so on. Defaults to the ones of asyncpg.
+        :return: The pool.
+        """
         # https://magicstack.github.io/asyncpg/current/usage.html#example-automatic-json-conversion
-        return await asyncpg.create_pool(database_url, setup=cls._set_up_connection)
+        if config is None:
+            config = PoolConfig()
+        # end if
+        assert_type_or_raise(config, PoolConfig, parameter_name='config')
+        return await asyncpg.create_pool(database_url, init=cls._set_up_connection, **config.as_kwargs())
     # end def
 
     @classmethod
-    async def _set_up_connection(cls, conn: Connection):
+    async def create_connection_router(
+        cls, primary_database_url, replica_database_urls: List[str], config: Optional[PoolConfig] = None,
+    ) -> Router:
+        """
+        Creates a connection pool for the primary and every replica server,
+        and a `Router` sending `get(…)` and `select(…)` to the replicas and everything else to the primary.
+        Use the router like a pool.
+
+            router = await FastORM.create_connection_router('postgres://primary/db', ['postgres://replica/db'])
+            with FastORM.bind(router):
+                auction = await Auction.get(id=4458)  # from the replica
+
+        :param primary_database_url: The postgres url of the primary server.
+        :param replica_database_urls: The postgres urls of the read only replicas.
+        :param config: Pool size, timeouts and so on, for every one of the pools.
+        :return: The router.
+        """
+        assert_type_or_raise(replica_database_urls, list, parameter_name='replica_database_urls')
+        primary = await cls.create_connection_pool(primary_database_url, config)
+        replicas = [await cls.create_connection_pool(database_url, config) for database_url in replica_database_urls]
+        return Router(primary, replicas)
+    # end def
+
+    @staticmethod
+    def bind(conn_or_pool: Union[Connection, Pool, Router]):
+        """
+        Makes the connection or pool the implicit one for the current context (e.g. asyncio task),
+        so the `conn` parameter can be left out everywhere:
+
+            with FastORM.bind(pool):
+                auction = await Auction.get(id=4458)
+                auction.title = 'foo'
+                await auction.update()
+
+        With a pool, every call acquires a connection and releases it afterwards again.
+        With a `Router` (see `create_connection_router(…)`), that's from the pool it picks.
+
+        :param conn_or_pool: The connection, the pool, or the router.
+        :return: A context manager, to be used with `with`.
+        """
+        return connection.bind(conn_or_pool)
+    # end def
+
+    @staticmethod
+    def transaction(
+        conn_or_pool: Union[Connection, Pool, Router, None] = None,
+        *,
+        isolation: Optional[str] = None,
+        retries: int = 0,
+        backoff: float = 0.05,
+        max_backoff: float = 2.0,
+    ) -> Transaction:
+        """
+        Runs a block in a transaction, with the connection bound for every model call inside it.
+        To retry it on serialization failures and deadlocks, iterate over the attempts:
+
+            async for attempt in FastORM.transaction(pool, isolation='serializable', retries=3):
+                async with attempt:
+                    auction = await Auction.get(id=4458)
+                    auction.bid_count += 1
+                    await auction.update()
+
+        Without retries, it can be used directly with `async with FastORM.transaction(pool) as conn:`.
+        See `Transaction` for the details, and `get_transaction_metrics()` for how often that was retried.
+
+        :param conn_or_pool: The connection, pool or router. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param isolation: The isolation level, `'serializable'`, `'repeatable_read'` or `'read_committed'`. `None` for the default.
+        :param retries: How often to run the block again at most. Only when iterating over the attempts, `async with` raises a `ValueError` otherwise.
+        :param backoff: Seconds to wait before the first retry at most, doubled for every following one.
+        :param max_backoff: Seconds to wait before a retry at most.
+        :return: The transaction.
+        """
+        return Transaction(conn_or_pool, isolation=isolation, retries=retries, backoff=backoff, max_backoff=max_backoff)
+    # end def
+
+    @staticmethod
+    async def gather(
+        conn_or_pool: Union[Pool, Router, None],
+        *calls: Union[Awaitable[Any], Callable[[], Awaitable[Any]]],
+        concurrency: int = 10,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Runs independent model calls concurrently, each with it's own connection from the pool,
+        so the latency is about the one of the slowest call, not the sum of them.
+
+            auctions, user = await FastORM.gather(pool, Auction.select(status='open'), User.get(id=42), concurrency=5)
+
+        :param conn_or_pool: The pool or router. If not given, the one bound with `FastORM.bind(…)` is used.
+        :param calls: The coroutines of model calls without a `conn` given, or functions returning such.
+        :param concurrency: How many of them may run (i.e. hold a connection) at the same time at most.
+        :param return_exceptions: Like for `asyncio.gather(…)`, if errors should be returned instead of raised.
+        :return: The results, in the order of the calls.
+        """
+        return await connection.gather(conn_or_pool, *calls, concurrency=concurrency, return_exceptions=return_exceptions)
+    # end def
+
+    @staticmethod
+    def create_cache_listener(database_url: str, **kwargs) -> CacheListener:
+        """
+        Creates a listener evicting the rows changed by other processes from the row caches (see `_cache`),
+        as notified by the triggers of `build_sql_create_notify_trigger()`. Start it with `await listener.start()`.
+        If it loses the connection, the caches are flushed completely, as notifications could have been missed.
+
+        :param database_url: The postgres url to connect to, with a dedicated connection.
+        :param kwargs: Further settings of the `CacheListener`, like `reconnect_delay`.
+        :return: The listener, not started yet.
+        """
+        return CacheListener(database_url, **kwargs)
+    # end def
+
+    @staticmethod
+    def configure_result_cache(config: ResultCacheConfig) -> ResultCache:
+        """
+        Sets the memory budget and the `ttl` of the query result cache of the classes having `_cache_results = True`.
+        The cache is replaced with an empty one.
+
+            FastORM.configure_result_cache(ResultCacheConfig(max_bytes=64 * 1024 * 1024, ttl=300))
+
+        :param config: The settings.
+        :return: The new cache.
+        """
+        assert_type_or_raise(config, ResultCacheConfig, parameter_name='config')
+        return cache.configure_result_cache(config)
+    # end def
+
+    @staticmethod
+    def get_transaction_metrics() -> TransactionMetrics:
+        """
+        How many transactions were run with `FastORM.transaction(…)`, and how often they were retried.
+        """
+        return connection.get_transaction_metrics()
+    # end def
+
+    @staticmethod
+    def session():
+        """
+        Makes reads after a write go to the primary instead of a replica, for a `Router`.
+        Wrap e.g. a web request in it, so the user sees their own changes right away (read-your-writes):
+
+            with FastORM.session():
+                await auction.update(router)
+                auction = await Auction.get(router, id=auction.id)  # from the primary
+
+        :return: A context manager, to be used with `with`.
+        """
+        return connection.session()
+    # end def
+
+    @staticmethod
+    def set_default(conn_or_pool: Optional[Union[Connection, Pool]]) -> None:
+        """
+        Sets the implicit connection or pool for the whole process, used if none is bound with `FastORM.bind(…)`.
+        For example in the startup hook of your web framework.
+
+        :param conn_or_pool: The connection, or the pool. `None` to unset it again.
+        """
+        connection.set_default(conn_or_pool)
+    # end def
+
+    @staticmethod
+    def get_pool_metrics(pool: Pool) -> PoolMetrics:
+        """
+        Acquire wait times and connections in use of a pool, counting the connections acquired by FastORM.
+
+        :param pool: The pool.
+        :return: The current statistics.
+        """
+        return connection.get_pool_metrics(pool)
+    # end def
+
+    @classmethod
+    def register_warm_up(cls, *fetch_params: Union[str, Tuple[Any, ...]]) -> None:
+        """
+        Registers statements to be prepared on every new connection of a pool created by `create_connection_pool(…)`,
+        or by `warm_up(…)`, so the first queries after a deploy don't pay for parsing and planning them.
+
+            >>> Auction.register_warm_up()  # doctest: +SKIP
+            >>> Auction.register_warm_up(Auction.build_sql_select(owner_id=0))  # doctest: +SKIP
+
+        :param fetch_params: The sql, or the `(sql, *values)` tuples as returned by the `build_sql_*(…)` methods,
+                             only the sql is used. The values must be of the same kind as the later ones though,
+                             e.g. `None` or lists generate a different sql.
+                             If none are given, the statement of `get(…)` by primary key is registered.
+        """
+        if not fetch_params:
+            fetch_params = (cls.build_sql_select(**{key: 0 for key in cls.get_primary_keys_keys()}),)
+        # end if
+        for params in fetch_params:
+            assert_type_or_raise(params, str, tuple, parameter_name='fetch_params')
+            connection.register_statement(params if isinstance(params, str) else params[0])
+        # end for
+    # end def
+
+    @staticmethod
+    async def warm_up(pool: Pool, connections: Optional[int] = None) -> int:
+        """
+        Opens connections of the pool up to its `min_size`, and prepares the statements of `register_warm_up(…)` on them.
+        Call it before the instance gets traffic, so the cold start latency is paid by then.
+
+        :param pool: The pool, created by `create_connection_pool(…)`.
+        :param connections: How many connections to warm up. Defaults to the `min_size` of the pool.
+        :return: The number of connections warmed up.
+        """
+        if connections is None:
+            connections = pool.get_min_size()
+        # end if
+        async with contextlib.AsyncExitStack() as stack:
+            # holding them all at once, so the pool has to open that many.
+            conns = await asyncio.gather(*[stack.enter_async_context(pool.acquire()) for _ in range(connections)])
+            # those set up before statements got registered need them, too. Already cached ones are skipped.
+            await asyncio.gather(*[connection.prepare_statements(conn) for conn in conns])
+        # end with
+        logger.debug(f'Warmed up {connections} connections.')
+        return connections
+    # end def
+
+    @staticmethod
+    def get_connection_setup_metrics() -> SetupMetrics:
+        """
+        How many connections got set up, and how long that took.
+        """
+        return connection.get_setup_metrics()
+    # end def
+
+    @classmethod
+    def get_json_codec(cls) -> JsonCodec:
         """
-        Sets up a connection to properly do datetime and json decoding.
+        The json functions for the `json` and `jsonb` columns, using the library set as `_json_library`
+        (`'orjson'`, `'msgspec'` or `'json'`), by default the fastest one installed.
+
+        Those are registered on the connection, so they are used for all the models queried with it.
+        The `_json_library` is read from the class `create_connection(…)` or `create_connection_pool(…)` is called on,
+        usually `FastORM` itself. Setting it on a single model does nothing, unless you create the pool from that class:
+        ```py
+        FastORM._json_library = 'json'  # before creating the pool
+        pool = await FastORM.create_connection_pool(database_url)
+        ```
 
-        Prepares writing datetimes (as ISO format) and class instances as json if they have a `.to_dict()`, `.to_array()` function.
-        An easy way to add your is by having a `.to_json()` function like above or
+        Writes datetimes (as ISO format) and class instances as json if they have a `.to_dict()` or `.to_array()` function.
+        An easy way to add your own is by having such a function like above or
         appending your class to `_CLASS_SERIALIZERS` like so:
         ```py
         # anywhere in your code, to be run once
         FastORM._CLASS_SERIALIZERS[SomeClass] = lambda obj: obj.do_something()
         ```
+        Which function to use is looked up only once per type, see `SerializerDispatch`.
+        """
+        key = f'_{cls.__name__!s}__json_codec'
+        if getattr(cls, key, None) is None:
+            setattr(cls, key, create_json_codec(getattr(cls, '_json_library'), SerializerDispatch(cls._CLASS_SERIALIZERS)))
+        # end if
+        return getattr(cls, key)
+    # end def
+
+    @classmethod
+    async def _set_up_connection(cls, conn: Connection):
+        """
+        Sets up a connection to properly do datetime and json decoding, see `get_json_codec()`,
+        and prepares the statements of `register_warm_up(…)`.
+        The time it took is recorded, see `get_connection_setup_metrics()`.
         :param conn:
         :return:
         """
-        import json
+        start = time.perf_counter()
+        await cls._set_up_json_codecs(conn, binary=True)
+        await connection.prepare_statements(conn)
+        seconds = time.perf_counter() - start
+        connection.get_setup_metrics().record(seconds)
+        logger.debug(f'Set up connection in {seconds * 1000:.2f} ms.')
+        return conn
+    # end def
+
+    @classmethod
+    async def _set_up_json_codecs(cls, conn: Connection, *, binary: bool = True):
+        """
+        Registers the json codec for the `json` and `jsonb` columns.
+
+        :param conn: The connection.
+        :param binary: If the binary wire format should be used, so the server doesn't need to render `jsonb` to text,
+                       and we feed the bytes to the json library without decoding them to a `str` first.
+                       Otherwise the text format is used.
+        """
+        json_codec = cls.get_json_codec()
+        if binary:
+            await conn.set_type_codec(
+                'json', encoder=json_codec.dumps_bytes, decoder=json_codec.decode_json_binary, schema='pg_catalog', format='binary',
+            )
+            await conn.set_type_codec(
+                'jsonb', encoder=json_codec.encode_jsonb_binary, decoder=json_codec.decode_jsonb_binary, schema='pg_catalog', format='binary',
+            )
+            return
+        # end if
+        loads = json_codec.loads
 
         def decoder_with_empty(text):
             if text.strip() == '':
                 return None
             # end if
-            return json.loads(text)
-        # end def
-
-        def json_dumps(obj):
-            logger.debug(f'Encoding to JSON: {obj!r}')
-
-            def my_converter(o):
-                if isinstance(o, datetime.datetime):
-                    return o.isoformat()
-                # end def
-                if hasattr(o, 'to_array'):
-                    return o.to_array()  # TgBotApiObject from pytgbot
-                # end def
-                if hasattr(o, 'to_dict'):
-                    return o.to_dict()
-                # end def
-
-                # check _CLASS_SERIALIZERS,
-                # a easy way to add your own by writing FastORM._CLASS_SERIALIZERS[Class] = lambda obj: obj
-                for type_to_check, callable_function in cls._CLASS_SERIALIZERS.items():
-                    if isinstance(o, type_to_check):
-                        return callable_function(o)
-                    # end if
-                # end for
-            # end def
-            return json.dumps(obj, default=my_converter)
+            return loads(text)
         # end def
 
         for sql_type in ('json', 'jsonb'):
             await conn.set_type_codec(
                 sql_type,
-                encoder=json_dumps,
+                encoder=json_codec.dumps,
                 decoder=decoder_with_empty,
                 schema='pg_catalog'
             )
         # end for
-        return conn
     # end def
 
     @classmethod
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+
+from asyncpg import Connection
+from luckydonaldUtils.logger import logging
+
+from .classes import StaleObjectError
+from .connection import with_connection
+from .query import Expression
+
+__author__ = 'luckydonald'
+
+logger = logging.getLogger(__name__)
+if __name__ == '__main__':
+    logging.add_colored_handler(level=logging.DEBUG)
+# end if
+
+__all__ = ['Batch']
+
+PLACEHOLDER_REGEX = re.compile(r'\$(\d+)')
+
+
+@dataclass
+class BatchStatement(object):
+    """
+    A statement collected by a `Batch`.
+    """
+    sql: str
+    values: Tuple[Any, ...]
+    returns_rows: bool  # if it has a `RETURNING` (or is a `SELECT`), so the rows can be selected from it's CTE.
+    process: Callable[[List[Dict[str, Any]]], Any]  # turns the returned rows into the result.
+# end class
+
+
+class Batch(object):
+    """
+    Collects statements of the `build_sql_*(…)` methods and runs all of them in a single round trip,
+    as one statement with every one of them in it's own `WITH` part (common table expression):
+
+        >>> batch = Batch()  # doctest: +SKIP
+        >>> batch.insert(AuditLog(action='bid', user_id=42))  # doctest: +SKIP
+        >>> batch.update(auction)  # doctest: +SKIP
+        >>> batch.get(User, id=42)  # doctest: +SKIP
+        >>> audit_log, _, user = await batch.run(conn)  # doctest: +SKIP
+
+    The results are handed back like the model methods would do,
+    including writing back automatic fields of inserts and the `RETURNING` values of updates.
+
+    Being a single statement, that all runs in one snapshot. Which means:
+    - Reads don't see the writes of the same batch.
+    - Changing the same row twice in one batch is not possible.
+    - Rows come back as `jsonb`, so types json doesn't have (e.g. timestamps) are parsed by the model fields again.
+      That's lossy for some: `numeric` values go through json numbers, so through `float`, losing precision,
+      and `bytea` comes back as the `'\\x…'` hex string instead of `bytes`. Don't `select(…)`/`get(…)` such rows with a batch.
+
+    A stale update or delete (see `FastORM._version_field`) doesn't make the statement fail,
+    so all the other writes of the batch happen regardless, and are committed unless running in a transaction.
+    The results of those are still processed (e.g. ids of inserts written back) before the `StaleObjectError` is raised.
+    To have none of the writes happen in that case, run the batch in a `FastORM.transaction(…)`, which is rolled back by the error.
+    """
+    def __init__(self):
+        self.statements: List[BatchStatement] = []
+    # end def
+
+    def __len__(self) -> int:
+        return len(self.statements)
+    # end def
+
+    def add(
+        self,
+        fetch_params: Tuple[Any, ...],
+        *,
+        returns_rows: bool = True,
+        process: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+    ) -> int:
+        """
+        Adds the statement of any `build_sql_*(…)` method.
+
+        :param fetch_params: The `(sql, *values)` tuple. Placeholders are renumbered, so don't have `$1` and so on in string literals.
+        :param returns_rows: If it's a `SELECT`, or has a `RETURNING` part.
+        :param process: Turns the returned rows (as dicts) into the result. By default the rows are the result.
+        :return: The index of the result.
+        """
+        sql, *values = fetch_params
+        self.statements.append(BatchStatement(
+            sql=sql.strip().rstrip(';').strip(),
+            values=tuple(values),
+            returns_rows=returns_rows,
+            process=process if process is not None else (lambda rows: rows),
+        ))
+        return len(self.statements) - 1
+    # end def
+
+    def insert(self, instance, **kwargs) -> int:
+        """
+        Adds `instance.insert(…)`, the result being the instance with the automatic fields written back.
+
+        :param instance: The model instance.
+        :param kwargs: The keyword arguments of `insert(…)`, except `conn`.
+        :return: The index of the result.
+        """
+        write_back_automatic_fields = kwargs.pop('write_back_automatic_fields', True)
+        fetch_params = instance._insert_preparation(**kwargs)
+
+        def process(rows):
+            instance._insert_postprocess(
+                updated_automatic_values_rows=[_validate_row(type(instance), row) for row in rows],
+                ignore_setting_automatic_fields=kwargs.get('ignore_setting_automatic_fields'),
+                write_back_automatic_fields=write_back_automatic_fields,
+            )
+            instance._row_cache_invalidate()
+            instance._result_cache_invalidate()
+            return instance
+        # end def
+
+        return self.add(fetch_params, returns_rows=bool(instance.get_automatic_fields()), process=process)
+    # end def
+
+    def update(self, instance, *, returning: Union[bool, List[str]] = False) -> int:
+        """
+        Adds `instance.update(…)`, the result being the instance with the returned values written back.
+
+        :param instance: The model instance.
+        :param returning: Like for `update(…)`.
+        :return: The index of the result.
+        """
+        expression_fields = [key for key, value in instance.get_changes().items() if isinstance(value, Expression)]
+        version_field = getattr(instance, '_version_field')
+        fetch_params = instance.build_sql_update(returning=returning)
+        returns_rows = bool(returning or expression_fields or version_field is not None)
+
+        def process(rows):
+            if not rows and version_field is not None:
+                raise instance._get_stale_object_error()
+            # end if
+            instance._row_cache_invalidate()
+            instance._result_cache_invalidate()
+            instance._database_cache_overwrite_with_current()
+            for row in rows:
+                instance._write_back_returned_row(_validate_row(type(instance), row))
+            # end for
+            return instance
+        # end def
+
+        return self.add(fetch_params, returns_rows=returns_rows, process=process)
+    # end def
+
+    def delete(self, instance) -> int:
+        """
+        Adds `instance.delete(…)`, the result being `None`.
+
+        :param instance: The model instance.
+        :return: The index of the result.
+        """
+        sql, *values = instance.build_sql_delete()
+        # the status with the row count isn't available, so we count returned rows instead.
+        sql = sql.strip().rstrip(';').rstrip() + '\n RETURNING TRUE AS "deleted"'
+
+        def process(rows):
+            if not rows and getattr(instance, '_version_field') is not None:
+                raise instance._get_stale_object_error()
+            # end if
+            soft_delete_field = getattr(instance, '_soft_delete_field')
+            if soft_delete_field is not None:
+                setattr(instance, soft_delete_field, True)
+            # end if
+            instance._row_cache_invalidate()
+            instance._result_cache_invalidate()
+            instance._database_cache_remove()
+        # end def
+
+        return self.add((sql, *values), returns_rows=True, process=process)
+    # end def
+
+    def select(self, cls: Type, **filters) -> int:
+        """
+        Adds `cls.select(**filters)`, the result being the list of instances.
+
+        :param cls: The model class.
+        :param filters: Filters like for `.select(…)`.
+        :return: The index of the result.
+        """
+        return self.add(cls.build_sql_select(**filters), process=lambda rows: [cls.from_row(row) for row in rows])
+    # end def
+
+    def get(self, cls: Type, **filters) -> int:
+        """
+        Adds `cls.get(**filters)`, the result being the instance or `None`.
+
+        :param cls: The model class.
+        :param filters: Filters like for `.get(…)`.
+        :return: The index of the result.
+        """
+        def process(rows):
+            assert len(rows) <= 1
+            return cls.from_row(rows[0]) if rows else None
+        # end def
+
+        return self.add(cls.build_sql_select(**filters), process=process)
+    # end def
+
+    def build_sql(self) -> Tuple[Any, ...]:
+        """
+        Builds the single statement running all the collected ones.
+        Each returned row has the `"statement"` index and the `"row"` as `jsonb`.
+
+            >>> batch = Batch()
+            >>> batch.add(('UPDATE "counter" SET "value" = "value" + $1 WHERE "id" = $2;', 1, 4), returns_rows=False)
+            0
+            >>> batch.add(('SELECT "id","name" FROM "user" WHERE "id" = $1', 42))
+            1
+            >>> sql, *values = batch.build_sql()
+            >>> print(sql)
+            WITH "batch_0" AS (
+            UPDATE "counter" SET "value" = "value" + $1 WHERE "id" = $2
+            ), "batch_1" AS (
+            SELECT "id","name" FROM "user" WHERE "id" = $3
+            )
+            SELECT 1 AS "statement", to_jsonb("batch_1") AS "row" FROM "batch_1"
+            ;
+            >>> values
+            [1, 4, 42]
+        """
+        if not self.statements:
+            raise ValueError('The batch has no statements.')
+        # end if
+        ctes = []
+        selects = []
+        values = []
+        for index, statement in enumerate(self.statements):
+            offset = len(values)
+            sql = PLACEHOLDER_REGEX.sub(lambda match: f'${int(match.group(1)) + offset}', statement.sql)
+            values.extend(statement.values)
+            ctes.append(f'"batch_{index}" AS (\n{sql}\n)')
+            if statement.returns_rows:
+                selects.append(f'SELECT {index} AS "statement", to_jsonb("batch_{index}") AS "row" FROM "batch_{index}"')
+            # end if
+        # end for
+        if not selects:
+            # modifying ones run regardless of being selected from, but there must be something to select.
+            selects.append('SELECT NULL::int AS "statement", NULL::jsonb AS "row" WHERE FALSE')
+        # end if
+        # noinspection SqlResolve,SqlNoDataSourceInspection
+        sql = f'WITH {", ".join(ctes)}\n' + '\nUNION ALL\n'.join(selects) + '\n;'
+        # noinspection PyRedundantParentheses
+        return (sql, *values)
+    # end def
+
+    @with_connection
+    async def run(self, conn: Optional[Connection] = None) -> List[Any]:
+        """
+        Runs all the collected statements in a single round trip.
+
+        :param conn: Database connection (or pool) to run at. If not given, the one bound with `FastORM.bind(…)` is used.
+        :return: The results, in the order the statements were added.
+        :raises StaleObjectError: After processing all the results, if updates or deletes had a stale `_version_field`.
+                                  With several of them, it lists all in the message.
+        """
+        fetch_params = self.build_sql()
+        logger.debug(f'BATCH query of {len(self.statements)} statements: {fetch_params!r}')
+        rows = await conn.fetch(*fetch_params)
+        rows_per_statement: List[List[Dict[str, Any]]] = [[] for _ in self.statements]
+        for row in rows:
+            rows_per_statement[row['statement']].append(row['row'])
+        # end for
+        results = []
+        stale_errors: List[StaleObjectError] = []
+        for statement, statement_rows in zip(self.statements, rows_per_statement):
+            try:
+                results.append(statement.process(statement_rows))
+            except StaleObjectError as e:
+                # the other statements already ran, so they still need their results written back.
+                stale_errors.append(e)
+                results.append(None)
+            # end try
+        # end for
+        if len(stale_errors) == 1:
+            raise stale_errors[0]
+        elif stale_errors:
+            raise StaleObjectError('\n'.join(str(e) for e in stale_errors)) from stale_errors[0]
+        # end if
+        return results
+    # end def
+# end class
+
+
+def _validate_row(cls: Type, row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parses the values of a row returned as json with the model fields, e.g. timestamps back to `datetime`s.
+    Values of unknown fields (e.g. flattened references) are kept as they are.
+    """
+    validated = {}
+    for key, value in row.items():
+        model_field = cls.__fields__.get(key)
+        if model_field is not None and value is not None:
+            parsed_value, errors = model_field.validate(value, {}, loc=key, cls=cls)
+            if not errors:
+                value = parsed_value
+            # end if
+        # end if
+        validated[key] = value
+    # end for
+    return validated
+# end def
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+import asyncpg
+from luckydonaldUtils.logger import logging
+
+__author__ = 'luckydonald'
+
+logger = logging.getLogger(__name__)
+if __name__ == '__main__':
+    logging.add_colored_handler(level=logging.DEBUG)
+# end if
+
+__all__ = [
+    'CacheConfig', 'RowCache', 'ResultCacheConfig', 'ResultCache', 'get_result_cache', 'configure_result_cache', 'CacheListener', 'NOTIFY_CHANNEL', 'register_notified', 'evict_notified', 'flush_notified',
+]
+
+NOTIFY_CHANNEL = 'fastorm_cache'  # the channel the triggers of `FastORM.build_sql_create_notify_trigger()` notify at.
+
+
+@dataclass(frozen=True)
+class CacheConfig(object):
+    """
+    Settings of the primary key row cache of a model, set as it's `_cache` class attribute:
+
+        class User(FastORM):
+            _table_name = 'user'
+            _primary_keys = ['id']
+            _cache = CacheConfig(max_entries=10_000, ttl=60)
+
+    :param max_entries: How many rows to keep at most, the least recently used ones are dropped first.
+    :param ttl: Seconds a row is kept at most, as changes of other processes are not noticed. `None` for no limit.
+    :param notify: If `build_sql_create(…)` should include triggers notifying about changed rows,
+                   so a `CacheListener` evicts them in every process. See `FastORM.build_sql_create_notify_trigger()`.
+    """
+    max_entries: int = 1000
+    ttl: Optional[float] = 60.0
+    notify: bool = False
+# end class
+
+
+class RowCache(object):
+    """
+    Least recently used cache of model instances by their primary key(s), with a time to live.
+    Copies are stored and handed out, so changing an instance doesn't change the cached one.
+
+        >>> cache = RowCache(CacheConfig(max_entries=2, ttl=None))
+        >>> cache.set((1,), 'one'); cache.set((2,), 'two'); cache.get((1,))
+        'one'
+        >>> cache.set((3,), 'three')  # drops the least recently used one
+        >>> cache.get((2,)) is None, len(cache), cache.hits, cache.misses
+        (True, 2, 1, 1)
+    """
+    __slots__ = ['config', '_entries', 'generation', 'hits', 'misses']
+
+    def __init__(self, config: CacheConfig):
+        self.config = config
+        self._entries: 'OrderedDict[Hashable, Tuple[Optional[float], Any]]' = OrderedDict()  # key: (expires_at, instance)
+        self.generation = 0  # counted up on every invalidation, see `set(…)`.
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        :param key: The primary key value(s).
+        :return: A copy of the cached instance, or `None` if not cached (anymore).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, instance = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(instance)
+            # end if
+            del self._entries[key]
+        # end if
+        self.misses += 1
+        return None
+    # end def
+
+    def set(self, key: Hashable, instance: Any, *, generation: Optional[int] = None) -> None:
+        """
+        :param key: The primary key value(s).
+        :param instance: The instance, a copy of it is stored.
+        :param generation: The `generation` from before loading the instance.
+                           If anything was invalidated since, it could be outdated already and isn't stored.
+                           `None` to store it regardless.
+        """
+        if generation is not None and generation != self.generation:
+            return
+        # end if
+        expires_at = None if self.config.ttl is None else time.monotonic() + self.config.ttl
+        self._entries[key] = (expires_at, _copy(instance))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+        # end while
+    # end def
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Removes a row, e.g. after it was changed.
+        """
+        self.generation += 1
+        self._entries.pop(key, None)
+    # end def
+
+    def clear(self) -> None:
+        """
+        Removes all the rows, e.g. after changing rows not known by their primary key.
+        """
+        self.generation += 1
+        self._entries.clear()
+    # end def
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    # end def
+
+    def __len__(self) -> int:
+        return len(self._entries)
+    # end def
+# end class
+
+
+def _copy(instance: Any) -> Any:
+    return instance.copy(deep=True) if hasattr(instance, 'copy') else instance
+# end def
+
+
+@dataclass(frozen=True)
+class ResultCacheConfig(object):
+    """
+    Settings of the query result cache shared by all the models having `_cache_results = True`.
+    See `FastORM.configure_result_cache(…)`.
+
+    :param max_bytes: Approximate memory the cached results may use, the least recently used ones are dropped first.
+    :param ttl: Seconds a result is kept at most, as changes of other processes are mostly not noticed. `None` for no limit.
+                Only updates and deletes of tables with a `CacheConfig(notify=True)` class evict results early, with a `CacheListener` running.
+    """
+    max_bytes: int = 16 * 1024 * 1024
+    ttl: Optional[float] = 60.0
+# end class
+
+
+class ResultCache(object):
+    """
+    Least recently used cache of query results by their SQL and values, with a time to live and a memory budget.
+    Each result is tagged with the tables it depends on, and dropped as soon as one of those is written to.
+
+        >>> cache = ResultCache(ResultCacheConfig(ttl=None))
+        >>> key = ('SELECT "id" FROM "auction" WHERE "state" = $1', 'running')
+        >>> cache.set(key, ['a', 'b'], tables={'auction', 'user'}, generation=cache.generation)
+        >>> cache.get(key)
+        ['a', 'b']
+        >>> cache.invalidate_tables({'user'})
+        >>> cache.get(key) is None, len(cache), cache.size
+        (True, 0, 0)
+    """
+    __slots__ = ['config', '_entries', '_keys_by_table', 'size', 'generation', 'hits', 'misses']
+
+    def __init__(self, config: ResultCacheConfig):
+        self.config = config
+        # key: (expires_at, size, tables, results)
+        self._entries: 'OrderedDict[Hashable, Tuple[Optional[float], int, FrozenSet[str], List[Any]]]' = OrderedDict()
+        self._keys_by_table: Dict[str, Set[Hashable]] = {}
+        self.size = 0  # approximate bytes used by the entries.
+        self.generation = 0  # counted up on every invalidation, see `set(…)`.
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        """
+        :param key: The `(sql, *values)` of the query, see `make_key(…)`.
+        :return: Copies of the cached results, or `None` if not cached (anymore).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, _, _, results = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [_copy(result) for result in results]
+            # end if
+            self._remove(key)
+        # end if
+        self.misses += 1
+        return None
+    # end def
+
+    def set(self, key: Hashable, results: List[Any], *, tables: Iterable[str], generation: int) -> None:
+        """
+        :param key: The `(sql, *values)` of the query, see `make_key(…)`.
+        :param results: The results, copies of them are stored.
+        :param tables: The tables the results depend on.
+        :param generation: The `generation` from before running the query.
+                           If any table was invalidated since, the results could be outdated already and aren't stored.
+        """
+        if generation != self.generation:
+            return
+        # end if
+        self._remove(key)
+        size = _approximate_size(key) + _approximate_size(results)
+        if size > self.config.max_bytes:
+            return
+        # end if
+        tables = frozenset(tables)
+        expires_at = None if self.config.ttl is None else time.monotonic() + self.config.ttl
+        self._entries[key] = (expires_at, size, tables, [_copy(result) for result in results])
+        for table in tables:
+            self._keys_by_table.setdefault(table, set()).add(key)
+        # end for
+        self.size += size
+        while self.size > self.config.max_bytes:
+            self._remove(next(iter(self._entries)))
+        # end while
+    # end def
+
+    def invalidate_tables(self, tables: Iterable[str]) -> None:
+        """
+        Removes all the results depending on any of the tables, e.g. after writing to them.
+        """
+        self.generation += 1
+        for table in tables:
+            for key in list(self._keys_by_table.get(table, ())):
+                self._remove(key)
+            # end for
+        # end for
+    # end def
+
+    def clear(self) -> None:
+        """
+        Removes all the results.
+        """
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_table.clear()
+        self.size = 0
+    # end def
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        # end if
+        _, size, tables, _ = entry
+        self.size -= size
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+                # end if
+            # end if
+        # end for
+    # end def
+
+    @staticmethod
+    def make_key(fetch_params: Tuple[Any, ...]) -> Optional[Hashable]:
+        """
+        The cache key of a `(sql, *values)` tuple, with lists (e.g. of `IN` filters) turned into tuples.
+
+        :return: The key, or `None` if some value can't be hashed and thus the query can't be cached.
+        """
+        key = tuple(_freeze(value) for value in fetch_params)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        # end try
+        return key
+    # end def
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    # end def
+
+    def __len__(self) -> int:
+        return len(self._entries)
+    # end def
+# end class
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    # end if
+    return value
+# end def
+
+
+def _approximate_size(value: Any, _seen: Optional[Set[int]] = None) -> int:
+    """
+    Roughly the bytes used by the value and everything in it, counting shared objects once.
+
+        >>> _approximate_size([b'x' * 1000]) > 1000
+        True
+    """
+    if _seen is None:
+        _seen = set()
+    # end if
+    if id(value) in _seen:
+        return 0
+    # end if
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_approximate_size(key, _seen) + _approximate_size(item, _seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_approximate_size(item, _seen) for item in value)
+    elif hasattr(value, '__dict__') and not isinstance(value, type):  # e.g. model instances
+        size += _approximate_size(vars(value), _seen)
+    # end if
+    return size
+# end def
+
+
+_result_cache = ResultCache(ResultCacheConfig())
+
+
+def get_result_cache() -> ResultCache:
+    """
+    The query result cache shared by all the models having `_cache_results = True`.
+    """
+    return _result_cache
+# end def
+
+
+def configure_result_cache(config: ResultCacheConfig) -> ResultCache:
+    """
+    Replaces the shared query result cache with an empty one using the given settings.
+    """
+    global _result_cache
+    _result_cache = ResultCache(config)
+    return _result_cache
+# end def
+
+
+_notified: Dict[str, List[Callable[[Optional[List[Any]]], None]]] = {}  # table name: evict functions
+
+
+def register_notified(table_name: str, evict: Callable[[Optional[List[Any]]], None]) -> None:
+    """
+    Registers a cache to be evicted from by the `CacheListener`.
+
+    :param table_name: The table, as sent by the triggers.
+    :param evict: Called with the primary key values of a changed row, or `None` to evict everything.
+    """
+    _notified.setdefault(table_name, []).append(evict)
+# end def
+
+
+def evict_notified(payload: str) -> None:
+    """
+    Handles a notification of a trigger, a json object with the `table` and the primary `key` values (or `null` for all rows).
+    The cached query results depending on that table are dropped as well.
+    The triggers only fire for updates, deletes and truncates of `CacheConfig(notify=True)` classes,
+    so rows inserted by other processes, and any change to the other tables, are only picked up by the result cache after it's `ttl`.
+
+        >>> evicted = []
+        >>> register_notified('doctest_table', evicted.append)
+        >>> evict_notified('{"table": "doctest_table", "key": [4458]}')
+        >>> evicted
+        [[4458]]
+    """
+    try:
+        data = json.loads(payload)
+        table_name, key = data['table'], data['key']
+    except (ValueError, TypeError, KeyError):
+        logger.warning(f'Ignoring invalid cache notification {payload!r}.')
+        return
+    # end try
+    for evict in _notified.get(table_name, []):
+        evict(key)
+    # end for
+    _result_cache.invalidate_tables([table_name])
+# end def
+
+
+def flush_notified() -> None:
+    """
+    Evicts everything of all the registered caches and the result cache, e.g. when notifications could have been missed.
+    """
+    for evicts in _notified.values():
+        for evict in evicts:
+            evict(None)
+        # end for
+    # end for
+    _result_cache.clear()
+# end def
+
+
+class CacheListener(object):
+    """
+    Listens for the notifications of the triggers on a dedicated connection, and evicts the changed rows from the caches.
+    If the connection is lost, notifications could be missed, so the caches are flushed completely and it reconnects.
+    Cached query results only get dropped for what the triggers notify, i.e. updates and deletes,
+    not inserts, see `evict_notified(…)`.
+
+        listener = FastORM.create_cache_listener('postgres://…')
+        await listener.start()
+        …
+        await listener.stop()
+
+    :param database_url: The postgres url to connect to. Not through PgBouncer in transaction mode, as `LISTEN` needs a session.
+    :param channel: The channel to listen at.
+    :param reconnect_delay: Seconds to wait before reconnecting.
+    :param keepalive: Seconds after which the connection is checked with a query, to notice a dead connection.
+    """
+    def __init__(self, database_url: str, *, channel: str = NOTIFY_CHANNEL, reconnect_delay: float = 1.0, keepalive: float = 30.0):
+        self.database_url = database_url
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.keepalive = keepalive
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+    # end def
+
+    async def start(self) -> None:
+        """
+        Starts listening in a background task.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        # end if
+    # end def
+
+    async def stop(self) -> None:
+        """
+        Stops listening, and closes the connection.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            # end try
+            self._task = None
+        # end if
+    # end def
+
+    def _on_notification(self, conn, pid: int, channel: str, payload: str) -> None:
+        evict_notified(payload)
+    # end def
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.database_url)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(self.channel, self._on_notification)
+                # changes since the last connection were not heard of.
+                flush_notified()
+                logger.debug(f'Listening for cache notifications at {self.channel!r}.')
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=self.keepalive)
+                    except asyncio.TimeoutError:
+                        # raises if the connection died without us noticing.
+                        await asyncio.wait_for(conn.execute('SELECT 1'), timeout=self.keepalive)
+                    # end try
+                # end while
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning(f'Cache notification listener lost the connection: {e!r}')
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+                # end if
+            # end try
+            flush_notified()
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+        # end while
+    # end def
+# end class
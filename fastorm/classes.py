@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import typing
 
 import pydantic.fields
@@ -130,3 +130,104 @@ class SqlFieldMeta(typing.Generic[SQL_FIELD_META_VALUE_TYPE]):
             r')'
         )
 # end class
+
+
+@dataclass
+class UpsertResult(object):
+    """
+    Counts of a bulk upsert, see `FastORM.bulk_upsert(…)`.
+    """
+    inserted: int
+    updated: int
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated
+    # end def
+# end class
+
+
+@dataclass
+class SyncResult(object):
+    """
+    Counts of a table sync, see `FastORM.sync(…)`.
+    """
+    inserted: int
+    updated: int
+    deleted: int
+# end class
+
+
+class StaleObjectError(RuntimeError):
+    """
+    Raised by `update(…)` or `delete(…)` if the row in the database doesn't have the version we loaded anymore,
+    i.e. somebody else changed (or deleted) it in the meantime. See `FastORM._version_field`.
+    """
+# end class
+
+
+@dataclass
+class PurgeProgress(object):
+    """
+    Progress of a chunked delete, see `FastORM.purge(…)`.
+    To resume an interrupted purge, give the `last_key` as `after` parameter.
+    """
+    deleted: int
+    batches: int
+    last_key: typing.Optional[typing.Tuple[typing.Any, ...]]
+# end class
+
+
+@dataclass
+class StatementCache(object):
+    """
+    Compiled sql statements of a single class, with hit statistics.
+    See `FastORM.get_sql_update_cache()`.
+    """
+    max_size: int
+    statements: typing.Dict[typing.Hashable, str] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    def get(self, key: typing.Optional[typing.Hashable]) -> typing.Optional[str]:
+        """
+        :param key: The cache key, `None` meaning the statement can't be cached.
+        :return: The cached sql, or `None` if we don't have it (yet).
+        """
+        sql = self.statements.get(key, None) if key is not None else None
+        if sql is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        # end if
+        return sql
+    # end def
+
+    def set(self, key: typing.Optional[typing.Hashable], sql: str) -> None:
+        """
+        Stores the compiled sql, if there is still room. With the typical handful of different statements that is never reached.
+        """
+        if key is not None and len(self.statements) < self.max_size:
+            self.statements[key] = sql
+        # end if
+    # end def
+
+    def clear(self) -> None:
+        self.statements.clear()
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The ratio of lookups which could use a cached statement, between `0.0` and `1.0`.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    # end def
+
+    def __len__(self):
+        return len(self.statements)
+    # end def
+# end class
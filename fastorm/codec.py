@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import datetime
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Union
+
+from luckydonaldUtils.logger import logging
+
+try:
+    import orjson
+except (ImportError, ModuleNotFoundError):
+    orjson = None
+# end try
+
+try:
+    import msgspec
+except (ImportError, ModuleNotFoundError):
+    msgspec = None
+# end try
+
+__author__ = 'luckydonald'
+
+logger = logging.getLogger(__name__)
+if __name__ == '__main__':
+    logging.add_colored_handler(level=logging.DEBUG)
+# end if
+
+__all__ = ['JsonCodec', 'SerializerDispatch', 'create_json_codec', 'JSON_LIBRARIES']
+
+JSON_LIBRARIES = ('orjson', 'msgspec', 'json')  # in order of preference
+JSONB_BINARY_VERSION = b'\x01'  # the first byte of the binary `jsonb` format, followed by the json text
+
+
+class SerializerDispatch(object):
+    """
+    Converts objects the json library can't handle itself, to be used as it's `default=…` hook.
+
+    The converter is resolved once per concrete type, in that order:
+    - `datetime`s become their ISO format.
+    - Objects with a `.to_array()` (e.g. pytgbot's `TgBotApiObject`) or a `.to_dict()` function get that called.
+    - The most specific class along the MRO registered in the `class_serializers`.
+    - Everything else becomes `null`.
+
+        >>> class Base(object): pass
+        >>> class Child(Base): pass
+        >>> dispatch = SerializerDispatch({object: lambda obj: 'object', Base: lambda obj: 'base'})
+        >>> dispatch(Child())
+        'base'
+        >>> dispatch(datetime.datetime(2022, 2, 3, 4, 5, 6))
+        '2022-02-03T04:05:06'
+
+    :param class_serializers: Dict of `class: callable(obj) -> json`, like `FastORM._CLASS_SERIALIZERS`.
+                              Added or replaced entries are picked up, as long as it's the same dict.
+    """
+    __slots__ = ['class_serializers', '_cache', '_cache_serializers_count']
+
+    def __init__(self, class_serializers: Dict[type, Callable[[Any], Any]]):
+        self.class_serializers = class_serializers
+        self._cache: Dict[type, Callable[[Any], Any]] = {}
+        self._cache_serializers_count = len(class_serializers)
+    # end def
+
+    def resolve(self, type_: type) -> Callable[[Any], Any]:
+        """
+        :param type_: The concrete type of the object to convert.
+        :return: The function converting an object of that type.
+        """
+        if self._cache_serializers_count != len(self.class_serializers):
+            # somebody registered a new serializer, everything resolved so far may have changed.
+            self._cache.clear()
+            self._cache_serializers_count = len(self.class_serializers)
+        # end if
+        try:
+            return self._cache[type_]
+        except KeyError:
+            pass
+        # end try
+        serializer = self._resolve_uncached(type_)
+        self._cache[type_] = serializer
+        return serializer
+    # end def
+
+    def _resolve_uncached(self, type_: type) -> Callable[[Any], Any]:
+        if issubclass(type_, datetime.datetime):
+            return datetime.datetime.isoformat
+        # end if
+        if hasattr(type_, 'to_array'):
+            return lambda obj: obj.to_array()
+        # end if
+        if hasattr(type_, 'to_dict'):
+            return lambda obj: obj.to_dict()
+        # end if
+        for base_type in type_.__mro__:
+            if base_type in self.class_serializers:
+                # looked up on every call, so replacing the function of an already registered class works, too.
+                return lambda obj: self.class_serializers[base_type](obj)
+            # end if
+        # end for
+        return lambda obj: None
+    # end def
+
+    def __call__(self, obj: Any) -> Any:
+        return self.resolve(type(obj))(obj)
+    # end def
+# end class
+
+
+@dataclass(frozen=True)
+class JsonCodec(object):
+    """
+    The json functions used for the `json` and `jsonb` columns, see `create_json_codec(…)`.
+    """
+    library: str
+    dumps: Callable[[Any], str]
+    dumps_bytes: Callable[[Any], bytes]  # utf-8 encoded
+    loads: Callable[[Union[str, bytes]], Any]
+
+    def encode_jsonb_binary(self, obj: Any) -> bytes:
+        """
+        Encodes to the binary wire format of `jsonb`, which is the json text prefixed with a version byte.
+
+            >>> create_json_codec('json', SerializerDispatch({})).encode_jsonb_binary({'a': 1})
+            b'\\x01{"a": 1}'
+        """
+        return JSONB_BINARY_VERSION + self.dumps_bytes(obj)
+    # end def
+
+    def decode_jsonb_binary(self, data: bytes) -> Any:
+        """
+        Decodes the binary wire format of `jsonb`, without decoding it to a `str` first.
+
+            >>> create_json_codec('json', SerializerDispatch({})).decode_jsonb_binary(b'\\x01{"a": 1}')
+            {'a': 1}
+        """
+        if data[:1] != JSONB_BINARY_VERSION:
+            raise ValueError(f'Unsupported jsonb binary format version {data[:1]!r}.')
+        # end if
+        return self.loads(data[1:])
+    # end def
+
+    def decode_json_binary(self, data: bytes) -> Any:
+        """
+        Decodes the binary wire format of `json`, which is just the utf-8 encoded text.
+        """
+        if not data:
+            return None
+        # end if
+        return self.loads(data)
+    # end def
+# end class
+
+
+def create_json_codec(library: Optional[str], dispatch: SerializerDispatch) -> JsonCodec:
+    """
+    Builds the json functions of the given library.
+
+        >>> codec = create_json_codec('json', SerializerDispatch({}))
+        >>> codec.dumps({'a': datetime.datetime(2022, 2, 3, 4, 5, 6)})
+        '{"a": "2022-02-03T04:05:06"}'
+        >>> codec.loads('{"a": [1, 2]}')
+        {'a': [1, 2]}
+
+    :param library: `'orjson'`, `'msgspec'` or `'json'` (the standard library), or `None` for the first one installed of those.
+    :param dispatch: Converter for the objects the library can't handle natively.
+    :return: The codec.
+    """
+    if library is None:
+        library = 'orjson' if orjson is not None else 'msgspec' if msgspec is not None else 'json'
+    # end if
+    if library == 'orjson':
+        if orjson is None:
+            raise ImportError('The json library orjson is not installed.')
+        # end if
+        orjson_options = orjson.OPT_NON_STR_KEYS  # like the standard library, which converts int keys and so on to strings.
+        return JsonCodec(
+            library=library,
+            dumps=lambda obj: orjson.dumps(obj, default=dispatch, option=orjson_options).decode('utf-8'),
+            dumps_bytes=lambda obj: orjson.dumps(obj, default=dispatch, option=orjson_options),
+            loads=orjson.loads,
+        )
+    elif library == 'msgspec':
+        if msgspec is None:
+            raise ImportError('The json library msgspec is not installed.')
+        # end if
+        encoder = msgspec.json.Encoder(enc_hook=dispatch)
+        decoder = msgspec.json.Decoder()
+        return JsonCodec(
+            library=library,
+            dumps=lambda obj: encoder.encode(obj).decode('utf-8'),
+            dumps_bytes=encoder.encode,
+            loads=decoder.decode,
+        )
+    elif library == 'json':
+        return JsonCodec(
+            library=library,
+            dumps=lambda obj: json.dumps(obj, default=dispatch),
+            dumps_bytes=lambda obj: json.dumps(obj, default=dispatch).encode('utf-8'),
+            loads=json.loads,
+        )
+    # end if
+    raise ValueError(f'Unknown json library {library!r}, must be one of {JSON_LIBRARIES!r}.')
+# end def
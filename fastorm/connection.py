@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import contextlib
+import functools
+import random
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, Union, AsyncIterator, Iterator, Callable
+
+import asyncpg
+from asyncpg import Connection, Pool
+from luckydonaldUtils.logger import logging
+
+__author__ = 'luckydonald'
+
+logger = logging.getLogger(__name__)
+if __name__ == '__main__':
+    logging.add_colored_handler(level=logging.DEBUG)
+# end if
+
+__all__ = [
+    'PoolConfig', 'PoolMetrics', 'SetupMetrics', 'Router', 'RouterSession', 'session',
+    'Transaction', 'TransactionMetrics', 'get_transaction_metrics', 'RETRYABLE_SQLSTATES', 'gather',
+    'bind', 'set_default', 'get_bound', 'is_in_transaction', 'after_commit', 'acquire', 'get_pool_metrics', 'forget_pool_metrics', 'get_setup_metrics', 'with_connection',
+    'with_read_connection', 'register_statement', 'get_registered_statements', 'clear_registered_statements', 'prepare_statements',
+]
+
+
+@dataclass
+class PoolConfig(object):
+    """
+    Settings for `FastORM.create_connection_pool(…)`, passed on to `asyncpg.create_pool(…)`.
+    The defaults are the ones of asyncpg.
+
+    Set `pgbouncer=True` when connecting through PgBouncer in transaction (or statement) pooling mode.
+    Then asyncpg's statement cache is disabled, so only unnamed statements are used, which don't outlive the query.
+    The named prepared statements otherwise used would end up at whatever server connection PgBouncer picks next,
+    failing with "prepared statement does not exist" (or "already exists").
+    PgBouncer 1.21+ with `max_prepared_statements` configured does handle named ones, there the mode is not needed.
+
+        >>> PoolConfig(pgbouncer=True).as_kwargs()['statement_cache_size']
+        0
+        >>> PoolConfig(min_size=2, max_size=20, command_timeout=5).as_kwargs()
+        {'min_size': 2, 'max_size': 20, 'max_queries': 50000, 'max_inactive_connection_lifetime': 300.0, 'statement_cache_size': 100, 'command_timeout': 5}
+    """
+    min_size: int = 10
+    max_size: int = 10
+    max_queries: int = 50000
+    max_inactive_connection_lifetime: float = 300.0
+    statement_cache_size: int = 100
+    command_timeout: Optional[float] = None
+    server_settings: Optional[Dict[str, str]] = None
+    connect_kwargs: Dict[str, Any] = field(default_factory=dict)  # anything else for `asyncpg.connect(…)`
+    pgbouncer: bool = False  # transaction pooling compatibility
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        """
+        :return: The keyword arguments for `asyncpg.create_pool(…)`, leaving out unset optional ones.
+        """
+        kwargs = asdict(self)
+        connect_kwargs = kwargs.pop('connect_kwargs')
+        pgbouncer = kwargs.pop('pgbouncer')
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        kwargs.update(connect_kwargs)
+        if pgbouncer:
+            kwargs.update(PGBOUNCER_CONNECT_KWARGS)
+        # end if
+        return kwargs
+    # end def
+# end class
+
+
+@dataclass
+class PoolMetrics(object):
+    """
+    Usage statistics of a pool, for the connections acquired by FastORM. See `get_pool_metrics(…)`.
+    """
+    acquires: int = 0
+    acquire_wait_total: float = 0.0  # seconds
+    acquire_wait_max: float = 0.0  # seconds
+    in_use: int = 0
+    max_in_use: int = 0
+    size: Optional[int] = None  # open connections, if the asyncpg version supports it.
+    idle_size: Optional[int] = None  # open connections not in use, if the asyncpg version supports it.
+
+    @property
+    def acquire_wait_average(self) -> float:
+        return self.acquire_wait_total / self.acquires if self.acquires else 0.0
+    # end def
+# end class
+
+
+@dataclass
+class SetupMetrics(object):
+    """
+    How long setting up new connections (registering the codecs and so on) took. See `get_setup_metrics()`.
+    """
+    connections: int = 0
+    setup_time_total: float = 0.0  # seconds
+    setup_time_max: float = 0.0  # seconds
+
+    @property
+    def setup_time_average(self) -> float:
+        return self.setup_time_total / self.connections if self.connections else 0.0
+    # end def
+
+    def record(self, seconds: float) -> None:
+        self.connections += 1
+        self.setup_time_total += seconds
+        self.setup_time_max = max(self.setup_time_max, seconds)
+    # end def
+# end class
+
+
+class Router(object):
+    """
+    Sends reads to the replica pools, and everything else to the primary pool.
+    Use it in place of a pool, e.g. `FastORM.bind(router)` or `Auction.get(router, id=4458)`.
+
+    Replicas lag behind the primary, so right after a write they may not have it yet.
+    Inside a `session()` all reads after the first write go to the primary as well (read-your-writes).
+
+        >>> router = Router('primary', ['replica 1', 'replica 2'])
+        >>> router.get_pool(read_only=True), router.get_pool(read_only=True), router.get_pool(read_only=True)
+        ('replica 1', 'replica 2', 'replica 1')
+        >>> router.get_pool(read_only=False)
+        'primary'
+
+    :param primary: The pool of the primary server.
+    :param replicas: The pools of the replica servers, used in turns. If empty, everything goes to the primary.
+    """
+    __slots__ = ['primary', 'replicas', '_next_replica']
+
+    def __init__(self, primary: Pool, replicas: List[Pool] = ()):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._next_replica = 0
+    # end def
+
+    def get_pool(self, read_only: bool) -> Pool:
+        """
+        :param read_only: If the queries to run only read, so they can go to a replica.
+        :return: The pool to acquire the connection from.
+        """
+        current_session = _session.get()
+        if not read_only:
+            if current_session is not None:
+                current_session.written = True
+            # end if
+            return self.primary
+        # end if
+        if not self.replicas or (current_session is not None and current_session.written):
+            return self.primary
+        # end if
+        pool = self.replicas[self._next_replica % len(self.replicas)]
+        self._next_replica += 1
+        return pool
+    # end def
+
+    async def close(self) -> None:
+        """
+        Closes all the pools.
+        """
+        for pool in (self.primary, *self.replicas):
+            await pool.close()
+            forget_pool_metrics(pool)
+        # end for
+    # end def
+# end class
+
+
+@dataclass
+class RouterSession(object):
+    """
+    The state of a `session()`.
+    """
+    written: bool = False  # if anything was sent to the primary yet
+# end class
+
+
+@dataclass
+class TransactionMetrics(object):
+    """
+    Statistics of the `Transaction`s, see `get_transaction_metrics()`.
+    """
+    transactions: int = 0  # started, not counting the retries
+    retries: int = 0  # attempts run again after a retryable error
+    failures: int = 0  # given up after running out of retries
+# end class
+
+
+PGBOUNCER_CONNECT_KWARGS = {'statement_cache_size': 0}  # see `PoolConfig.pgbouncer`
+RETRYABLE_SQLSTATES = frozenset({
+    '40001',  # serialization_failure
+    '40P01',  # deadlock_detected
+})
+
+
+_current: ContextVar[Union[Connection, Pool, None]] = ContextVar('fastorm_connection', default=None)
+_default: Optional[Union[Connection, Pool]] = None
+# by `id(pool)`, holding the pool so the id isn't reused while in here. asyncpg's Pool can't be weak referenced.
+_pool_metrics: Dict[int, Tuple[Pool, PoolMetrics]] = {}
+_setup_metrics = SetupMetrics()
+_registered_statements: Dict[str, None] = {}  # used as ordered set
+_session: ContextVar[Optional[RouterSession]] = ContextVar('fastorm_router_session', default=None)
+_transaction_metrics = TransactionMetrics()
+_after_commit: ContextVar[Optional[List[Callable[[], None]]]] = ContextVar('fastorm_after_commit', default=None)
+
+
+@contextlib.contextmanager
+def bind(conn_or_pool: Union[Connection, Pool]) -> Iterator[Union[Connection, Pool]]:
+    """
+    Makes the connection or pool the implicit one for the current context (e.g. asyncio task),
+    so the `conn` parameter can be left out:
+
+        >>> with bind(pool):  # doctest: +SKIP
+        ...     auction = await Auction.get(id=4458)
+
+    :param conn_or_pool: The connection, or the pool to acquire a connection from for every call.
+    """
+    token = _current.set(conn_or_pool)
+    try:
+        yield conn_or_pool
+    finally:
+        _current.reset(token)
+    # end try
+# end def
+
+
+@contextlib.contextmanager
+def session() -> Iterator[RouterSession]:
+    """
+    Groups the calls of e.g. a web request, so reads after a write see that write:
+    After the first write through a `Router`, the reads go to the primary instead of the replicas, too.
+
+        >>> with session():  # doctest: +SKIP
+        ...     await auction.update()
+        ...     auctions = await Auction.select(owner_id=auction.owner_id)  # not from a replica
+    """
+    token = _session.set(RouterSession())
+    try:
+        yield _session.get()
+    finally:
+        _session.reset(token)
+    # end try
+# end def
+
+
+def set_default(conn_or_pool: Optional[Union[Connection, Pool]]) -> None:
+    """
+    Sets the implicit connection or pool for the whole process, used if none is bound with `bind(…)`.
+    Unlike `bind(…)`, this is visible in already running tasks as well, e.g. when set in a web framework's startup hook.
+
+    :param conn_or_pool: The connection or pool. `None` to unset it again.
+    """
+    global _default
+    _default = conn_or_pool
+# end def
+
+
+def get_bound() -> Union[Connection, Pool]:
+    """
+    The connection or pool bound with `bind(…)`, or else the one set with `set_default(…)`.
+    """
+    conn_or_pool = _current.get()
+    if conn_or_pool is None:
+        conn_or_pool = _default
+    # end if
+    if conn_or_pool is None:
+        raise RuntimeError('No connection given, and none bound with FastORM.bind(…) or FastORM.set_default(…).')
+    # end if
+    return conn_or_pool
+# end def
+
+
+def is_in_transaction(conn_or_pool: Optional[Union[Connection, Pool, Router]] = None) -> bool:
+    """
+    If the connection (or else the bound one) is inside a transaction, so it could see changes not committed yet.
+    Pools and `Router`s are not, as a fresh connection is acquired from them.
+    """
+    if conn_or_pool is None:
+        conn_or_pool = _current.get()
+    # end if
+    if conn_or_pool is None:
+        conn_or_pool = _default
+    # end if
+    if conn_or_pool is None or isinstance(conn_or_pool, (Pool, Router)):
+        return False
+    # end if
+    is_in_transaction_function = getattr(conn_or_pool, 'is_in_transaction', None)
+    return is_in_transaction_function is not None and is_in_transaction_function()
+# end def
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Registers a function to be called after the `Transaction` of the current context was committed,
+    e.g. to invalidate caches again, as other connections could have cached the old rows until then.
+    Outside of a `Transaction` nothing is done.
+    """
+    callbacks = _after_commit.get()
+    if callbacks is not None:
+        callbacks.append(callback)
+    # end if
+# end def
+
+
+def get_pool_metrics(pool: Pool) -> PoolMetrics:
+    """
+    The statistics of a pool.
+    Only connections acquired by FastORM itself are counted, i.e. when no explicit `conn` was given.
+
+    :param pool: The pool.
+    """
+    metrics = _get_pool_metrics_of(pool)
+    if hasattr(pool, 'get_size'):  # asyncpg >= 0.25
+        metrics.size = pool.get_size()
+        metrics.idle_size = pool.get_idle_size()
+    # end if
+    return metrics
+# end def
+
+
+def _get_pool_metrics_of(pool: Pool) -> PoolMetrics:
+    entry = _pool_metrics.get(id(pool))
+    if entry is None:
+        # a new pool, so drop the ones of closed pools, to not pile them up.
+        for key, (other_pool, _) in list(_pool_metrics.items()):
+            if other_pool.is_closing():
+                del _pool_metrics[key]
+            # end if
+        # end for
+        entry = _pool_metrics[id(pool)] = (pool, PoolMetrics())
+    # end if
+    return entry[1]
+# end def
+
+
+def forget_pool_metrics(pool: Pool) -> None:
+    """
+    Drops the statistics of a pool, e.g. after closing it.
+    Those of closed pools are dropped anyway as soon as another pool is used.
+    """
+    _pool_metrics.pop(id(pool), None)
+# end def
+
+
+def get_setup_metrics() -> SetupMetrics:
+    """
+    The statistics of setting up new connections, over all pools and single connections.
+    """
+    return _setup_metrics
+# end def
+
+
+def get_transaction_metrics() -> TransactionMetrics:
+    """
+    The statistics of all the `Transaction`s, including how often they were retried.
+    """
+    return _transaction_metrics
+# end def
+
+
+def register_statement(sql: str) -> None:
+    """
+    Adds a statement to be prepared on every new connection, see `prepare_statements(…)`.
+
+    :param sql: The sql, exactly as it will be run later, as the statement cache is keyed by the sql text.
+    """
+    _registered_statements[sql] = None
+# end def
+
+
+def get_registered_statements() -> List[str]:
+    """
+    The statements added with `register_statement(…)`, in that order.
+    """
+    return list(_registered_statements)
+# end def
+
+
+def clear_registered_statements() -> None:
+    """
+    Removes all the statements added with `register_statement(…)`.
+    """
+    _registered_statements.clear()
+# end def
+
+
+# asyncpg has no public way to put a statement into the cache `fetch(…)`, `execute(…)` and so on look up:
+# `conn.prepare(…)` bypasses it. So the private `conn._get_statement(…)` is used, in the versions known to have it.
+STATEMENT_CACHE_ASYNCPG_VERSIONS = ((0, 22), (0, 33))  # from (inclusive), to (exclusive)
+
+
+def _can_fill_statement_cache() -> bool:
+    """
+    If the installed asyncpg is one where `prepare_statements(…)` knows how to fill the statement cache.
+
+        >>> _can_fill_statement_cache()
+        True
+    """
+    version = tuple(int(part) for part in re.findall(r'\d+', asyncpg.__version__)[:2])
+    return STATEMENT_CACHE_ASYNCPG_VERSIONS[0] <= version < STATEMENT_CACHE_ASYNCPG_VERSIONS[1]
+# end def
+
+
+async def prepare_statements(conn: Connection) -> int:
+    """
+    Prepares the statements added with `register_statement(…)` at that connection,
+    and puts them into it's statement cache, so the first queries using them skip parsing and planning.
+    Already cached ones are not prepared again.
+    Nothing is prepared if the statement cache of the connection is disabled, e.g. with `PoolConfig(pgbouncer=True)`,
+    or if the installed asyncpg version isn't one of `STATEMENT_CACHE_ASYNCPG_VERSIONS`.
+
+    :param conn: The connection.
+    :return: The number of statements now in the cache.
+    """
+    statements = get_registered_statements()
+    if not statements:
+        return 0
+    # end if
+    if not _can_fill_statement_cache():
+        logger.debug(f'Not preparing statements, unknown statement cache of asyncpg {asyncpg.__version__}.')
+        return 0
+    # end if
+    if not conn._stmt_cache_enabled:
+        # they would be unnamed statements, gone right away.
+        return 0
+    # end if
+    for sql in statements:
+        # with `use_cache=True` (the default) it's looked up and stored in the statement cache, like `fetch(…)` does.
+        await conn._get_statement(sql, None)
+    # end for
+    logger.debug(f'Prepared {len(statements)} statements.')
+    return len(statements)
+# end def
+
+
+@contextlib.asynccontextmanager
+async def acquire(
+    conn_or_pool: Optional[Union[Connection, Pool, Router]] = None,
+    *,
+    read_only: bool = False,
+) -> AsyncIterator[Connection]:
+    """
+    Provides a connection to run queries at.
+
+    :param conn_or_pool: A connection is used directly, from a pool one is acquired (and released afterwards).
+                         From a `Router` one of the pool it picks is acquired.
+                         If `None`, the one bound with `bind(…)` is used, or else the one set with `set_default(…)`.
+    :param read_only: If only reading queries will be run, so a `Router` can pick a replica.
+    """
+    if conn_or_pool is None:
+        conn_or_pool = get_bound()
+    # end if
+    if isinstance(conn_or_pool, Router):
+        async with acquire(conn_or_pool.get_pool(read_only=read_only)) as conn:
+            yield conn
+        # end with
+        return
+    # end if
+    if not isinstance(conn_or_pool, Pool):
+        yield conn_or_pool
+        return
+    # end if
+    metrics = _get_pool_metrics_of(conn_or_pool)
+    start = time.perf_counter()
+    async with conn_or_pool.acquire() as conn:
+        wait = time.perf_counter() - start
+        metrics.acquires += 1
+        metrics.acquire_wait_total += wait
+        metrics.acquire_wait_max = max(metrics.acquire_wait_max, wait)
+        metrics.in_use += 1
+        metrics.max_in_use = max(metrics.max_in_use, metrics.in_use)
+        # nested calls of this task use the same connection, e.g. `get(…)` calling `select(…)`.
+        token = _current.set(conn)
+        try:
+            yield conn
+        finally:
+            _current.reset(token)
+            metrics.in_use -= 1
+        # end try
+    # end with
+# end def
+
+
+def with_connection(function: Callable, *, read_only: bool = False) -> Callable:
+    """
+    Decorator for methods having a `conn` parameter as first parameter, which makes that one optional.
+    If it is not given, a connection is provided by `acquire()`, e.g. from the pool bound with `bind(…)`.
+    A pool or a `Router` can be given as `conn`, too.
+    """
+    @functools.wraps(function)
+    async def wrapper(self_or_cls, conn: Optional[Connection] = None, *args, **kwargs):
+        if conn is not None and not isinstance(conn, (Pool, Router)):
+            return await function(self_or_cls, conn, *args, **kwargs)
+        # end if
+        async with acquire(conn, read_only=read_only) as acquired_conn:
+            return await function(self_or_cls, acquired_conn, *args, **kwargs)
+        # end with
+    # end def
+    return wrapper
+# end def
+
+
+async def gather(
+    conn_or_pool: Union[Connection, Pool, Router, None],
+    *calls: Union[Awaitable[Any], Callable[[], Awaitable[Any]]],
+    concurrency: int = 10,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Runs the calls concurrently, each one with it's own connection from the pool.
+    At most `concurrency` of them run at the same time, so the pool isn't exhausted for everybody else.
+
+        >>> auctions, user, bids = await gather(  # doctest: +SKIP
+        ...     pool,
+        ...     Auction.select(status='open'),
+        ...     User.get(id=42),
+        ...     lambda: Bid.select(auction_id=4458),
+        ... )
+
+    :param conn_or_pool: The pool or `Router` to acquire the connections from. If `None`, the bound one.
+                         A single connection can only run one query at a time, so they run one after another then.
+    :param calls: The coroutines of model calls without a `conn` given, or functions returning such.
+    :param concurrency: How many calls may run at the same time at most.
+    :param return_exceptions: Like for `asyncio.gather(…)`, if errors should be returned instead of raised.
+    :return: The results, in the order of the calls.
+    """
+    if conn_or_pool is None:
+        conn_or_pool = get_bound()
+    # end if
+    if not isinstance(conn_or_pool, (Pool, Router)):
+        concurrency = 1
+    # end if
+    if concurrency < 1:
+        raise ValueError(f'The concurrency must be at least 1, not {concurrency!r}.')
+    # end if
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(call):
+        async with semaphore:
+            # every task has it's own context, so the calls inside acquire their own connection.
+            with bind(conn_or_pool):
+                return await (call() if callable(call) else call)
+            # end with
+        # end with
+    # end def
+
+    return await asyncio.gather(*[run(call) for call in calls], return_exceptions=return_exceptions)
+# end def
+
+
+def with_read_connection(function: Callable) -> Callable:
+    """
+    Like `with_connection`, but for methods only reading, so a `Router` can use a replica.
+    """
+    return with_connection(function, read_only=True)
+# end def
+
+
+class Transaction(object):
+    """
+    Runs a block in a database transaction, with the connection bound for all the model calls inside it.
+
+        >>> async with Transaction(pool, isolation='serializable') as conn:  # doctest: +SKIP
+        ...     auction = await Auction.get(id=4458)
+
+    To run the block again on serialization failures and deadlocks, iterate over it for the attempts:
+
+        >>> async for attempt in Transaction(pool, isolation='serializable', retries=3):  # doctest: +SKIP
+        ...     async with attempt as conn:
+        ...         auction = await Auction.get(id=4458)
+        ...         auction.bid_count += 1
+        ...         await auction.update()
+
+    A retryable error (see `RETRYABLE_SQLSTATES`) rolls back the attempt, and after a jittered backoff the next one runs.
+    When out of retries, the error is raised. Other errors are raised right away.
+
+    :param conn_or_pool: The connection, pool or `Router` (using the primary). If `None`, the bound one.
+    :param isolation: The isolation level, `'serializable'`, `'repeatable_read'` or `'read_committed'`. `None` for the default.
+    :param retries: How often to run the block again at most. Needs iterating over the attempts, `async with` raises a `ValueError` otherwise.
+    :param backoff: Seconds to wait before the first retry at most, doubled for every following one.
+    :param max_backoff: Seconds to wait before a retry at most.
+    """
+    def __init__(
+        self,
+        conn_or_pool: Optional[Union[Connection, Pool, Router]] = None,
+        *,
+        isolation: Optional[str] = None,
+        retries: int = 0,
+        backoff: float = 0.05,
+        max_backoff: float = 2.0,
+    ):
+        self.conn_or_pool = conn_or_pool
+        self.isolation = isolation
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.attempt = 0  # the current attempt, starting at 0
+        self._retrying = False  # if we are iterated, so retryable errors can be swallowed
+        self._retry_error: Optional[BaseException] = None
+        self._exit_stack: Optional[contextlib.AsyncExitStack] = None
+        self._transaction = None
+        self._after_commit: List[Callable[[], None]] = []  # see `after_commit(…)`
+        self._after_commit_token = None
+    # end def
+
+    async def __aenter__(self) -> Connection:
+        if self.retries > 0 and not self._retrying:
+            # `async with` alone can't run the block again, the retries would silently never happen.
+            raise ValueError('Retries need iterating over the attempts: async for attempt in Transaction(…, retries=…).')
+        # end if
+        if self.attempt == 0:
+            _transaction_metrics.transactions += 1
+        # end if
+        self._retry_error = None
+        self._exit_stack = contextlib.AsyncExitStack()
+        try:
+            conn = await self._exit_stack.enter_async_context(acquire(self.conn_or_pool, read_only=False))
+            self._exit_stack.enter_context(bind(conn))
+            kwargs = {} if self.isolation is None else {'isolation': self.isolation}
+            self._transaction = conn.transaction(**kwargs)
+            await self._transaction.start()
+        except BaseException:
+            await self._exit_stack.aclose()
+            raise
+        # end try
+        self._after_commit = []
+        self._after_commit_token = _after_commit.set(self._after_commit)
+        return conn
+    # end def
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> bool:
+        error = exc_value
+        try:
+            if error is None:
+                try:
+                    await self._transaction.commit()  # serializable ones can fail here, too.
+                except Exception as e:
+                    error = e
+                # end try
+            else:
+                await self._transaction.rollback()
+            # end if
+        finally:
+            await self._exit_stack.aclose()
+            _after_commit.reset(self._after_commit_token)
+        # end try
+        if error is None:
+            outer_callbacks = _after_commit.get()
+            if outer_callbacks is not None:
+                # a nested one, only really committed with the outer one.
+                outer_callbacks.extend(self._after_commit)
+            else:
+                for callback in self._after_commit:
+                    callback()
+                # end for
+            # end if
+            return False
+        # end if
+        if self._retrying and getattr(error, 'sqlstate', None) in RETRYABLE_SQLSTATES:
+            if self.attempt < self.retries:
+                logger.debug(f'Transaction attempt {self.attempt} failed, will retry: {error!r}')
+                self._retry_error = error
+                return True  # swallow it, the next attempt runs
+            # end if
+            _transaction_metrics.failures += 1
+        # end if
+        if error is not exc_value:
+            raise error
+        # end if
+        return False
+    # end def
+
+    async def __aiter__(self) -> AsyncIterator['Transaction']:
+        self._retrying = True
+        self.attempt = 0
+        while True:
+            yield self
+            if self._retry_error is None:
+                return
+            # end if
+            _transaction_metrics.retries += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** self.attempt)
+            self.attempt += 1
+            await asyncio.sleep(random.uniform(0, delay))  # jitter, so the conflicting ones don't collide again.
+        # end while
+    # end def
+# end class
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import inspect
-from typing import List, Any, TypeVar, Generic, Union
+from abc import ABC, abstractmethod
+from typing import List, Any, TypeVar, Generic, Union, Tuple, Dict, Optional
 
 from luckydonaldUtils.logger import logging
 from pydantic.fields import Undefined, UndefinedType
@@ -15,7 +16,7 @@ if __name__ == '__main__':
     logging.add_colored_handler(level=logging.DEBUG)
 # end if
 
-__all__ = ['In']
+__all__ = ['In', 'Expression', 'Inc', 'Expr', 'ArrayAppend', 'JsonbPatch']
 
 VARIABLE_TYPE = TypeVar("VARIABLE_TYPE", bound=Any)
 
@@ -160,3 +161,234 @@ class In(Generic[VARIABLE_TYPE]):
         return NotImplemented
     # end def
 # end class
+
+
+class Expression(ABC):
+    """
+    Base class for values which are computed by the database server, instead of being sent as an absolute value.
+    Assign them to a field and `update(…)` will compile it into the `SET` part, for example:
+
+        >>> auction.bid_count = Inc(1)  # doctest: +SKIP
+        >>> await auction.update(conn)  # doctest: +SKIP
+        >>> auction.bid_count  # doctest: +SKIP
+        42
+
+    The value resulting on the server is written back to the field afterwards,
+    unless `needs_write_back` is `False` because the result is already known locally.
+    """
+    __slots__ = []
+
+    needs_write_back: bool = True
+
+    @property
+    def sql_cache_key(self) -> Optional[Any]:
+        """
+        Something hashable which is equal for all expressions resulting in the same sql (given the same placeholder index),
+        so compiled statements using this expression can be cached.
+        `None` (the default) if the sql depends on the values, so it can't be cached.
+        """
+        return None
+    # end def
+
+    @abstractmethod
+    def build_sql(self, field: str, placeholder_index: int) -> Tuple[str, List[Any], int]:
+        """
+        Builds the sql for the right hand side of `"field" = …`.
+
+        :param field: The sql field name this expression is assigned to, not quoted.
+        :param placeholder_index: The last already used placeholder.
+        :return: The sql string, the values of the used placeholders and the last used placeholder index.
+        """
+        pass
+    # end def
+# end class
+
+
+class Inc(Expression):
+    """
+    Increments (or with a negative amount decrements) the field atomically.
+
+        >>> Inc(1).build_sql('bid_count', placeholder_index=3)
+        ('"bid_count" + $4', [1], 4)
+    """
+    __slots__ = ['amount']
+
+    def __init__(self, amount: Any = 1):
+        self.amount = amount
+    # end def
+
+    def __repr__(self):
+        return f'{self.__class__.__name__!s}({self.amount!r})'
+    # end def
+
+    @property
+    def sql_cache_key(self) -> Optional[Any]:
+        return self.__class__
+    # end def
+
+    def build_sql(self, field: str, placeholder_index: int) -> Tuple[str, List[Any], int]:
+        placeholder_index += 1
+        return f'"{field}" + ${placeholder_index}', [self.amount], placeholder_index
+    # end def
+# end class
+
+
+class Expr(Expression):
+    """
+    A raw sql expression, for example `Expr("now()")`.
+    The sql is inserted as is, so it must never contain user input.
+
+        >>> Expr("now()").build_sql('updated_at', placeholder_index=3)
+        ('now()', [], 3)
+    """
+    __slots__ = ['sql']
+
+    def __init__(self, sql: str):
+        self.sql = sql
+    # end def
+
+    def __repr__(self):
+        return f'{self.__class__.__name__!s}({self.sql!r})'
+    # end def
+
+    @property
+    def sql_cache_key(self) -> Optional[Any]:
+        return self.__class__, self.sql
+    # end def
+
+    def build_sql(self, field: str, placeholder_index: int) -> Tuple[str, List[Any], int]:
+        return self.sql, [], placeholder_index
+    # end def
+# end class
+
+
+class ArrayAppend(Expression):
+    """
+    Appends a value to an array field atomically.
+
+        >>> ArrayAppend('foo').build_sql('tags', placeholder_index=0)
+        ('array_append("tags", $1)', ['foo'], 1)
+    """
+    __slots__ = ['value']
+
+    def __init__(self, value: Any):
+        self.value = value
+    # end def
+
+    def __repr__(self):
+        return f'{self.__class__.__name__!s}({self.value!r})'
+    # end def
+
+    @property
+    def sql_cache_key(self) -> Optional[Any]:
+        return self.__class__
+    # end def
+
+    def build_sql(self, field: str, placeholder_index: int) -> Tuple[str, List[Any], int]:
+        placeholder_index += 1
+        return f'array_append("{field}", ${placeholder_index})', [self.value], placeholder_index
+    # end def
+# end class
+
+
+class JsonbPatch(Expression):
+    """
+    Changes only some paths inside of a `JSONB` field, instead of replacing the whole document.
+    `build_sql_update(…)` creates those automatically for changed `dict` values, see `JsonbPatch.from_diff(…)`.
+
+        >>> patch = JsonbPatch(changes=[(['a', 'b'], 1)], deletions=[['c']])
+        >>> patch.build_sql('metadata', placeholder_index=0)
+        ('jsonb_set(("metadata" #- $1::text[]), $2::text[], $3::jsonb)', [['c'], ['a', 'b'], 1], 3)
+    """
+    __slots__ = ['changes', 'deletions']
+
+    needs_write_back: bool = False
+
+    def __init__(self, changes: List[Tuple[List[str], Any]], deletions: List[List[str]]):
+        self.changes = changes
+        self.deletions = deletions
+    # end def
+
+    def __repr__(self):
+        return f'{self.__class__.__name__!s}(changes={self.changes!r}, deletions={self.deletions!r})'
+    # end def
+
+    def __len__(self):
+        return len(self.changes) + len(self.deletions)
+    # end def
+
+    @classmethod
+    def from_diff(cls, old: Dict[str, Any], new: Dict[str, Any], *, max_changes: int) -> Optional['JsonbPatch']:
+        """
+        Compares two json objects path by path.
+        Nested objects are compared recursively, everything else (including lists) is replaced as a whole.
+
+            >>> JsonbPatch.from_diff({'a': {'b': 1, 'c': 2}, 'd': 3}, {'a': {'b': 4, 'c': 2}, 'e': [5]}, max_changes=10)
+            JsonbPatch(changes=[(['e'], [5]), (['a', 'b'], 4)], deletions=[['d']])
+
+            >>> JsonbPatch.from_diff({'a': 1, 'b': 2}, {'a': 3, 'b': 4}, max_changes=1) is None
+            True
+
+        :param old: The json object as known to be in the database.
+        :param new: The json object it should be changed to.
+        :param max_changes: If more paths than that are changed, the patch isn't worth it.
+        :return: The patch, or `None` if a full replacement should be used instead.
+        """
+        changes: List[Tuple[List[str], Any]] = []
+        deletions: List[List[str]] = []
+        pending = [([], old, new)]
+        while pending:
+            path, old_object, new_object = pending.pop(0)
+            for key in old_object:
+                if key not in new_object:
+                    deletions.append(path + [str(key)])
+                # end if
+            # end for
+            for key, value in new_object.items():
+                if key in old_object:
+                    old_value = old_object[key]
+                    if old_value == value:
+                        continue
+                    # end if
+                    if isinstance(old_value, dict) and isinstance(value, dict):
+                        pending.append((path + [str(key)], old_value, value))
+                        continue
+                    # end if
+                # end if
+                changes.append((path + [str(key)], value))
+            # end for
+            if len(changes) + len(deletions) > max_changes:
+                return None
+            # end if
+        # end while
+        if not changes and not deletions:
+            return None
+        # end if
+        return cls(changes=changes, deletions=deletions)
+    # end def
+
+    def build_sql(self, field: str, placeholder_index: int) -> Tuple[str, List[Any], int]:
+        sql = f'"{field}"'
+        values: List[Any] = []
+        for path in self.deletions:
+            placeholder_index += 1
+            sql = f'({sql} #- ${placeholder_index}::text[])'
+            values.append(path)
+        # end for
+        for path, value in self.changes:
+            placeholder_index += 1
+            path_placeholder = placeholder_index
+            values.append(path)
+            if value is None:
+                # a NULL parameter would make jsonb_set(…) return NULL for the whole document.
+                value_sql = "'null'::jsonb"
+            else:
+                placeholder_index += 1
+                value_sql = f'${placeholder_index}::jsonb'
+                values.append(value)
+            # end if
+            sql = f'jsonb_set({sql}, ${path_placeholder}::text[], {value_sql})'
+        # end for
+        return sql, values, placeholder_index
+    # end def
+# end class
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from typing import ForwardRef, Optional
+import hashlib
 import re
 
 from luckydonaldUtils.logger import logging
@@ -64,3 +65,23 @@ def snakecase(string: str) -> str:
     return re.sub(r"_+", '_', string)
 # end def
 
+
+
+POSTGRES_MAX_IDENTIFIER_LENGTH = 63  # longer ones are silently truncated by postgres.
+
+
+def shorten_identifier(name: str) -> str:
+    """
+    Shortens a name to the length postgres allows, keeping it unique by ending with a hash of the full name.
+
+        >>> shorten_identifier('short')
+        'short'
+        >>> len(shorten_identifier('a' * 100))
+        63
+    """
+    if len(name) <= POSTGRES_MAX_IDENTIFIER_LENGTH:
+        return name
+    # end if
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+    return f'{name[:POSTGRES_MAX_IDENTIFIER_LENGTH - len(digest) - 1]}_{digest}'
+# end def
@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import unittest
+from textwrap import dedent
+
+from fastorm import FastORM, Batch, StaleObjectError
+from fastorm.query import Inc
+
+
+class AuditLog(FastORM):
+    _table_name = 'audit_log'
+    _primary_keys = ['id']
+    _automatic_fields = ['id', 'created_at']
+
+    id: int = None
+    created_at: datetime.datetime = None
+    action: str
+# end class
+
+
+class Counter(FastORM):
+    _table_name = 'counter'
+    _primary_keys = ['id']
+
+    id: int
+    value: int
+# end class
+
+
+class Document(FastORM):
+    _table_name = 'document'
+    _primary_keys = ['id']
+    _version_field = 'version'
+
+    id: int
+    title: str
+    version: int = 0
+# end class
+
+
+class FakeConnection(object):
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = []
+    # end def
+
+    async def fetch(self, sql, *args):
+        self.fetched.append((sql, *args))
+        return self.rows
+    # end def
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class BatchTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.counter = Counter(id=4, value=10)
+        self.counter._database_cache_overwrite_with_current()
+    # end def
+
+    def test_build_sql(self):
+        batch = Batch()
+        self.assertEqual(0, batch.insert(AuditLog(action='bid')))
+        self.counter.value = Inc(1)
+        self.assertEqual(1, batch.update(self.counter))
+        self.assertEqual(2, batch.get(Counter, id=5))
+        expected_sql = dedent(
+            """
+            WITH "batch_0" AS (
+            INSERT INTO "audit_log" ("action")
+             VALUES ($1)
+             RETURNING "id", "created_at"
+            ), "batch_1" AS (
+            UPDATE "counter"
+             SET "value" = "value" + $2
+             WHERE "id" = $3
+             RETURNING "value"
+            ), "batch_2" AS (
+            SELECT "id","value" FROM "counter" WHERE "id" = $4
+            )
+            SELECT 0 AS "statement", to_jsonb("batch_0") AS "row" FROM "batch_0"
+            UNION ALL
+            SELECT 1 AS "statement", to_jsonb("batch_1") AS "row" FROM "batch_1"
+            UNION ALL
+            SELECT 2 AS "statement", to_jsonb("batch_2") AS "row" FROM "batch_2"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = batch.build_sql()
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['bid', 1, 4, 5], actual_params)
+    # end def
+
+    def test_run(self):
+        batch = Batch()
+        audit_log = AuditLog(action='bid')
+        batch.insert(audit_log)
+        self.counter.value = Inc(1)
+        batch.update(self.counter)
+        batch.select(Counter, value=11)
+        batch.delete(Counter(id=6, value=0))
+        conn = FakeConnection([
+            {'statement': 0, 'row': {'id': 1, 'created_at': '2022-02-03T04:05:06'}},
+            {'statement': 1, 'row': {'value': 11}},
+            {'statement': 2, 'row': {'id': 4, 'value': 11}},
+            {'statement': 2, 'row': {'id': 7, 'value': 11}},
+            {'statement': 3, 'row': {'deleted': True}},
+        ])
+        results = asyncio.run(batch.run(conn))
+        self.assertEqual(1, len(conn.fetched))
+        self.assertIs(audit_log, results[0])
+        self.assertEqual(1, audit_log.id)
+        self.assertEqual(datetime.datetime(2022, 2, 3, 4, 5, 6), audit_log.created_at)
+        self.assertIs(self.counter, results[1])
+        self.assertEqual(11, self.counter.value)
+        self.assertEqual({}, self.counter.get_changes())
+        self.assertEqual([4, 7], [counter.id for counter in results[2]])
+        self.assertIsNone(results[3])
+    # end def
+
+    def test_stale_update(self):
+        document = Document(id=1, title='foo', version=3)
+        document._database_cache_overwrite_with_current()
+        document.title = 'bar'
+        batch = Batch()
+        batch.update(document)
+        with self.assertRaises(StaleObjectError):
+            asyncio.run(batch.run(FakeConnection([])))
+        # end with
+    # end def
+
+    def test_stale_update_with_insert(self):
+        documents = [Document(id=document_id, title='foo', version=3) for document_id in (1, 2)]
+        batch = Batch()
+        for document in documents:
+            document._database_cache_overwrite_with_current()
+            document.title = 'bar'
+            batch.update(document)
+        # end for
+        audit_log = AuditLog(action='edit')
+        batch.insert(audit_log)
+        conn = FakeConnection([{'statement': 2, 'row': {'id': 5, 'created_at': '2022-02-03T04:05:06'}}])
+        with self.assertRaises(StaleObjectError) as context:
+            asyncio.run(batch.run(conn))
+        # end with
+        self.assertIn("Document {'id': 1}", str(context.exception))
+        self.assertIn("Document {'id': 2}", str(context.exception))
+        self.assertEqual(5, audit_log.id)  # written back, the row exists.
+    # end def
+
+    def test_without_returned_rows(self):
+        batch = Batch()
+        self.counter.value = 12
+        batch.update(self.counter)
+        actual_sql, *actual_params = batch.build_sql()
+        self.assertTrue(actual_sql.endswith('\nSELECT NULL::int AS "statement", NULL::jsonb AS "row" WHERE FALSE\n;'))
+        self.assertEqual([self.counter], asyncio.run(batch.run(FakeConnection([]))))
+    # end def
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            Batch().build_sql()
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
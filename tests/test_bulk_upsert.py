@@ -0,0 +1,140 @@
+import unittest
+from textwrap import dedent
+from typing import Optional
+
+from fastorm import FastORM
+
+
+class Table1(FastORM):
+    _table_name = 'table1'
+    _automatic_fields = ['id']
+    _primary_keys = ['id']
+
+    id: Optional[int]
+    name: str
+    number: int
+# end class
+
+
+class Table2(FastORM):
+    _table_name = 'table2'
+    _primary_keys = ['table1', 'name']
+
+    table1: Table1
+    name: str
+# end class
+
+
+# noinspection SqlNoDataSourceInspection,SqlResolve
+class BulkUpsertTestCase(unittest.TestCase):
+    def test_prepare_records_without_automatic(self):
+        columns, records = Table1._bulk_prepare_records([
+            Table1(id=None, name='a', number=1),
+            dict(id=None, name='b', number=2),
+        ])
+        self.assertEqual(['name', 'number'], columns)
+        self.assertEqual([('a', 1), ('b', 2)], records)
+    # end def
+
+    def test_prepare_records_with_automatic(self):
+        columns, records = Table1._bulk_prepare_records([
+            Table1(id=4457, name='a', number=1),
+            Table1(id=4458, name='b', number=2),
+        ])
+        self.assertEqual(['id', 'name', 'number'], columns)
+        self.assertEqual([(4457, 'a', 1), (4458, 'b', 2)], records)
+    # end def
+
+    def test_prepare_records_with_some_automatic(self):
+        rows = [
+            Table1(id=None, name='a', number=1),
+            Table1(id=4458, name='b', number=2),
+        ]
+        with self.assertRaises(ValueError):
+            Table1._bulk_prepare_records(rows)
+        # end with
+        columns, records = Table1._bulk_prepare_records(rows, ignore_setting_automatic_fields=True)
+        self.assertEqual(['name', 'number'], columns)
+        self.assertEqual([('a', 1), ('b', 2)], records)
+    # end def
+
+    def test_staging_table_name(self):
+        class LongName(FastORM):
+            _table_name = 'a_table_with_a_really_long_name_which_postgres_would_truncate'
+            _primary_keys = ['id']
+
+            id: int
+        # end class
+
+        first, second = LongName._get_staging_table_name(), LongName._get_staging_table_name()
+        self.assertLessEqual(len(first), 63)
+        self.assertNotEqual(first, second)
+    # end def
+
+    def test_prepare_records_references(self):
+        columns, records = Table2._bulk_prepare_records([
+            Table2(table1=12, name='a'),
+        ])
+        self.assertEqual(['table1__id', 'name'], columns)
+        self.assertEqual([(12, 'a')], records)
+    # end def
+
+    def test_create_staging(self):
+        expected_sql = dedent(
+            """
+            CREATE TEMP TABLE "table1__staging" ON COMMIT DROP AS
+             SELECT "id","name","number" FROM "table1"
+             WITH NO DATA
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Table1.build_sql_create_staging('table1__staging', ['id', 'name', 'number'])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([], actual_params)
+    # end def
+
+    def test_upsert_auto(self):
+        expected_sql = dedent(
+            """
+            WITH "upserted" AS (
+             INSERT INTO "table1" ("id","name","number")
+             SELECT "id","name","number" FROM "table1__staging"
+             ON CONFLICT ("id") DO UPDATE SET "name" = EXCLUDED."name", "number" = EXCLUDED."number"
+             RETURNING (xmax = 0) AS "inserted"
+            )
+            SELECT count(*) FILTER (WHERE "inserted") AS "inserted", count(*) FILTER (WHERE NOT "inserted") AS "updated" FROM "upserted"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Table1.build_sql_bulk_upsert('table1__staging', ['id', 'name', 'number'], upsert_on_conflict=True)
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([], actual_params)
+    # end def
+
+    def test_upsert_only_conflict_fields(self):
+        expected_sql = dedent(
+            """
+            WITH "upserted" AS (
+             INSERT INTO "table2" ("table1__id","name")
+             SELECT "table1__id","name" FROM "table2__staging"
+             ON CONFLICT ("table1__id", "name") DO NOTHING
+             RETURNING (xmax = 0) AS "inserted"
+            )
+            SELECT count(*) FILTER (WHERE "inserted") AS "inserted", count(*) FILTER (WHERE NOT "inserted") AS "updated" FROM "upserted"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Table2.build_sql_bulk_upsert('table2__staging', ['table1__id', 'name'], upsert_on_conflict=True)
+        self.assertEqual(expected_sql, actual_sql)
+    # end def
+
+    def test_upsert_off(self):
+        actual_sql, *actual_params = Table1.build_sql_bulk_upsert('table1__staging', ['name', 'number'], upsert_on_conflict=False)
+        self.assertNotIn('ON CONFLICT', actual_sql)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
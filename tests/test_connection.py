@@ -0,0 +1,151 @@
+import asyncio
+import unittest
+
+from fastorm import FastORM, PoolConfig
+from fastorm.connection import acquire, get_bound, get_pool_metrics, get_setup_metrics, with_connection
+from fastorm import connection
+
+
+class Example(object):
+    @with_connection
+    async def run(self, conn=None, value=None):
+        return conn, value
+    # end def
+# end class
+
+
+class Item(FastORM):
+    _table_name = 'item'
+    _primary_keys = ['id']
+
+    id: int
+# end class
+
+
+class ConnectionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        FastORM.set_default(None)
+    # end def
+
+    def tearDown(self) -> None:
+        FastORM.set_default(None)
+    # end def
+
+    def test_pool_config(self):
+        config = PoolConfig(min_size=1, max_size=4, statement_cache_size=0, connect_kwargs={'ssl': 'require'})
+        self.assertEqual(
+            {'min_size': 1, 'max_size': 4, 'max_queries': 50000, 'max_inactive_connection_lifetime': 300.0, 'statement_cache_size': 0, 'ssl': 'require'},
+            config.as_kwargs(),
+        )
+    # end def
+
+    def test_pool_config_pgbouncer(self):
+        config = PoolConfig(statement_cache_size=500, pgbouncer=True)
+        self.assertEqual(0, config.as_kwargs()['statement_cache_size'])
+        self.assertNotIn('pgbouncer', config.as_kwargs())
+    # end def
+
+    def test_nothing_bound(self):
+        with self.assertRaises(RuntimeError):
+            get_bound()
+        # end with
+    # end def
+
+    def test_bind(self):
+        bound = object()
+        default = object()
+        FastORM.set_default(default)
+        with FastORM.bind(bound):
+            self.assertIs(bound, get_bound())
+        # end with
+        self.assertIs(default, get_bound())
+    # end def
+
+    def test_acquire_connection(self):
+        bound = object()
+
+        async def run():
+            with FastORM.bind(bound):
+                async with acquire() as conn:
+                    return conn
+                # end with
+            # end with
+        # end def
+        self.assertIs(bound, asyncio.run(run()))
+    # end def
+
+    def test_with_connection(self):
+        bound = object()
+        given = object()
+
+        async def run():
+            with FastORM.bind(bound):
+                return await Example().run(value=1), await Example().run(given, value=2)
+            # end with
+        # end def
+        self.assertEqual(((bound, 1), (given, 2)), asyncio.run(run()))
+    # end def
+
+    def test_bound_connection_default(self):
+        class FakeConnection(object):
+            async def fetch(self, sql, *args):
+                return [{'id': 1}]
+            # end def
+        # end class
+
+        async def run():
+            with FastORM.bind(FakeConnection()):
+                return await Item.get_many(keys=[1])
+            # end with
+        # end def
+        self.assertEqual([Item(id=1)], asyncio.run(run()))
+        with self.assertRaises(TypeError):
+            asyncio.run(Item.get_many(FakeConnection()))
+        # end with
+    # end def
+
+    def test_pool_metrics_of_closed_pools_dropped(self):
+        class FakePool(object):
+            def __init__(self):
+                self.closing = False
+            # end def
+
+            def is_closing(self):
+                return self.closing
+            # end def
+        # end class
+
+        old_pool, new_pool = FakePool(), FakePool()
+        get_pool_metrics(old_pool).acquires = 3
+        self.assertEqual(3, get_pool_metrics(old_pool).acquires)
+        old_pool.closing = True
+        self.assertEqual(0, get_pool_metrics(new_pool).acquires)
+        self.assertNotIn(id(old_pool), connection._pool_metrics)
+        connection.forget_pool_metrics(new_pool)
+        self.assertNotIn(id(new_pool), connection._pool_metrics)
+    # end def
+
+    def test_set_up_connection_metrics(self):
+        class FakeConnection(object):
+            def __init__(self):
+                self.codecs = []
+            # end def
+
+            async def set_type_codec(self, typename, **kwargs):
+                self.codecs.append((typename, kwargs['format']))
+            # end def
+        # end class
+
+        conn = FakeConnection()
+        connections_before = get_setup_metrics().connections
+        self.assertIs(conn, asyncio.run(FastORM._set_up_connection(conn)))
+        self.assertEqual([('json', 'binary'), ('jsonb', 'binary')], conn.codecs)
+        self.assertEqual(connections_before + 1, get_setup_metrics().connections)
+        self.assertGreaterEqual(get_setup_metrics().setup_time_max, 0.0)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
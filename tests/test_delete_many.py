@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from textwrap import dedent
+
+from fastorm import FastORM
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    title: str
+# end class
+
+
+class Bid(FastORM):
+    _table_name = 'bid'
+    _primary_keys = ['auction', 'number']
+
+    auction: Auction
+    number: int
+    amount: float
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class DeleteManyTestCase(unittest.TestCase):
+    def test_single_primary_key(self):
+        expected_sql = dedent(
+            """
+            DELETE FROM "auction"
+             WHERE "id" = ANY($1::BIGINT[])
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_delete_many([(1,), (2,), (3,)])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([[1, 2, 3]], actual_params)
+    # end def
+
+    def test_composite_primary_key(self):
+        expected_sql = dedent(
+            """
+            DELETE FROM "bid"
+             USING unnest($1::BIGINT[], $2::BIGINT[]) AS "keys" ("auction__id", "number")
+             WHERE "bid"."auction__id" = "keys"."auction__id" AND "bid"."number" = "keys"."number"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Bid.build_sql_delete_many([(1, 1), (1, 2), (4458, 1)])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([[1, 1, 4458], [1, 2, 1]], actual_params)
+    # end def
+
+    def test_known_primary_key(self):
+        bid = Bid(auction=Auction(id=12, title='foo'), number=3, amount=1.5)
+        bid._database_cache_overwrite_with_current()
+        bid.number = 4
+        self.assertEqual([12, 3], [sql_meta.value for sql_meta in bid._get_known_primary_key_sql_fields()])
+    # end def
+
+    def test_wrong_key_length(self):
+        with self.assertRaises(ValueError):
+            Bid.build_sql_delete_many([(1, 1), (2,)])
+        # end with
+    # end def
+
+    def test_keys_without_connection(self):
+        with self.assertRaises(TypeError) as context:
+            asyncio.run(Auction.delete_many([1, 2]))
+        # end with
+        self.assertIn('conn', str(context.exception))
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
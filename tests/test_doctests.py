@@ -6,6 +6,10 @@ import unittest
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(module=fastorm))
     tests.addTests(doctest.DocTestSuite(module=fastorm.query))
+    tests.addTests(doctest.DocTestSuite(module=fastorm.connection))
+    tests.addTests(doctest.DocTestSuite(module=fastorm.codec))
+    tests.addTests(doctest.DocTestSuite(module=fastorm.batch))
+    tests.addTests(doctest.DocTestSuite(module=fastorm.cache))
     return tests
 # end def
 
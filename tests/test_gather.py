@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from fastorm import FastORM, Router
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    title: str
+# end class
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+    # end def
+
+    async def fetch(self, sql, *args):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return [{'id': args[0], 'title': f'auction {args[0]}'}]
+    # end def
+# end class
+
+
+class GatherTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = FakeConnection()
+    # end def
+
+    def test_order_and_concurrency(self):
+        # a router over the fake connection, so it counts as something connections are acquired from.
+        router = Router(self.conn)
+
+        async def run():
+            return await FastORM.gather(
+                router,
+                *[Auction.get(id=i) for i in range(5)],
+                lambda: Auction.get(id=5),
+                concurrency=3,
+            )
+        # end def
+        auctions = asyncio.run(run())
+        self.assertEqual(list(range(6)), [auction.id for auction in auctions])
+        self.assertEqual(3, self.conn.max_running)
+    # end def
+
+    def test_single_connection_is_sequential(self):
+        async def run():
+            return await FastORM.gather(self.conn, *[Auction.get(id=i) for i in range(3)])
+        # end def
+        self.assertEqual([0, 1, 2], [auction.id for auction in asyncio.run(run())])
+        self.assertEqual(1, self.conn.max_running)
+    # end def
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(FastORM.gather(Router(self.conn), concurrency=0))
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
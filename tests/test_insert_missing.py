@@ -0,0 +1,60 @@
+import unittest
+from textwrap import dedent
+from typing import List
+
+from luckydonaldUtils.typing import JSONType
+
+from fastorm import FastORM
+
+
+class Event(FastORM):
+    _table_name = 'event'
+    _primary_keys = ['source', 'number']
+
+    source: str
+    number: int
+    payload: JSONType
+# end class
+
+
+class EventReference(FastORM):
+    _table_name = 'event_reference'
+    _primary_keys = ['event']
+
+    event: Event
+    tags: List[str]
+# end class
+
+
+# noinspection SqlNoDataSourceInspection,SqlResolve
+class InsertMissingTestCase(unittest.TestCase):
+    def test_insert_missing(self):
+        expected_sql = dedent(
+            """
+            INSERT INTO "event" ("source","number","payload")
+             SELECT * FROM unnest($1::TEXT[], $2::BIGINT[], $3::JSONB[])
+             ON CONFLICT DO NOTHING
+             RETURNING "source", "number"
+            ;
+            """
+        ).strip()
+        columns, records = Event._bulk_prepare_records([
+            Event(source='a', number=1, payload={'foo': 'bar'}),
+            Event(source='a', number=2, payload=[1, 2, 3]),
+        ])
+        actual_sql, *actual_params = Event.build_sql_insert_missing(columns=columns, records=records)
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([['a', 'a'], [1, 2], [{'foo': 'bar'}, [1, 2, 3]]], actual_params)
+    # end def
+
+    def test_array_columns(self):
+        with self.assertRaises(TypeError):
+            EventReference.build_sql_insert_missing(columns=['event__source', 'event__number', 'tags'], records=[])
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
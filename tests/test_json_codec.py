@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+from fastorm import FastORM
+from fastorm.codec import SerializerDispatch, create_json_codec, orjson, msgspec
+
+
+class Base(object):
+    pass
+# end class
+
+
+class Child(Base):
+    pass
+# end class
+
+
+class WithDict(object):
+    def to_dict(self):
+        return {'foo': 'bar'}
+    # end def
+# end class
+
+
+class SerializerDispatchTestCase(unittest.TestCase):
+    def test_mro(self):
+        dispatch = SerializerDispatch({Base: lambda obj: 'base'})
+        self.assertEqual('base', dispatch(Child()))
+        self.assertEqual({'foo': 'bar'}, dispatch(WithDict()))
+        self.assertEqual('2022-02-03T04:05:06', dispatch(datetime(2022, 2, 3, 4, 5, 6)))
+        self.assertIsNone(dispatch(object()))
+    # end def
+
+    def test_registering_later(self):
+        class_serializers = {}
+        dispatch = SerializerDispatch(class_serializers)
+        self.assertIsNone(dispatch(Child()))
+        class_serializers[Base] = lambda obj: 'base'
+        self.assertEqual('base', dispatch(Child()))
+        class_serializers[Child] = lambda obj: 'child'
+        self.assertEqual('child', dispatch(Child()))
+        class_serializers[Child] = lambda obj: 'replaced'
+        self.assertEqual('replaced', dispatch(Child()))
+    # end def
+# end class
+
+
+class JsonCodecTestCase(unittest.TestCase):
+    data = {'a': [1, 2.5, None, True], 'b': {'c': 'd'}, 'date': datetime(2022, 2, 3, 4, 5, 6), 'child': Child()}
+    expected = {'a': [1, 2.5, None, True], 'b': {'c': 'd'}, 'date': '2022-02-03T04:05:06', 'child': 'base'}
+
+    def test_stdlib(self):
+        codec = create_json_codec('json', SerializerDispatch({Base: lambda obj: 'base'}))
+        self.assertEqual(self.expected, codec.loads(codec.dumps(self.data)))
+    # end def
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson(self):
+        codec = create_json_codec('orjson', SerializerDispatch({Base: lambda obj: 'base'}))
+        dumped = codec.dumps(self.data)
+        self.assertIsInstance(dumped, str)
+        self.assertEqual(self.expected, codec.loads(dumped))
+        self.assertEqual('{"1":2}', codec.dumps({1: 2}))
+    # end def
+
+    def test_default_library(self):
+        expected = 'orjson' if orjson is not None else 'msgspec' if msgspec is not None else 'json'
+        self.assertEqual(expected, FastORM.get_json_codec().library)
+    # end def
+
+    def test_library_of_the_pool_class(self):
+        class JsonFastORM(FastORM):
+            _json_library = 'json'
+        # end class
+
+        class Conn(object):
+            def __init__(self):
+                self.codecs = {}
+            # end def
+
+            async def set_type_codec(self, typename, **kwargs):
+                self.codecs[typename] = kwargs
+            # end def
+        # end class
+
+        conn = Conn()
+        asyncio.run(JsonFastORM._set_up_json_codecs(conn))
+        self.assertEqual(JsonFastORM.get_json_codec().decode_jsonb_binary, conn.codecs['jsonb']['decoder'])
+        self.assertEqual('json', JsonFastORM.get_json_codec().library)
+    # end def
+
+    def test_jsonb_binary(self):
+        codec = create_json_codec(None, SerializerDispatch({}))
+        encoded = codec.encode_jsonb_binary({'ä': [1, 2]})
+        self.assertEqual(b'\x01', encoded[:1])
+        self.assertEqual({'ä': [1, 2]}, codec.decode_jsonb_binary(encoded))
+        self.assertEqual({'ä': [1, 2]}, codec.decode_json_binary(encoded[1:]))
+        with self.assertRaises(ValueError):
+            codec.decode_jsonb_binary(b'\x02{}')
+        # end with
+    # end def
+
+    def test_unknown_library(self):
+        with self.assertRaises(ValueError):
+            create_json_codec('simplejson', SerializerDispatch({}))
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime
+from textwrap import dedent
+
+from fastorm import FastORM
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    state: str
+    end_date: datetime
+# end class
+
+
+class Bid(FastORM):
+    _table_name = 'bid'
+    _primary_keys = ['auction', 'number']
+
+    auction: Auction
+    number: int
+    amount: float
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class PurgeTestCase(unittest.TestCase):
+    def test_purge(self):
+        expected_sql = dedent(
+            """
+            WITH "deleted" AS (
+             DELETE FROM "auction"
+             WHERE ("id") IN (
+              SELECT "id" FROM "auction"
+              WHERE "state" = $1
+              ORDER BY "id"
+              LIMIT $2
+              FOR UPDATE SKIP LOCKED
+             )
+             RETURNING "id"
+            )
+            SELECT "id", (SELECT count(*) FROM "deleted") AS "deleted_count" FROM "deleted"
+             ORDER BY "id" DESC
+             LIMIT 1
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_purge(batch=10_000, state='done')
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['done', 10_000], actual_params)
+    # end def
+
+    def test_resume_composite_primary_key(self):
+        actual_sql, *actual_params = Bid.build_sql_purge(batch=500, after=(12, 3), amount=0.0)
+        self.assertIn('  WHERE "amount" = $1 AND ("auction__id", "number") > ($2, $3)\n', actual_sql)
+        self.assertIn('  LIMIT $4\n', actual_sql)
+        self.assertIn(' ORDER BY "auction__id" DESC, "number" DESC\n', actual_sql)
+        self.assertEqual([0.0, 12, 3, 500], actual_params)
+    # end def
+
+    def test_wrong_resume_key(self):
+        with self.assertRaises(ValueError):
+            Bid.build_sql_purge(batch=500, after=(12,))
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
@@ -0,0 +1,173 @@
+import asyncio
+import unittest
+
+from fastorm import FastORM, ResultCacheConfig, In
+from fastorm.cache import evict_notified, flush_notified
+
+
+class User(FastORM):
+    _table_name = 'user'
+    _primary_keys = ['id']
+
+    id: int
+    name: str
+# end class
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+    _cache_results = True
+
+    id: int
+    state: str
+    seller: User
+# end class
+
+
+class FakeConnection(object):
+    def __init__(self, rows, in_transaction=False):
+        self.rows = rows
+        self.in_transaction = in_transaction
+        self.fetched = []
+    # end def
+
+    async def fetch(self, sql, *args):
+        self.fetched.append((sql, *args))
+        return self.rows
+    # end def
+
+    async def execute(self, sql, *args):
+        self.fetched.append((sql, *args))
+        return 'UPDATE 1'
+    # end def
+
+    def is_in_transaction(self):
+        return self.in_transaction
+    # end def
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.result_cache = FastORM.configure_result_cache(ResultCacheConfig(ttl=None))
+        self.conn = FakeConnection([{'id': 1, 'state': 'running', 'seller__id': 4}])
+    # end def
+
+    def test_not_opted_in(self):
+        self.assertIsNone(User.get_result_cache())
+        self.assertIs(self.result_cache, Auction.get_result_cache())
+    # end def
+
+    def test_tables(self):
+        self.assertEqual({'auction', 'user'}, Auction._get_result_cache_tables())
+    # end def
+
+    def test_select(self):
+        first = asyncio.run(Auction.select(self.conn, state='running'))
+        second = asyncio.run(Auction.select(self.conn, state='running'))
+        self.assertEqual(1, len(self.conn.fetched))
+        self.assertEqual(first, second)
+        self.assertIsNot(first[0], second[0])
+        asyncio.run(Auction.select(self.conn, state='ended'))
+        self.assertEqual(2, len(self.conn.fetched))
+        self.assertEqual(2, len(self.result_cache))
+    # end def
+
+    def test_in_filter(self):
+        asyncio.run(Auction.select(self.conn, state=In['running', 'ended']))
+        asyncio.run(Auction.select(self.conn, state=In['running', 'ended']))
+        self.assertEqual(1, len(self.conn.fetched))
+    # end def
+
+    def test_write_invalidates(self):
+        asyncio.run(Auction.select(self.conn, state='running'))
+        auction = asyncio.run(Auction.get(self.conn, id=1))
+        self.assertEqual(2, len(self.result_cache))
+        auction.state = 'ended'
+        asyncio.run(auction.update(self.conn))
+        self.assertEqual(0, len(self.result_cache))
+    # end def
+
+    def test_referenced_write_invalidates(self):
+        asyncio.run(Auction.select(self.conn, state='running'))
+        asyncio.run(User.delete_where(self.conn, name='spammer'))
+        self.assertEqual(0, len(self.result_cache))
+    # end def
+
+    def test_in_transaction(self):
+        conn = FakeConnection(self.conn.rows, in_transaction=True)
+        asyncio.run(Auction.select(conn, state='running'))
+        asyncio.run(Auction.select(conn, state='running'))
+        self.assertEqual(2, len(conn.fetched))
+        self.assertEqual(0, len(self.result_cache))
+    # end def
+
+    def test_invalidated_while_fetching(self):
+        class WritingConnection(FakeConnection):
+            async def fetch(self, sql, *args):
+                User._result_cache_invalidate()  # somebody else wrote meanwhile
+                return await super().fetch(sql, *args)
+            # end def
+        # end class
+
+        asyncio.run(Auction.select(WritingConnection(self.conn.rows), state='running'))
+        self.assertEqual(0, len(self.result_cache))
+    # end def
+
+    def test_invalidated_again_after_commit(self):
+        class TransactionConnection(FakeConnection):
+            def transaction(self, isolation=None):
+                return self
+            # end def
+
+            async def start(self):
+                pass
+            # end def
+
+            async def commit(self):
+                pass
+            # end def
+        # end class
+
+        async def run():
+            async with FastORM.transaction(TransactionConnection([])):
+                User._result_cache_invalidate()
+                # another connection caches the old rows before the commit.
+                await Auction.select(self.conn, state='running')
+                self.assertEqual(1, len(self.result_cache))
+            # end with
+        # end def
+
+        asyncio.run(run())
+        self.assertEqual(0, len(self.result_cache))
+    # end def
+
+    def test_notified(self):
+        asyncio.run(Auction.select(self.conn, state='running'))
+        evict_notified('{"table": "user", "key": [4]}')
+        self.assertEqual(0, len(self.result_cache))
+        asyncio.run(Auction.select(self.conn, state='running'))
+        flush_notified()
+        self.assertEqual(0, len(self.result_cache))
+    # end def
+
+    def test_byte_budget(self):
+        asyncio.run(Auction.select(self.conn, state='running'))
+        entry_size = self.result_cache.size
+        result_cache = FastORM.configure_result_cache(ResultCacheConfig(max_bytes=entry_size * 2, ttl=None))
+        for state in ('a', 'b', 'c'):
+            asyncio.run(Auction.select(self.conn, state=state))
+        # end for
+        self.assertEqual(2, len(result_cache))
+        self.assertLessEqual(result_cache.size, entry_size * 2)
+        asyncio.run(Auction.select(self.conn, state='a'))  # the least recently used one was dropped
+        self.assertEqual(5, len(self.conn.fetched))
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from fastorm import FastORM, Router
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    title: str
+# end class
+
+
+class FakeConnection(object):
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+    # end def
+
+    async def fetch(self, sql, *args):
+        self.log.append((self.name, sql.split(' ')[0]))
+        return []
+    # end def
+
+    async def execute(self, sql, *args):
+        self.log.append((self.name, sql.split(' ')[0]))
+        return 'DELETE 1'
+    # end def
+# end class
+
+
+# the fake connections aren't pools, so acquiring them just uses them directly.
+class RouterTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.log = []
+        self.primary = FakeConnection('primary', self.log)
+        self.replica = FakeConnection('replica', self.log)
+        self.router = Router(self.primary, [self.replica])
+    # end def
+
+    def test_no_replicas(self):
+        router = Router(self.primary)
+        self.assertIs(self.primary, router.get_pool(read_only=True))
+    # end def
+
+    def test_reads_and_writes(self):
+        async def run():
+            await Auction.select(self.router, title='foo')
+            await Auction(id=1, title='foo').delete(self.router)
+        # end def
+        asyncio.run(run())
+        self.assertEqual([('replica', 'SELECT'), ('primary', 'DELETE')], self.log)
+    # end def
+
+    def test_bound(self):
+        async def run():
+            with FastORM.bind(self.router):
+                await Auction.get(id=1)
+            # end with
+        # end def
+        asyncio.run(run())
+        self.assertEqual([('replica', 'SELECT')], self.log)
+    # end def
+
+    def test_session_read_your_writes(self):
+        async def run():
+            with FastORM.session():
+                await Auction.select(self.router)
+                await Auction(id=1, title='foo').delete(self.router)
+                await Auction.select(self.router)
+            # end with
+            await Auction.select(self.router)
+        # end def
+        asyncio.run(run())
+        self.assertEqual([('replica', 'SELECT'), ('primary', 'DELETE'), ('primary', 'SELECT'), ('replica', 'SELECT')], self.log)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
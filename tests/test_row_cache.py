@@ -0,0 +1,276 @@
+import asyncio
+import json
+import unittest
+from textwrap import dedent
+from uuid import UUID
+
+from fastorm import FastORM, CacheConfig
+from fastorm.cache import evict_notified
+
+
+class Category(FastORM):
+    _table_name = 'category'
+    _primary_keys = ['id']
+    _cache = CacheConfig(max_entries=10, ttl=None)
+
+    id: int
+    name: str
+# end class
+
+
+class Token(FastORM):
+    _table_name = 'token'
+    _primary_keys = ['id']
+    _cache = CacheConfig(max_entries=10, ttl=None)
+
+    id: UUID
+    name: str
+# end class
+
+
+class Uncached(FastORM):
+    _table_name = 'uncached'
+    _primary_keys = ['id']
+
+    id: int
+# end class
+
+
+class FakeConnection(object):
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = []
+    # end def
+
+    async def fetch(self, sql, *args):
+        self.fetched.append((sql, *args))
+        return self.rows
+    # end def
+
+    async def execute(self, sql, *args):
+        self.fetched.append((sql, *args))
+        return 'UPDATE 1'
+    # end def
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class RowCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        Category.get_row_cache().clear()
+        self.conn = FakeConnection([{'id': 1, 'name': 'books'}])
+    # end def
+
+    def test_uncached(self):
+        self.assertIsNone(Uncached.get_row_cache())
+    # end def
+
+    def test_get(self):
+        first = asyncio.run(Category.get(self.conn, id=1))
+        second = asyncio.run(Category.get(self.conn, id=1))
+        self.assertEqual(1, len(self.conn.fetched))
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+    # end def
+
+    def test_copies(self):
+        first = asyncio.run(Category.get(self.conn, id=1))
+        first.name = 'changed'
+        self.assertEqual('books', asyncio.run(Category.get(self.conn, id=1)).name)
+    # end def
+
+    def test_other_filters_not_cached(self):
+        asyncio.run(Category.get(self.conn, name='books'))
+        asyncio.run(Category.get(self.conn, id=1, name='books'))
+        self.assertEqual(0, len(Category.get_row_cache()))
+    # end def
+
+    def test_update_invalidates(self):
+        category = asyncio.run(Category.get(self.conn, id=1))
+        category.name = 'novels'
+        asyncio.run(category.update(self.conn))
+        self.assertEqual(0, len(Category.get_row_cache()))
+    # end def
+
+    def test_update_where_clears(self):
+        asyncio.run(Category.get(self.conn, id=1))
+        asyncio.run(Category.update_where(self.conn, dict(name='novels'), name='books'))
+        self.assertEqual(0, len(Category.get_row_cache()))
+    # end def
+
+    def test_get_many(self):
+        asyncio.run(Category.get(self.conn, id=1))
+        conn = FakeConnection([{'id': 3, 'name': 'music'}])
+        categories = asyncio.run(Category.get_many(conn, [1, 2, 3, 1]))
+        self.assertEqual([1, None, 3, 1], [category and category.id for category in categories])
+        self.assertIsNot(categories[0], categories[3])
+        self.assertEqual([('SELECT "id","name" FROM "category" WHERE "id" = ANY($1::BIGINT[])', [2, 3])], conn.fetched)
+        self.assertEqual(2, len(Category.get_row_cache()))
+    # end def
+
+    def test_build_sql_get_many_composite(self):
+        class Translation(FastORM):
+            _table_name = 'translation'
+            _primary_keys = ['id', 'language']
+
+            id: int
+            language: str
+            text: str
+        # end class
+
+        expected_sql = dedent(
+            """
+            SELECT "id","language","text" FROM "translation" WHERE ("id","language") IN (SELECT * FROM unnest($1::BIGINT[], $2::TEXT[]))
+            """
+        ).strip()
+        actual_sql, *actual_params = Translation.build_sql_get_many([(1, 'en'), (1, 'de')])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([[1, 1], ['en', 'de']], actual_params)
+    # end def
+
+    def test_in_transaction_not_cached(self):
+        class TransactionConnection(FakeConnection):
+            def is_in_transaction(self):
+                return True
+            # end def
+        # end class
+
+        conn = TransactionConnection(self.conn.rows)
+        asyncio.run(Category.get(conn, id=1))
+        asyncio.run(Category.get_many(conn, [1]))
+        self.assertEqual(2, len(conn.fetched))
+        self.assertEqual(0, len(Category.get_row_cache()))
+    # end def
+
+    def test_invalidated_while_fetching(self):
+        class WritingConnection(FakeConnection):
+            async def fetch(self, sql, *args):
+                Category(id=1, name='novels')._row_cache_invalidate()  # an update ran meanwhile
+                return await super().fetch(sql, *args)
+            # end def
+        # end class
+
+        conn = WritingConnection(self.conn.rows)
+        asyncio.run(Category.get(conn, id=1))
+        asyncio.run(Category.get_many(conn, [1]))
+        self.assertEqual(0, len(Category.get_row_cache()))
+    # end def
+
+    def test_get_uuid_as_string(self):
+        token_id = UUID(int=7)
+        Token.get_row_cache().clear()
+        conn = FakeConnection([{'id': token_id, 'name': 'x'}])
+        asyncio.run(Token.get(conn, id=str(token_id)))
+        self.assertIsNotNone(Token.get_row_cache().get((token_id,)))
+        asyncio.run(Token.get(conn, id=token_id))
+        self.assertEqual(1, len(conn.fetched))
+    # end def
+
+    def test_get_many_uuid_as_string(self):
+        token_id = UUID(int=7)
+        Token.get_row_cache().clear()
+        conn = FakeConnection([{'id': token_id, 'name': 'x'}])
+        tokens = asyncio.run(Token.get_many(conn, [str(token_id), token_id]))
+        self.assertEqual([token_id, token_id], [token and token.id for token in tokens])
+        self.assertEqual(([token_id],), conn.fetched[0][1:])
+        self.assertEqual(1, len(Token.get_row_cache()))
+    # end def
+
+    def test_update_then_get_uuid_as_string(self):
+        token_id = UUID(int=7)
+        Token.get_row_cache().clear()
+        token = asyncio.run(Token.get(FakeConnection([{'id': token_id, 'name': 'x'}]), id=str(token_id)))
+        token.name = 'y'
+        asyncio.run(token.update(self.conn))
+        conn = FakeConnection([{'id': token_id, 'name': 'y'}])
+        self.assertEqual('y', asyncio.run(Token.get(conn, id=str(token_id))).name)
+        self.assertEqual(1, len(conn.fetched))
+    # end def
+
+    def test_lru_and_ttl(self):
+        class Short(FastORM):
+            _table_name = 'short'
+            _primary_keys = ['id']
+            _cache = CacheConfig(max_entries=1, ttl=0)
+
+            id: int
+        # end class
+
+        row_cache = Short.get_row_cache()
+        row_cache.set((1,), Short(id=1))
+        self.assertIsNone(row_cache.get((1,)))  # expired right away
+        self.assertEqual(0, len(row_cache))
+    # end def
+# end class
+
+
+class Session(FastORM):
+    _table_name = 'session'
+    _primary_keys = ['token']
+    _cache = CacheConfig(max_entries=10, ttl=None, notify=True)
+
+    token: UUID
+    user_id: int
+# end class
+
+
+class SessionSetting(FastORM):
+    _table_name = 'session_setting'
+    _primary_keys = ['login', 'name']
+    _cache = CacheConfig(max_entries=10, ttl=None, notify=True)
+
+    login: Session
+    name: str
+    value: str
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class CacheNotifyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.token = UUID('12345678-1234-5678-1234-567812345678')
+        Session.get_row_cache().clear()
+        Session.get_row_cache().set((self.token,), Session(token=self.token, user_id=4))
+        Session.get_row_cache().set((UUID(int=1),), Session(token=UUID(int=1), user_id=5))
+    # end def
+
+    def test_evict_notified(self):
+        evict_notified(json.dumps({'table': 'session', 'key': [str(self.token)]}))
+        self.assertIsNone(Session.get_row_cache().get((self.token,)))
+        self.assertEqual(1, len(Session.get_row_cache()))
+    # end def
+
+    def test_evict_notified_reference(self):
+        row_cache = SessionSetting.get_row_cache()
+        row_cache.clear()
+        row_cache.set((self.token, 'theme'), SessionSetting(login=self.token, name='theme', value='dark'))
+        evict_notified(json.dumps({'table': 'session_setting', 'key': [str(self.token), 'theme']}))
+        self.assertEqual(0, len(row_cache))
+    # end def
+
+    def test_flush_notified(self):
+        evict_notified(json.dumps({'table': 'session', 'key': None}))
+        self.assertEqual(0, len(Session.get_row_cache()))
+    # end def
+
+    def test_other_table(self):
+        evict_notified(json.dumps({'table': 'something_else', 'key': [str(self.token)]}))
+        self.assertEqual(2, len(Session.get_row_cache()))
+    # end def
+
+    def test_create_includes_trigger(self):
+        sql = Session.build_sql_create()[0]
+        self.assertIn(Session.build_sql_create_notify_trigger()[0], sql)
+        self.assertIn(
+            """PERFORM pg_notify('fastorm_cache', json_build_object('table', TG_TABLE_NAME, 'key', json_build_array(OLD."token"))::text);""",
+            sql,
+        )
+        self.assertIn('CREATE TRIGGER "session__notify_cache" AFTER UPDATE OR DELETE ON "session"\n', sql)
+        self.assertNotIn('pg_notify', Category.build_sql_create()[0])
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
@@ -0,0 +1,198 @@
+import unittest
+from textwrap import dedent
+
+from fastorm import FastORM, In
+
+
+class User(FastORM):
+    _table_name = 'user'
+    _primary_keys = ['id']
+
+    id: int
+    name: str
+# end class
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+    _soft_delete_field = 'deleted'
+
+    id: int
+    owner: User
+    title: str
+    deleted: bool = False
+# end class
+
+
+class VersionedAuction(FastORM):
+    _table_name = 'versioned_auction'
+    _primary_keys = ['id']
+    _soft_delete_field = 'deleted'
+    _version_field = 'version'
+
+    id: int
+    title: str
+    deleted: bool = False
+    version: int = 0
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class SoftDeleteTestCase(unittest.TestCase):
+    def test_delete(self):
+        auction = Auction(id=12, owner=1, title='foo')
+        auction._database_cache_overwrite_with_current()
+        expected_sql = dedent(
+            """
+            UPDATE "auction"
+             SET "deleted" = TRUE
+             WHERE "id" = $1
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = auction.build_sql_delete()
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([12], actual_params)
+    # end def
+
+    def test_delete_versioned(self):
+        auction = VersionedAuction(id=12, title='foo', version=3)
+        auction._database_cache_overwrite_with_current()
+        actual_sql, *actual_params = auction.build_sql_delete()
+        self.assertIn(' SET "deleted" = TRUE,"version" = "version" + 1\n WHERE "id" = $1 AND "version" = $2\n', actual_sql)
+        self.assertEqual([12, 3], actual_params)
+    # end def
+
+    def test_select(self):
+        actual_sql, *actual_params = Auction.build_sql_select(title='foo')
+        self.assertEqual('SELECT "id","owner__id","title","deleted" FROM "auction" WHERE "title" = $1 AND NOT "deleted"', actual_sql)
+        self.assertEqual(['foo'], actual_params)
+    # end def
+
+    def test_select_deleted(self):
+        actual_sql, *actual_params = Auction.build_sql_select(deleted=In[True, False])
+        self.assertEqual('SELECT "id","owner__id","title","deleted" FROM "auction" WHERE "deleted" IN ($1, $2)', actual_sql)
+        self.assertEqual([True, False], actual_params)
+    # end def
+
+    def test_create(self):
+        expected_sql = dedent(
+            """
+            CREATE TABLE "auction" (
+              "id" BIGINT NOT NULL PRIMARY KEY,
+              "owner__id" BIGINT NOT NULL,
+              "title" TEXT NOT NULL,
+              "deleted" BOOLEAN NOT NULL DEFAULT false
+            );
+            CREATE INDEX "auction__pkey__live" ON "auction" ("id") WHERE NOT "deleted";
+            CREATE INDEX "auction__owner__live" ON "auction" ("owner__id") WHERE NOT "deleted";
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_create()
+        self.assertEqual(expected_sql, actual_sql)
+    # end def
+
+    def test_update_where(self):
+        actual_sql, *actual_params = Auction.build_sql_update_where(dict(title='bar'), owner=1)
+        self.assertEqual('UPDATE "auction"\n SET "title" = $1\n WHERE "owner__id" = $2 AND NOT "deleted"\n;', actual_sql)
+        self.assertEqual(['bar', 1], actual_params)
+    # end def
+
+    def test_update_where_deleted(self):
+        actual_sql, *actual_params = Auction.build_sql_update_where(dict(title='bar'), deleted=True)
+        self.assertEqual('UPDATE "auction"\n SET "title" = $1\n WHERE "deleted" = $2\n;', actual_sql)
+        self.assertEqual(['bar', True], actual_params)
+    # end def
+
+    def test_delete_where(self):
+        expected_sql = dedent(
+            """
+            UPDATE "versioned_auction"
+             SET "deleted" = TRUE,"version" = "version" + 1
+             WHERE "title" = $1 AND NOT "deleted"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = VersionedAuction.build_sql_delete_where(title='foo')
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['foo'], actual_params)
+    # end def
+
+    def test_delete_many(self):
+        expected_sql = dedent(
+            """
+            UPDATE "auction"
+             SET "deleted" = TRUE
+             WHERE "id" = ANY($1::BIGINT[]) AND NOT "auction"."deleted"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_delete_many([(1,), (2,)])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([[1, 2]], actual_params)
+    # end def
+
+    def test_delete_many_composite(self):
+        class Translation(FastORM):
+            _table_name = 'translation'
+            _primary_keys = ['id', 'language']
+            _soft_delete_field = 'deleted'
+
+            id: int
+            language: str
+            deleted: bool = False
+        # end class
+
+        expected_sql = dedent(
+            """
+            UPDATE "translation"
+             SET "deleted" = TRUE
+             FROM unnest($1::BIGINT[], $2::TEXT[]) AS "keys" ("id", "language")
+             WHERE "translation"."id" = "keys"."id" AND "translation"."language" = "keys"."language" AND NOT "translation"."deleted"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Translation.build_sql_delete_many([(1, 'en')])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([[1], ['en']], actual_params)
+    # end def
+
+    def test_purge_deletes_for_real(self):
+        actual_sql, *actual_params = Auction.build_sql_purge(batch=100, deleted=True)
+        self.assertIn(' DELETE FROM "auction"\n', actual_sql)
+        self.assertIn('  WHERE "deleted" = $1\n', actual_sql)
+        self.assertEqual([True, 100], actual_params)
+    # end def
+
+    def test_create_long_index_name(self):
+        class LongName(FastORM):
+            _table_name = 'a_really_long_table_name_for_testing_identifier_limits'
+            _primary_keys = ['id']
+            _soft_delete_field = 'deleted'
+
+            id: int
+            deleted: bool = False
+        # end class
+
+        actual_sql, *actual_params = LongName.build_sql_create()
+        self.assertIn('CREATE INDEX "a_really_long_table_name_for_testing_identifier_limits_29f8f6e2" ON', actual_sql)
+    # end def
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            class Broken(FastORM):
+                _table_name = 'broken'
+                _primary_keys = ['id']
+                _soft_delete_field = 'deleted'
+
+                id: int
+            # end class
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
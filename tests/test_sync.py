@@ -0,0 +1,80 @@
+import unittest
+from textwrap import dedent
+from typing import Optional
+
+from fastorm import FastORM, In
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    state: str
+    title: str
+# end class
+
+
+# noinspection SqlNoDataSourceInspection,SqlResolve
+class SyncTestCase(unittest.TestCase):
+    def test_upsert_and_delete(self):
+        expected_sql = dedent(
+            """
+            WITH "upserted" AS (
+             INSERT INTO "auction" ("id","state","title")
+             SELECT "id","state","title" FROM "auction__staging"
+             ON CONFLICT ("id") DO UPDATE SET "state" = EXCLUDED."state", "title" = EXCLUDED."title"
+             RETURNING (xmax = 0) AS "inserted"
+            ), "deleted" AS (
+             DELETE FROM "auction"
+             WHERE "auction"."state" = $1 AND NOT EXISTS (SELECT 1 FROM "auction__staging" WHERE "auction__staging"."id" = "auction"."id")
+             RETURNING 1
+            )
+            SELECT count(*) FILTER (WHERE "inserted") AS "inserted", count(*) FILTER (WHERE NOT "inserted") AS "updated", (SELECT count(*) FROM "deleted") AS "deleted" FROM "upserted"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_sync('auction__staging', ['id', 'state', 'title'], use_merge=False, state='running')
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['running'], actual_params)
+    # end def
+
+    def test_merge(self):
+        expected_sql = dedent(
+            """
+            WITH "merged" AS (
+             MERGE INTO "auction" AS "target"
+             USING "auction__staging" AS "source"
+             ON "target"."id" = "source"."id"
+             WHEN MATCHED THEN UPDATE SET "state" = "source"."state", "title" = "source"."title"
+             WHEN NOT MATCHED THEN INSERT ("id","state","title") VALUES ("source"."id","source"."state","source"."title")
+             WHEN NOT MATCHED BY SOURCE AND "target"."state" IN ($1, $2) THEN DELETE
+             RETURNING merge_action() AS "action"
+            )
+            SELECT count(*) FILTER (WHERE "action" = 'INSERT') AS "inserted", count(*) FILTER (WHERE "action" = 'UPDATE') AS "updated", count(*) FILTER (WHERE "action" = 'DELETE') AS "deleted" FROM "merged"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_sync('auction__staging', ['id', 'state', 'title'], use_merge=True, state=In['running', 'stopped'])
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['running', 'stopped'], actual_params)
+    # end def
+
+    def test_no_scope(self):
+        actual_sql, *actual_params = Auction.build_sql_sync('auction__staging', ['id'], use_merge=False)
+        self.assertIn(' WHERE NOT EXISTS (SELECT 1 FROM "auction__staging" WHERE "auction__staging"."id" = "auction"."id")\n', actual_sql)
+        self.assertIn(' ON CONFLICT ("id") DO NOTHING\n', actual_sql)
+        self.assertEqual([], actual_params)
+    # end def
+
+    def test_missing_primary_key(self):
+        with self.assertRaises(ValueError):
+            Auction.build_sql_sync('auction__staging', ['state', 'title'])
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
@@ -0,0 +1,189 @@
+import asyncio
+import unittest
+
+from fastorm import FastORM
+from fastorm.connection import get_bound, after_commit
+
+
+class RetryableError(Exception):
+    sqlstate = '40001'
+# end class
+
+
+class FakeTransaction(object):
+    def __init__(self, log, commit_error=None):
+        self.log = log
+        self.commit_error = commit_error
+    # end def
+
+    async def start(self):
+        self.log.append('start')
+    # end def
+
+    async def commit(self):
+        self.log.append('commit')
+        if self.commit_error is not None:
+            error, self.commit_error = self.commit_error, None
+            raise error
+        # end if
+    # end def
+
+    async def rollback(self):
+        self.log.append('rollback')
+    # end def
+# end class
+
+
+class FakeConnection(object):
+    def __init__(self, commit_error=None):
+        self.log = []
+        self.isolation = None
+        self.commit_error = commit_error
+    # end def
+
+    def transaction(self, isolation=None):
+        self.isolation = isolation
+        transaction = FakeTransaction(self.log, commit_error=self.commit_error)
+        self.commit_error = None
+        return transaction
+    # end def
+# end class
+
+
+class TransactionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = FakeConnection()
+    # end def
+
+    def test_commit(self):
+        async def run():
+            async with FastORM.transaction(self.conn, isolation='serializable') as conn:
+                self.assertIs(self.conn, get_bound())
+                return conn
+            # end with
+        # end def
+        self.assertIs(self.conn, asyncio.run(run()))
+        self.assertEqual(['start', 'commit'], self.conn.log)
+        self.assertEqual('serializable', self.conn.isolation)
+    # end def
+
+    def test_after_commit(self):
+        called = []
+
+        async def run(fail):
+            async with FastORM.transaction(self.conn):
+                async with FastORM.transaction(self.conn):
+                    after_commit(lambda: called.append('inner'))
+                # end with
+                self.assertEqual([], called)  # the outer one isn't committed yet
+                after_commit(lambda: called.append('outer'))
+                if fail:
+                    raise ValueError()
+                # end if
+            # end with
+        # end def
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run(fail=True))
+        # end with
+        self.assertEqual([], called)
+        asyncio.run(run(fail=False))
+        self.assertEqual(['inner', 'outer'], called)
+        after_commit(lambda: called.append('outside'))  # ignored
+        self.assertEqual(['inner', 'outer'], called)
+    # end def
+
+    def test_rollback(self):
+        async def run():
+            async with FastORM.transaction(self.conn):
+                raise RetryableError()
+            # end with
+        # end def
+        with self.assertRaises(RetryableError):
+            asyncio.run(run())
+        # end with
+        self.assertEqual(['start', 'rollback'], self.conn.log)
+    # end def
+
+    def test_retry(self):
+        retries_before = FastORM.get_transaction_metrics().retries
+        attempts = []
+
+        async def run():
+            async for attempt in FastORM.transaction(self.conn, retries=3, backoff=0):
+                async with attempt:
+                    attempts.append(attempt.attempt)
+                    if len(attempts) < 3:
+                        raise RetryableError()
+                    # end if
+                # end with
+            # end for
+        # end def
+        asyncio.run(run())
+        self.assertEqual([0, 1, 2], attempts)
+        self.assertEqual(['start', 'rollback', 'start', 'rollback', 'start', 'commit'], self.conn.log)
+        self.assertEqual(retries_before + 2, FastORM.get_transaction_metrics().retries)
+    # end def
+
+    def test_retry_failing_commit(self):
+        conn = FakeConnection(commit_error=RetryableError())
+
+        async def run():
+            async for attempt in FastORM.transaction(conn, retries=1, backoff=0):
+                async with attempt:
+                    pass
+                # end with
+            # end for
+        # end def
+        asyncio.run(run())
+        self.assertEqual(['start', 'commit', 'start', 'commit'], conn.log)
+    # end def
+
+    def test_out_of_retries(self):
+        failures_before = FastORM.get_transaction_metrics().failures
+
+        async def run():
+            async for attempt in FastORM.transaction(self.conn, retries=1, backoff=0):
+                async with attempt:
+                    raise RetryableError()
+                # end with
+            # end for
+        # end def
+        with self.assertRaises(RetryableError):
+            asyncio.run(run())
+        # end with
+        self.assertEqual(['start', 'rollback', 'start', 'rollback'], self.conn.log)
+        self.assertEqual(failures_before + 1, FastORM.get_transaction_metrics().failures)
+    # end def
+
+    def test_other_errors_not_retried(self):
+        async def run():
+            async for attempt in FastORM.transaction(self.conn, retries=3, backoff=0):
+                async with attempt:
+                    raise KeyError()
+                # end with
+            # end for
+        # end def
+        with self.assertRaises(KeyError):
+            asyncio.run(run())
+        # end with
+        self.assertEqual(['start', 'rollback'], self.conn.log)
+    # end def
+
+    def test_retries_without_iterating(self):
+        async def run():
+            async with FastORM.transaction(self.conn, retries=3):
+                pass
+            # end with
+        # end def
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+        # end with
+        self.assertEqual([], self.conn.log)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timezone
+from textwrap import dedent
+from typing import Optional
+
+from fastorm import FastORM, In
+
+
+class User(FastORM):
+    _table_name = 'user'
+    _primary_keys = ['id']
+
+    id: int
+    name: str
+# end class
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    owner: User
+    state: str
+    end_date: datetime
+    closed_date: Optional[datetime]
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class UpdateWhereTestCase(unittest.TestCase):
+    def test_update_where(self):
+        expected_sql = dedent(
+            """
+            UPDATE "auction"
+             SET "state" = $1,"closed_date" = $2
+             WHERE "owner__id" IN ($3, $4) AND "state" = $5
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_update_where(
+            dict(state='done', closed_date=datetime(2022, 2, 3, 4, 5, 6, tzinfo=timezone.utc)),
+            state='running', owner=In[User(id=12, name='a'), 13],
+        )
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['done', datetime(2022, 2, 3, 4, 5, 6), 12, 13, 'running'], actual_params)
+    # end def
+
+    def test_update_where_reference_returning(self):
+        expected_sql = dedent(
+            """
+            UPDATE "auction"
+             SET "owner__id" = $1
+             WHERE "owner__id" = $2
+             RETURNING "id"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_update_where(dict(owner=User(id=4458, name='b')), returning=True, owner=12)
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([4458, 12], actual_params)
+    # end def
+
+    def test_update_where_nothing(self):
+        with self.assertRaises(ValueError):
+            Auction.build_sql_update_where({}, state='running')
+        # end with
+    # end def
+
+    def test_in_not_allowed_in_set(self):
+        with self.assertRaises(TypeError):
+            Auction.build_sql_update_where(dict(state=In['a', 'b']))
+        # end with
+    # end def
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class DeleteWhereTestCase(unittest.TestCase):
+    def test_delete_where(self):
+        expected_sql = dedent(
+            """
+            DELETE FROM "auction"
+             WHERE "state" = $1 AND "closed_date" IS NULL
+             RETURNING "id"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = Auction.build_sql_delete_where(returning=True, state='running', closed_date=None)
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['running'], actual_params)
+    # end def
+
+    def test_status_count(self):
+        self.assertEqual(42, Auction._get_status_row_count('DELETE 42'))
+        self.assertEqual(1, Auction._get_status_row_count('INSERT 0 1'))
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
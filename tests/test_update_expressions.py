@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime
+from textwrap import dedent
+from typing import List, Optional
+
+from fastorm import FastORM, Inc, Expr, ArrayAppend
+from fastorm.query import Expression
+
+
+class User(FastORM):
+    _table_name = 'user'
+    _primary_keys = ['id']
+
+    id: int
+    name: str
+# end class
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    owner: User
+    title: str
+    bid_count: int
+    tags: List[str]
+    updated_at: Optional[datetime]
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class UpdateExpressionsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.auction = Auction(id=12, owner=1, title='foo', bid_count=3, tags=[], updated_at=None)
+        self.auction._database_cache_overwrite_with_current()
+    # end def
+
+    def test_update_expressions(self):
+        self.auction.title = 'bar'
+        self.auction.bid_count = Inc(1)
+        self.auction.tags = ArrayAppend('hot')
+        self.auction.updated_at = Expr('now()')
+        expected_sql = dedent(
+            """
+            UPDATE "auction"
+             SET "title" = $1,"bid_count" = "bid_count" + $2,"tags" = array_append("tags", $3),"updated_at" = now()
+             WHERE "id" = $4
+             RETURNING "bid_count", "tags", "updated_at"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = self.auction.build_sql_update()
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['bar', 1, 'hot', 12], actual_params)
+    # end def
+
+    def test_update_without_expressions(self):
+        self.auction.title = 'bar'
+        actual_sql, *actual_params = self.auction.build_sql_update()
+        self.assertNotIn('RETURNING', actual_sql)
+    # end def
+
+    def test_write_back(self):
+        self.auction.bid_count = Inc(1)
+        self.auction._database_cache_overwrite_with_current()
+        self.auction._write_back_returned_row({'bid_count': 4})
+        self.assertEqual(4, self.auction.bid_count)
+        self.assertEqual(4, self.auction._database_cache['bid_count'])
+        self.assertEqual({}, self.auction.get_changes())
+    # end def
+
+    def test_update_where(self):
+        actual_sql, *actual_params = Auction.build_sql_update_where(dict(bid_count=Inc(-1)), id=12)
+        self.assertIn(' SET "bid_count" = "bid_count" + $1\n WHERE "id" = $2\n', actual_sql)
+        self.assertEqual([-1, 12], actual_params)
+    # end def
+
+    def test_not_allowed(self):
+        with self.assertRaises(TypeError, msg='not for references'):
+            Auction.build_sql_update_where(dict(owner=Expr('1')), id=12)
+        # end with
+        with self.assertRaises(TypeError, msg='not for filters'):
+            Auction.build_sql_select(bid_count=Inc(1))
+        # end with
+    # end def
+
+    def test_build_sql_required(self):
+        class Broken(Expression):
+            pass
+        # end class
+
+        with self.assertRaises(TypeError):
+            Broken()
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
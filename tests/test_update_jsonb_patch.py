@@ -0,0 +1,106 @@
+import unittest
+from textwrap import dedent
+
+from luckydonaldUtils.typing import JSONType
+
+from fastorm import FastORM, JsonbPatch
+
+
+class Document(FastORM):
+    _table_name = 'document'
+    _primary_keys = ['id']
+
+    id: int
+    title: str
+    metadata: JSONType
+# end class
+
+
+class DocumentWithoutPatches(Document):
+    _jsonb_patch_max_changes = 0
+# end class
+
+
+class RawJson(dict):
+    pass
+# end class
+
+
+class DocumentWithJson(FastORM):
+    _table_name = 'document_with_json'
+    _primary_keys = ['id']
+    _COLUMN_TYPES = {RawJson: 'JSON', **FastORM._COLUMN_TYPES}
+
+    id: int
+    raw: RawJson
+    metadata: JSONType
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class UpdateJsonbPatchTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metadata = {'author': {'name': 'luckydonald', 'mail': None}, 'tags': ['a', 'b'], 'views': 3}
+        self.document = Document(id=12, title='foo', metadata=self.metadata)
+        self.document._database_cache_overwrite_with_current()
+    # end def
+
+    def test_patch(self):
+        self.document.metadata = {'author': {'name': 'luckydonald', 'mail': 'me@example.com'}, 'tags': ['a', 'b'], 'likes': None}
+        expected_sql = dedent(
+            """
+            UPDATE "document"
+             SET "metadata" = jsonb_set(jsonb_set(("metadata" #- $1::text[]), $2::text[], 'null'::jsonb), $3::text[], $4::jsonb)
+             WHERE "id" = $5
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = self.document.build_sql_update()
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([['views'], ['likes'], ['author', 'mail'], 'me@example.com', 12], actual_params)
+    # end def
+
+    def test_too_many_changes(self):
+        self.document.metadata = {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8}
+        actual_sql, *actual_params = self.document.build_sql_update()
+        self.assertIn(' SET "metadata" = $1\n', actual_sql)
+        self.assertEqual([self.document.metadata, 12], actual_params)
+    # end def
+
+    def test_json_column(self):
+        document = DocumentWithJson(id=12, raw=RawJson(self.metadata), metadata=self.metadata)
+        self.assertEqual('JSON', DocumentWithJson.get_sql_column_types()['raw'])
+        document._database_cache_overwrite_with_current()
+        document.raw = RawJson({**self.metadata, 'views': 4})
+        document.metadata = {**self.metadata, 'views': 4}
+        actual_sql, *actual_params = document.build_sql_update()
+        self.assertIn(' SET "raw" = $1,"metadata" = jsonb_set("metadata", $2::text[], $3::jsonb)\n', actual_sql)
+        self.assertEqual([document.raw, ['views'], 4, 12], actual_params)
+    # end def
+
+    def test_disabled(self):
+        document = DocumentWithoutPatches(id=12, title='foo', metadata=self.metadata)
+        document._database_cache_overwrite_with_current()
+        document.metadata = {**self.metadata, 'views': 4}
+        actual_sql, *actual_params = document.build_sql_update()
+        self.assertIn(' SET "metadata" = $1\n', actual_sql)
+    # end def
+
+    def test_not_an_object(self):
+        self.document.metadata = [1, 2, 3]
+        actual_sql, *actual_params = self.document.build_sql_update()
+        self.assertIn(' SET "metadata" = $1\n', actual_sql)
+        self.assertEqual([[1, 2, 3], 12], actual_params)
+    # end def
+
+    def test_lists_are_replaced(self):
+        patch = JsonbPatch.from_diff({'tags': ['a'], 'x': {'y': [1]}}, {'tags': ['a', 'b'], 'x': {'y': [1]}}, max_changes=10)
+        self.assertEqual([(['tags'], ['a', 'b'])], patch.changes)
+        self.assertEqual([], patch.deletions)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
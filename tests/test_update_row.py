@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 from textwrap import dedent
 
@@ -110,6 +111,75 @@ class UpdateRowTestCase(unittest.TestCase):
 # end class
 
 
+class TableWithReference(FastORM):
+    _table_name = 'table_with_reference'
+    _primary_keys = ['id']
+
+    id: int
+    other: OtherTable
+    updated_at: str
+# end class
+
+
+class UpdateRowReturningTestCase(unittest.TestCase):
+    def test_returning_all(self):
+        object = OtherTable(id_part_1=12, id_part_2='banana', foo=2.35, bar="kiwi")
+        object._database_cache_overwrite_with_current()
+        object.foo = 69.42
+        sql, *where_values = object.build_sql_update(returning=True)
+        # noinspection SqlResolve,SqlNoDataSourceInspection
+        self.assertEqual(
+            dedent("""
+                UPDATE "cool_table_name_yoooo"
+                 SET "foo" = $1
+                 WHERE "id_part_1" = $2 AND "id_part_2" = $3
+                 RETURNING "id_part_1", "id_part_2", "foo", "bar"
+                ;
+            """).strip(),
+            sql,
+            "the produced update SQL is correct"
+        )
+    # end def
+
+    def test_returning_fields(self):
+        object = TableWithReference(id=1, other=(12, 'banana'), updated_at='yesterday')
+        object._database_cache_overwrite_with_current()
+        object.other = (13, 'apple')
+        sql, *where_values = object.build_sql_update(returning=['other', 'updated_at'])
+        self.assertIn(' RETURNING "other__id_part_1", "other__id_part_2", "updated_at"\n', sql)
+
+        with self.assertRaises(ValueError):
+            object.build_sql_update(returning=['does_not_exist'])
+        # end with
+    # end def
+
+    def test_write_back(self):
+        object = TableWithReference(id=1, other=(12, 'banana'), updated_at='yesterday')
+        object._database_cache_overwrite_with_current()
+        object._write_back_returned_row({'updated_at': 'today'})
+        self.assertEqual('today', object.updated_at)
+        self.assertEqual('today', object._database_cache['updated_at'])
+    # end def
+
+    def test_update_returning_composite_reference(self):
+        class FakeConnection(object):
+            async def fetchrow(self, sql, *args):
+                return {'id': 1, 'other__id_part_1': 13, 'other__id_part_2': 'apple', 'updated_at': 'today'}
+            # end def
+        # end class
+
+        instance = TableWithReference(id=1, other=(12, 'banana'), updated_at='yesterday')
+        instance._database_cache_overwrite_with_current()
+        instance.other = (13, 'apple')
+        asyncio.run(instance.update(FakeConnection(), returning=True))
+        self.assertEqual((13, 'apple'), instance.other)
+        self.assertEqual((13, 'apple'), instance._database_cache['other'])
+        self.assertEqual('today', instance.updated_at)
+        self.assertEqual({}, instance.get_changes())
+    # end def
+# end class
+
+
 if __name__ == '__main__':
     unittest.main()
 # end if
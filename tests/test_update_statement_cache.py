@@ -0,0 +1,95 @@
+import unittest
+
+from fastorm import FastORM, Inc, Expr
+
+
+class User(FastORM):
+    _table_name = 'user'
+    _primary_keys = ['id_a', 'id_b']
+
+    id_a: int
+    id_b: int
+    name: str
+# end class
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    owner: User
+    title: str
+    bid_count: int
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class UpdateStatementCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        Auction.get_sql_update_cache().clear()
+    # end def
+
+    def new_auction(self, id: int) -> Auction:
+        auction = Auction(id=id, owner=(1, 2), title='foo', bid_count=3)
+        auction._database_cache_overwrite_with_current()
+        return auction
+    # end def
+
+    def test_hit(self):
+        first = self.new_auction(12)
+        first.title = 'bar'
+        first.owner = (3, 4)
+        first_sql, *first_params = first.build_sql_update()
+        second = self.new_auction(13)
+        second.owner = (5, 6)
+        second.title = 'batz'
+        second_sql, *second_params = second.build_sql_update()
+
+        self.assertEqual(first_sql, second_sql)
+        self.assertEqual([3, 4, 'bar', 12], first_params)
+        self.assertEqual([5, 6, 'batz', 13], second_params)
+        cache = Auction.get_sql_update_cache()
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(0.5, cache.hit_rate)
+        self.assertEqual(1, len(cache))
+    # end def
+
+    def test_different_fields(self):
+        first = self.new_auction(12)
+        first.title = 'bar'
+        first_sql, *_ = first.build_sql_update()
+        second = self.new_auction(12)
+        second.bid_count = 4
+        second_sql, *_ = second.build_sql_update()
+        third = self.new_auction(12)
+        third.title = 'bar'
+        third_sql, *_ = third.build_sql_update(returning=['bid_count'])
+        self.assertEqual(3, len({first_sql, second_sql, third_sql}))
+        self.assertEqual(0, Auction.get_sql_update_cache().hits)
+    # end def
+
+    def test_expressions(self):
+        first = self.new_auction(12)
+        first.bid_count = Inc(1)
+        first_sql, *first_params = first.build_sql_update()
+        second = self.new_auction(13)
+        second.bid_count = Inc(5)
+        second_sql, *second_params = second.build_sql_update()
+        third = self.new_auction(13)
+        third.bid_count = Expr('42')
+        third_sql, *third_params = third.build_sql_update()
+
+        self.assertEqual(first_sql, second_sql)
+        self.assertEqual([5, 13], second_params)
+        self.assertIn('"bid_count" = 42', third_sql)
+        self.assertEqual([13], third_params)
+        self.assertEqual(1, Auction.get_sql_update_cache().hits)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
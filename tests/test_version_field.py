@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from textwrap import dedent
+
+from fastorm import FastORM
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+    _version_field = 'version'
+
+    id: int
+    title: str
+    version: int = 0
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class VersionFieldTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.auction = Auction(id=12, title='foo', version=3)
+        self.auction._database_cache_overwrite_with_current()
+    # end def
+
+    def test_update(self):
+        self.auction.title = 'bar'
+        expected_sql = dedent(
+            """
+            UPDATE "auction"
+             SET "title" = $1,"version" = "version" + $2
+             WHERE "id" = $3 AND "version" = $4
+             RETURNING "version"
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = self.auction.build_sql_update()
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual(['bar', 1, 12, 3], actual_params)
+    # end def
+
+    def test_update_ignores_changed_version(self):
+        self.auction.title = 'bar'
+        self.auction.version = 42
+        actual_sql, *actual_params = self.auction.build_sql_update()
+        self.assertIn(' SET "title" = $1,"version" = "version" + $2\n', actual_sql)
+        self.assertEqual(['bar', 1, 12, 3], actual_params)
+    # end def
+
+    def test_update_only_version_changed(self):
+        class FakeConnection(object):
+            async def fetchrow(self, sql, *args):
+                raise AssertionError('no query should be run')
+            # end def
+        # end class
+
+        self.auction.version = 7
+        with self.assertRaises(ValueError):
+            self.auction.build_sql_update()
+        # end with
+        asyncio.run(self.auction.update(FakeConnection()))  # nothing to do
+    # end def
+
+    def test_delete(self):
+        expected_sql = dedent(
+            """
+            DELETE FROM "auction"
+             WHERE "id" = $1 AND "version" = $2
+            ;
+            """
+        ).strip()
+        actual_sql, *actual_params = self.auction.build_sql_delete()
+        self.assertEqual(expected_sql, actual_sql)
+        self.assertEqual([12, 3], actual_params)
+    # end def
+
+    def test_update_where(self):
+        actual_sql, *actual_params = Auction.build_sql_update_where(dict(title='bar'), id=12)
+        self.assertIn(' SET "title" = $1,"version" = "version" + $2\n', actual_sql)
+        self.assertEqual(['bar', 1, 12], actual_params)
+    # end def
+
+    def test_inherited(self):
+        class SpecialAuction(Auction):
+            _table_name = 'special_auction'
+        # end class
+        self.assertEqual('version', SpecialAuction._version_field)
+    # end def
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            class Broken(FastORM):
+                _table_name = 'broken'
+                _primary_keys = ['id']
+                _version_field = 'revision'
+
+                id: int
+            # end class
+        # end with
+    # end def
+
+    def test_primary_key(self):
+        with self.assertRaises(ValueError):
+            class Broken(FastORM):
+                _table_name = 'broken'
+                _primary_keys = ['id']
+                _version_field = 'id'
+
+                id: int
+            # end class
+        # end with
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if
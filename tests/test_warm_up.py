@@ -0,0 +1,149 @@
+import asyncio
+import contextlib
+import inspect
+import unittest
+import unittest.mock
+
+import asyncpg
+
+from fastorm import FastORM
+from fastorm import connection
+from fastorm.connection import clear_registered_statements, get_registered_statements
+
+
+class Auction(FastORM):
+    _table_name = 'auction'
+    _primary_keys = ['id']
+
+    id: int
+    owner_id: int
+    title: str
+# end class
+
+
+class FakeConnection(object):
+    """
+    Has the statement cache like asyncpg's `Connection`, filled by `_get_statement(…)` unless it's in there already.
+    """
+    def __init__(self):
+        self.prepared = []
+        self._stmt_cache_enabled = True
+        self._stmt_cache = {}
+    # end def
+
+    async def set_type_codec(self, typename, **kwargs):
+        pass
+    # end def
+
+    async def _get_statement(self, query, timeout, *, use_cache=True):
+        if use_cache and query in self._stmt_cache:
+            return self._stmt_cache[query]
+        # end if
+        self.prepared.append(query)
+        statement = object()
+        if use_cache and self._stmt_cache_enabled:
+            self._stmt_cache[query] = statement
+        # end if
+        return statement
+    # end def
+# end class
+
+
+class FakePool(object):
+    def __init__(self, min_size):
+        self.min_size = min_size
+        self.conns = []
+    # end def
+
+    def get_min_size(self):
+        return self.min_size
+    # end def
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        conn = FakeConnection()
+        self.conns.append(conn)
+        yield conn
+    # end def
+# end class
+
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+class WarmUpTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_registered_statements()
+    # end def
+
+    def tearDown(self) -> None:
+        clear_registered_statements()
+    # end def
+
+    def test_register_default(self):
+        Auction.register_warm_up()
+        self.assertEqual(['SELECT "id","owner_id","title" FROM "auction" WHERE "id" = $1'], get_registered_statements())
+    # end def
+
+    def test_register(self):
+        Auction.register_warm_up(Auction.build_sql_select(owner_id=4), 'SELECT 1')
+        Auction.register_warm_up('SELECT 1')
+        self.assertEqual(['SELECT "id","owner_id","title" FROM "auction" WHERE "owner_id" = $1', 'SELECT 1'], get_registered_statements())
+    # end def
+
+    def test_set_up_connection(self):
+        Auction.register_warm_up('SELECT 1')
+        conn = asyncio.run(FastORM._set_up_connection(FakeConnection()))
+        self.assertEqual(['SELECT 1'], conn.prepared)
+        self.assertEqual(['SELECT 1'], list(conn._stmt_cache))
+    # end def
+
+    def test_cached_not_prepared_again(self):
+        Auction.register_warm_up('SELECT 1')
+        conn = asyncio.run(FastORM._set_up_connection(FakeConnection()))
+        Auction.register_warm_up('SELECT 2')
+        asyncio.run(connection.prepare_statements(conn))
+        self.assertEqual(['SELECT 1', 'SELECT 2'], conn.prepared)
+        self.assertEqual(['SELECT 1', 'SELECT 2'], list(conn._stmt_cache))
+    # end def
+
+    def test_asyncpg_statement_cache(self):
+        # what the fake above relies on, in the asyncpg versions `prepare_statements(…)` accepts.
+        self.assertTrue(connection._can_fill_statement_cache())
+        parameters = inspect.signature(asyncpg.connection.Connection._get_statement).parameters
+        self.assertEqual(['self', 'query', 'timeout'], list(parameters)[:3])
+        self.assertIs(True, parameters['use_cache'].default)
+        self.assertIn('_stmt_cache', asyncpg.connection.Connection.__slots__)
+        self.assertIn('_stmt_cache_enabled', asyncpg.connection.Connection.__slots__)
+    # end def
+
+    def test_unknown_asyncpg_version(self):
+        Auction.register_warm_up('SELECT 1')
+        conn = FakeConnection()
+        with unittest.mock.patch.object(asyncpg, '__version__', '1.0.0'):
+            self.assertEqual(0, asyncio.run(connection.prepare_statements(conn)))
+        # end with
+        self.assertEqual([], conn.prepared)
+    # end def
+
+    def test_statement_cache_disabled(self):
+        Auction.register_warm_up('SELECT 1')
+        conn = FakeConnection()
+        conn._stmt_cache_enabled = False
+        asyncio.run(FastORM._set_up_connection(conn))
+        self.assertEqual([], conn.prepared)
+    # end def
+
+    def test_warm_up(self):
+        Auction.register_warm_up('SELECT 1', 'SELECT 2')
+        pool = FakePool(min_size=3)
+        self.assertEqual(3, asyncio.run(FastORM.warm_up(pool)))
+        self.assertEqual(3, len(pool.conns))
+        for conn in pool.conns:
+            self.assertEqual(['SELECT 1', 'SELECT 2'], conn.prepared)
+        # end for
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if